@@ -1,7 +1,5 @@
 # app.py
 import logging
-import os
-import urllib
 
 import pyodbc
 from flasgger import Swagger
@@ -9,28 +7,17 @@ from flask import Flask
 from flask_cors import CORS
 from flask_migrate import Migrate
 
+from config import Config
 from models import db
+from services.write_behind import init_write_behind
+from utils.cache import init_cache
 
 # Initialisation de l'application
 app = Flask(__name__)
 CORS(app)
-# Configuration de la connexion à la base (SQL Server par exemple)
-connection_string = (
-    "DRIVER={ODBC Driver 17 for SQL Server};"
-    "SERVER=127.0.0.1;"
-    "DATABASE=master;"
-    "UID=Externe;"
-    "PWD=Secur3P@ssw0rd!"
-)
-params = urllib.parse.quote_plus(connection_string)
-app.config['SQLALCHEMY_DATABASE_URI'] = f"mssql+pyodbc:///?odbc_connect={params}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['DEBUG'] = True
-
-# Configuration pour l'upload de fichiers
-app.config['UPLOAD_FOLDER'] = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'uploads')
-app.config['MAX_CONTENT_LENGTH'] = 32 * 1024 * 1024  # 16 MB
-app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg'}
+# Configuration (base de données, pool de connexions, uploads, cache) : voir config.py,
+# chaque réglage peut être surchargé par une variable d'environnement
+app.config.from_object(Config)
 
 logging.basicConfig(level=logging.DEBUG)
 app.logger.setLevel(logging.DEBUG)
@@ -40,6 +27,12 @@ logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
 db.init_app(app)
 migrate = Migrate(app, db)
 swagger = Swagger(app)
+init_cache(app)
+init_write_behind(app)
+
+# Commandes CLI (flask erreurs ...)
+from cli import init_app as init_cli
+init_cli(app)
 
 # Enregistrement des blueprints depuis le dossier routes
 from routes import init_app as init_routes
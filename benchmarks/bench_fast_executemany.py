@@ -0,0 +1,74 @@
+# benchmarks/bench_fast_executemany.py
+"""
+Mesure le débit d'insertion en masse (lignes/s) sur SQL Server avec et sans
+l'option pyodbc ``fast_executemany``, sur les deux chemins d'insertion de l'application :
+  - executemany sans RETURNING (POST /erreurs/batch sans regroupement ni abonné SSE,
+    rollups) : fast_executemany s'applique ;
+  - INSERT ... RETURNING avec sort_by_parameter_order (routes /bulk, utils.bulk.bulk_insert) :
+    SQLAlchemy envoie des INSERT multi-VALUES (insertmanyvalues), fast_executemany ne
+    s'applique pas.
+
+Usage (depuis la racine du projet, base SQL Server joignable) :
+    python -m benchmarks.bench_fast_executemany [nombre_de_lignes]
+
+L'URI est lue dans BENCH_DATABASE_URI, à défaut dans la configuration de
+l'application (DATABASE_URL / ODBC_CONNECTION_STRING, voir config.py).
+Les insertions se font dans une table temporaire, aucune donnée n'est conservée.
+"""
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine
+
+from config import Config
+
+metadata = MetaData()
+bench_table = Table(
+    '#bench_historique', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('baes_id', Integer, nullable=False),
+    Column('type_erreur', String(50), nullable=False),
+    Column('timestamp', DateTime(timezone=True), nullable=False),
+)
+
+
+def run(uri, fast_executemany, rows, returning):
+    engine = create_engine(uri, fast_executemany=fast_executemany)
+    try:
+        with engine.begin() as connection:
+            metadata.create_all(connection)
+            stmt = bench_table.insert()
+            if returning:
+                stmt = stmt.returning(bench_table.c.id, sort_by_parameter_order=True)
+            start = time.perf_counter()
+            result = connection.execute(stmt, rows)
+            if returning:
+                assert len(result.scalars().all()) == len(rows)
+            elapsed = time.perf_counter() - start
+            metadata.drop_all(connection)
+        return len(rows) / elapsed
+    finally:
+        engine.dispose()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    uri = os.environ.get('BENCH_DATABASE_URI', Config.SQLALCHEMY_DATABASE_URI)
+    if not uri.startswith('mssql+pyodbc'):
+        sys.exit("Ce benchmark nécessite une URI mssql+pyodbc (BENCH_DATABASE_URI).")
+    now = datetime.now(timezone.utc)
+    rows = [
+        {'baes_id': i % 500 + 1, 'type_erreur': 'erreur_connexion', 'timestamp': now}
+        for i in range(count)
+    ]
+    print(f"{count} lignes insérées par instruction")
+    for returning, label in ((False, 'executemany'), (True, 'RETURNING (bulk)')):
+        for fast in (False, True):
+            rate = run(uri, fast, rows, returning)
+            print(f"{label:<17} fast_executemany={fast!s:<5} : {rate:>12,.0f} lignes/s")
+
+
+if __name__ == '__main__':
+    main()
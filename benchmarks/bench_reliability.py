@@ -0,0 +1,100 @@
+# benchmarks/bench_reliability.py
+"""
+Mesure le calcul des indicateurs de fiabilité (services/analytics.py) sur des erreurs
+synthétiques, sans base de données :
+  - le calcul vectorisé NumPy (compute_reliability) sur toutes les lignes ;
+  - une boucle Python équivalente, erreur par erreur, sur un sous-ensemble.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_reliability [nombre_de_lignes] [nombre_de_baes] [lignes_boucle_python]
+
+Par défaut : 10 000 000 erreurs réparties sur 20 000 BAES et un an, boucle Python sur 1 000 000 lignes.
+"""
+import sys
+import time
+
+import numpy as np
+
+from models.historique_erreur import error_types
+from services.analytics import HOUR, RECOVERY_HOURS, compute_reliability
+
+PERIOD = 365 * 24 * HOUR
+
+
+def synthetic(rows, baes_count, seed=0):
+    rng = np.random.default_rng(seed)
+    baes_ids = np.arange(1, baes_count + 1, dtype=np.int64)
+    erreur_baes = rng.integers(1, baes_count + 1, rows, dtype=np.int64)
+    erreur_types = rng.integers(0, len(error_types), rows, dtype=np.int64)
+    starts = rng.uniform(0, PERIOD, rows)
+    # Une erreur sur dix a été regroupée avec des répétitions dans les minutes suivantes
+    repeated = rng.random(rows) < 0.1
+    ends = starts + np.where(repeated, rng.uniform(0, 600, rows), 0.0)
+    occurrences = np.where(repeated, rng.integers(2, 10, rows), 1).astype(np.float64)
+    return baes_ids, erreur_baes, erreur_types, starts, ends, occurrences
+
+
+def python_reliability(baes_ids, erreur_baes, erreur_types, starts, ends, occurrences, period_end, recovery):
+    """Version boucle : erreurs regroupées par BAES puis parcourues une à une."""
+    by_baes = {int(baes_id): [] for baes_id in baes_ids}
+    for baes_id, start, end in zip(erreur_baes.tolist(), starts.tolist(), ends.tolist()):
+        by_baes[baes_id].append((start, end))
+    downtime = {}
+    failures = {}
+    for baes_id, erreurs in by_baes.items():
+        erreurs.sort()
+        total = 0.0
+        count = 0
+        incident_start = incident_end = None
+        for start, end in erreurs:
+            if incident_start is None or start > incident_end + recovery:
+                if incident_start is not None:
+                    total += min(incident_end + recovery, period_end) - incident_start
+                incident_start, incident_end = start, end
+                count += 1
+            else:
+                incident_end = max(incident_end, end)
+        if incident_start is not None:
+            total += min(incident_end + recovery, period_end) - incident_start
+        downtime[baes_id] = total
+        failures[baes_id] = count
+    return failures, downtime
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    baes_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    python_rows = int(sys.argv[3]) if len(sys.argv) > 3 else 1000000
+    recovery = RECOVERY_HOURS * HOUR
+
+    data = synthetic(rows, baes_count)
+    start = time.perf_counter()
+    metrics = compute_reliability(*data, 0.0, PERIOD, recovery)
+    elapsed = time.perf_counter() - start
+    print(f"NumPy  : {rows:>12,} erreurs, {baes_count:,} BAES en {elapsed:7.2f} s   {rows / elapsed:>14,.0f} lignes/s")
+
+    # Lignes déjà triées par (baes_id, timestamp), comme les renvoie load_erreurs
+    order = np.lexsort((data[3], data[1]))
+    ordered = (data[0],) + tuple(column[order] for column in data[1:])
+    start = time.perf_counter()
+    compute_reliability(*ordered, 0.0, PERIOD, recovery)
+    elapsed = time.perf_counter() - start
+    print(f"NumPy, lignes triées par la base : {elapsed:7.2f} s   {rows / elapsed:>14,.0f} lignes/s")
+
+    subset = synthetic(python_rows, baes_count)
+    start = time.perf_counter()
+    failures, downtime = python_reliability(*subset, PERIOD, recovery)
+    elapsed_python = time.perf_counter() - start
+    rate_python = python_rows / elapsed_python
+    print(f"Python : {python_rows:>12,} erreurs, {baes_count:,} BAES en {elapsed_python:7.2f} s   {rate_python:>14,.0f} lignes/s")
+    print(f"Gain x{rows / elapsed / rate_python:.1f} (lignes triées)")
+
+    # Les deux versions doivent donner les mêmes indicateurs
+    check = compute_reliability(*subset, 0.0, PERIOD, recovery)
+    assert (check['failures'] == [failures[int(b)] for b in subset[0]]).all()
+    assert np.allclose(check['downtime'], [downtime[int(b)] for b in subset[0]])
+    print(f"Disponibilité moyenne : {100 * metrics['uptime'].sum() / (PERIOD * baes_count):.3f} %")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/bench_serializers.py
+"""
+Compare le débit (lignes/s) de GET /batiments et GET /etages entre :
+  - l'ancienne approche : Model.query.all() puis dict construit à la main (hydratation ORM complète) ;
+  - les sérialiseurs par projection de colonnes (utils/serializers.py).
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_serializers [nombre_de_lignes]
+
+La base utilisée est SQLite en mémoire par défaut ; BENCH_DATABASE_URI permet de viser une autre base.
+"""
+import os
+import sys
+import time
+
+from flask import Flask
+
+from models import db
+from models.batiment import Batiment
+from models.etage import Etage
+from models.site import Site
+from utils.serializers import batiment_serializer, etage_serializer
+
+ROUNDS = 5
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('BENCH_DATABASE_URI', 'sqlite://')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    from routes import init_app as init_routes
+    init_routes(app)
+    return app
+
+
+def seed(count):
+    db.create_all()
+    site = Site(name='Site bench')
+    db.session.add(site)
+    db.session.flush()
+    polygon = {'points': [[i, i * 2] for i in range(20)]}
+    db.session.execute(
+        Batiment.__table__.insert(),
+        [{'name': f'Batiment {i}', 'polygon_points': polygon, 'site_id': site.id} for i in range(count)]
+    )
+    db.session.execute(
+        Etage.__table__.insert(),
+        [{'name': f'Etage {i}', 'batiment_id': i % count + 1} for i in range(count)]
+    )
+    db.session.commit()
+
+
+def orm_batiments():
+    return [{
+        'id': b.id,
+        'name': b.name,
+        'polygon_points': b.polygon_points,
+        'site_id': b.site_id
+    } for b in Batiment.query.all()]
+
+
+def orm_etages():
+    return [{'id': e.id, 'name': e.name, 'batiment_id': e.batiment_id} for e in Etage.query.all()]
+
+
+def projection(serializer):
+    return lambda: [serializer.dump(row) for row in db.session.execute(serializer.select())]
+
+
+def measure(func, count):
+    best = None
+    for _ in range(ROUNDS):
+        # Session vidée à chaque tour : l'identity map ne doit pas fausser la mesure
+        db.session.remove()
+        start = time.perf_counter()
+        rows = func()
+        elapsed = time.perf_counter() - start
+        assert len(rows) == count
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best
+
+
+def measure_http(client, url, count):
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        response = client.get(url)
+        body = response.get_data()
+        elapsed = time.perf_counter() - start
+        assert response.status_code == 200 and body
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    app = create_app()
+    with app.app_context():
+        seed(count)
+        print(f"{count} lignes par table, meilleur de {ROUNDS} tours")
+        for label, legacy, serializer in (
+            ('batiments', orm_batiments, batiment_serializer),
+            ('etages', orm_etages, etage_serializer),
+        ):
+            before = measure(legacy, count)
+            after = measure(projection(serializer), count)
+            print(f"GET /{label:<10} ORM : {before:>12,.0f} lignes/s   projection : {after:>12,.0f} lignes/s   gain x{after / before:.2f}")
+        client = app.test_client()
+        for label in ('batiments', 'etages'):
+            rate = measure_http(client, f'/{label}/?stream=json', count)
+            print(f"HTTP GET /{label}/?stream=json : {rate:>12,.0f} lignes/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# cli.py
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from services.archive import ARCHIVE_BATCH_SIZE, RETENTION_DAYS, archive_erreurs
+from services.rollup import ROLLUP_BATCH_SIZE, ROLLUP_LAG_SECONDS, run_rollup
+from services.stats import rollup_watermark
+
+# Commandes de maintenance de l'historique des erreurs : flask erreurs <commande>
+erreurs_cli = AppGroup('erreurs', help="Maintenance de l'historique des erreurs BAES.")
+
+
+@erreurs_cli.command('rollup')
+@click.option('--batch-size', type=int, default=None, help='Lignes source agrégées par transaction.')
+@click.option('--lag', type=int, default=None, help="Délai de sécurité (s) avant agrégation d'une ligne.")
+def rollup_command(batch_size, lag):
+    """Agrège les nouvelles erreurs dans les tables horaire et journalière."""
+    total = rollup_from_config(batch_size, lag)
+    click.echo(f"{total} erreurs agrégées")
+
+
+@erreurs_cli.command('archive')
+@click.option('--older-than-days', type=int, default=None, help='Horizon de rétention en jours.')
+@click.option('--batch-size', type=int, default=None, help='Lignes archivées puis supprimées par transaction.')
+@click.option('--dest', type=click.Path(file_okay=False), default=None, help="Dossier des fichiers d'archive.")
+def archive_command(older_than_days, batch_size, dest):
+    """Archive (NDJSON gzip) puis supprime les erreurs plus anciennes que l'horizon."""
+    # Seules les lignes déjà comptées dans les agrégats sont supprimées
+    rollup_from_config()
+    config = current_app.config
+    total, path = archive_erreurs(
+        dest or config['ERREURS_ARCHIVE_FOLDER'],
+        rollup_watermark(),
+        older_than_days if older_than_days is not None else config.get('ERREURS_RETENTION_DAYS', RETENTION_DAYS),
+        batch_size or config.get('ERREURS_ARCHIVE_BATCH_SIZE', ARCHIVE_BATCH_SIZE),
+        log=click.echo
+    )
+    click.echo(f"{total} erreurs archivées dans {path}" if total else "Aucune erreur à archiver")
+
+
+def rollup_from_config(batch_size=None, lag=None):
+    batch_size = batch_size or current_app.config.get('ERREURS_ROLLUP_BATCH_SIZE', ROLLUP_BATCH_SIZE)
+    lag = lag if lag is not None else current_app.config.get('ERREURS_ROLLUP_LAG_SECONDS', ROLLUP_LAG_SECONDS)
+    # Une ligne regroupée reçoit des occurrences jusqu'à la fin de la fenêtre de regroupement,
+    # et une décision prise juste avant peut être commitée après : délai de sécurité en plus
+    lag += current_app.config.get('ERREURS_COALESCE_WINDOW_SECONDS', 0)
+    return run_rollup(batch_size, lag)
+
+
+def init_app(app):
+    app.cli.add_command(erreurs_cli)
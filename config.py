@@ -0,0 +1,116 @@
+# config.py
+import os
+import urllib.parse
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def default_database_uri():
+    # Connexion SQL Server par défaut (surchargée par DATABASE_URL ou ODBC_CONNECTION_STRING)
+    connection_string = os.environ.get('ODBC_CONNECTION_STRING', (
+        "DRIVER={ODBC Driver 17 for SQL Server};"
+        "SERVER=127.0.0.1;"
+        "DATABASE=master;"
+        "UID=Externe;"
+        "PWD=Secur3P@ssw0rd!"
+    ))
+    params = urllib.parse.quote_plus(connection_string)
+    return f"mssql+pyodbc:///?odbc_connect={params}"
+
+
+def engine_options(database_uri, pool_size, max_overflow, pool_recycle, pool_pre_ping, fast_executemany):
+    """
+    Options passées à create_engine. Les réglages de pool ne s'appliquent pas à SQLite
+    (pool mono-connexion) et fast_executemany n'existe que pour le dialecte mssql+pyodbc.
+    """
+    options = {'pool_pre_ping': pool_pre_ping}
+    if not database_uri.startswith('sqlite'):
+        options.update(pool_size=pool_size, max_overflow=max_overflow, pool_recycle=pool_recycle)
+    if database_uri.startswith('mssql+pyodbc'):
+        # Les executemany sans RETURNING envoient les paramètres en un seul tableau au lieu
+        # d'un aller-retour ODBC par ligne. Les insertions qui récupèrent les IDs (RETURNING,
+        # routes /bulk) passent par les lots multi-VALUES de SQLAlchemy et n'en dépendent pas
+        options['fast_executemany'] = fast_executemany
+    return options
+
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or default_database_uri()
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DEBUG = env_bool('FLASK_DEBUG', True)
+
+    # Pool de connexions et insertions en masse
+    DB_POOL_SIZE = env_int('DB_POOL_SIZE', 10)
+    DB_MAX_OVERFLOW = env_int('DB_MAX_OVERFLOW', 20)
+    DB_POOL_RECYCLE = env_int('DB_POOL_RECYCLE', 1800)  # secondes
+    DB_POOL_PRE_PING = env_bool('DB_POOL_PRE_PING', True)
+    DB_FAST_EXECUTEMANY = env_bool('DB_FAST_EXECUTEMANY', True)
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI, DB_POOL_SIZE, DB_MAX_OVERFLOW,
+        DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_FAST_EXECUTEMANY
+    )
+
+    # Nombre maximum d'éléments par requête des routes /bulk
+    BULK_MAX_ITEMS = env_int('BULK_MAX_ITEMS', 5000)
+    # Nombre maximum d'événements par requête POST /erreurs/batch
+    ERREURS_BATCH_MAX_EVENTS = env_int('ERREURS_BATCH_MAX_EVENTS', 50000)
+    # Agrégation de l'historique (flask erreurs rollup)
+    ERREURS_ROLLUP_BATCH_SIZE = env_int('ERREURS_ROLLUP_BATCH_SIZE', 50000)
+    ERREURS_ROLLUP_LAG_SECONDS = env_int('ERREURS_ROLLUP_LAG_SECONDS', 60)
+    # Durée de la fenêtre de comptage des erreurs de baes_status
+    BAES_STATUS_WINDOW_HOURS = env_int('BAES_STATUS_WINDOW_HOURS', 24)
+    # Rétention de l'historique (flask erreurs archive)
+    ERREURS_RETENTION_DAYS = env_int('ERREURS_RETENTION_DAYS', 365)
+    ERREURS_ARCHIVE_BATCH_SIZE = env_int('ERREURS_ARCHIVE_BATCH_SIZE', 4000)
+    ERREURS_ARCHIVE_FOLDER = os.environ.get('ERREURS_ARCHIVE_FOLDER', os.path.join(BASE_DIR, 'archives'))
+    # Regroupement des erreurs répétées d'une BAES (0 = désactivé)
+    ERREURS_COALESCE_WINDOW_SECONDS = env_int('ERREURS_COALESCE_WINDOW_SECONDS', 0)
+    # Écriture différée de POST /erreurs/batch (réponse 202, écriture par lots en arrière-plan)
+    ERREURS_WRITE_BEHIND = env_bool('ERREURS_WRITE_BEHIND', False)
+    ERREURS_WRITE_BEHIND_MAXSIZE = env_int('ERREURS_WRITE_BEHIND_MAXSIZE', 100000)
+    ERREURS_WRITE_BEHIND_BATCH_SIZE = env_int('ERREURS_WRITE_BEHIND_BATCH_SIZE', 5000)
+    ERREURS_WRITE_BEHIND_INTERVAL = float(os.environ.get('ERREURS_WRITE_BEHIND_INTERVAL', 0.5))  # secondes
+    # Flux SSE GET /erreurs/stream
+    ERREURS_STREAM_QUEUE_SIZE = env_int('ERREURS_STREAM_QUEUE_SIZE', 1000)
+    ERREURS_STREAM_HEARTBEAT_SECONDS = env_int('ERREURS_STREAM_HEARTBEAT_SECONDS', 15)
+    ERREURS_STREAM_REPLAY_MAX = env_int('ERREURS_STREAM_REPLAY_MAX', 1000)
+    # Analytique de fiabilité : délai sans nouvelle erreur au-delà duquel une BAES est réparée
+    ANALYTICS_RECOVERY_HOURS = env_int('ANALYTICS_RECOVERY_HOURS', 24)
+
+    # Configuration pour l'upload de fichiers
+    UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
+    MAX_CONTENT_LENGTH = 32 * 1024 * 1024  # 32 MB
+    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+    # Upload par morceaux des plans volumineux (/cartes/uploads)
+    CARTE_UPLOAD_CHUNK_SIZE = env_int('CARTE_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+    CARTE_UPLOAD_MAX_SIZE = env_int('CARTE_UPLOAD_MAX_SIZE', 1024 * 1024 * 1024)
+    CARTE_UPLOAD_EXPIRY_HOURS = env_int('CARTE_UPLOAD_EXPIRY_HOURS', 24)
+    # Pyramide de tuiles des cartes (GET /cartes/<id>/tiles), construite en arrière-plan
+    CARTE_TILE_SIZE = env_int('CARTE_TILE_SIZE', 256)
+    CARTE_TILE_WORKERS = env_int('CARTE_TILE_WORKERS', 2)
+    # Normalisation des images à l'upload (orientation EXIF, métadonnées, résolution, réencodage),
+    # exécutée dans un pool de processus
+    CARTE_IMAGE_NORMALIZE = env_bool('CARTE_IMAGE_NORMALIZE', True)
+    CARTE_IMAGE_MAX_SIZE = env_int('CARTE_IMAGE_MAX_SIZE', 8192)
+    CARTE_IMAGE_QUALITY = env_int('CARTE_IMAGE_QUALITY', 85)
+    CARTE_IMAGE_WORKERS = env_int('CARTE_IMAGE_WORKERS', 2)
+    # Envoi des fichiers de cartes délégué au proxy : préfixe d'une location interne nginx servant
+    # UPLOAD_FOLDER (X-Accel-Redirect), ou X-Sendfile (Apache mod_xsendfile, lighttpd)
+    X_ACCEL_REDIRECT_PREFIX = os.environ.get('X_ACCEL_REDIRECT_PREFIX')
+    USE_X_SENDFILE = env_bool('USE_X_SENDFILE', False)
+
+    # Cache de lecture en mémoire (sites, bâtiments, étages, rôles)
+    READ_CACHE_MAXSIZE = env_int('READ_CACHE_MAXSIZE', 1024)
+    READ_CACHE_TTL = env_int('READ_CACHE_TTL', 300)  # secondes
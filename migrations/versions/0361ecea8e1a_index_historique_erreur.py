@@ -0,0 +1,28 @@
+"""Index composites sur historique_erreur
+
+Revision ID: 0361ecea8e1a
+Revises: db4ca2b7b39c
+Create Date: 2026-10-18 09:12:04.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0361ecea8e1a'
+down_revision = 'db4ca2b7b39c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('historique_erreur', schema=None) as batch_op:
+        batch_op.create_index('ix_historique_erreur_baes_id_timestamp', ['baes_id', 'timestamp'], unique=False)
+        batch_op.create_index('ix_historique_erreur_type_erreur_timestamp', ['type_erreur', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('historique_erreur', schema=None) as batch_op:
+        batch_op.drop_index('ix_historique_erreur_type_erreur_timestamp')
+        batch_op.drop_index('ix_historique_erreur_baes_id_timestamp')
@@ -0,0 +1,58 @@
+"""Table baes_status et index des clés étrangères de la hiérarchie
+
+Revision ID: 3908fc79b739
+Revises: a4d4517d5313
+Create Date: 2026-10-18 14:03:52.116480
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3908fc79b739'
+down_revision = 'a4d4517d5313'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('baes_status',
+    sa.Column('baes_id', sa.Integer(), nullable=False),
+    sa.Column('last_type_erreur', sa.Enum('erreur_connexion', 'erreur_batterie', name='type_erreur'), nullable=False),
+    sa.Column('last_timestamp', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('window_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('window_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['baes_id'], ['baes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('baes_id')
+    )
+    with op.batch_alter_table('baes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_baes_etage_id'), ['etage_id'], unique=False)
+    with op.batch_alter_table('etages', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_etages_batiment_id'), ['batiment_id'], unique=False)
+    with op.batch_alter_table('batiments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_batiments_site_id'), ['site_id'], unique=False)
+
+    # Dernière erreur de chaque BAES déjà présente dans l'historique ; la fenêtre de
+    # comptage repart de cette erreur
+    op.execute("""
+        INSERT INTO baes_status (baes_id, last_type_erreur, last_timestamp, window_start, window_count, updated_at)
+        SELECT h.baes_id, h.type_erreur, h.timestamp, h.timestamp, 1, CURRENT_TIMESTAMP
+        FROM historique_erreur h
+        WHERE h.id = (
+            SELECT MAX(h2.id) FROM historique_erreur h2
+            WHERE h2.baes_id = h.baes_id
+              AND h2.timestamp = (SELECT MAX(h3.timestamp) FROM historique_erreur h3 WHERE h3.baes_id = h.baes_id)
+        )
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('batiments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_batiments_site_id'))
+    with op.batch_alter_table('etages', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_etages_batiment_id'))
+    with op.batch_alter_table('baes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_baes_etage_id'))
+    op.drop_table('baes_status')
@@ -0,0 +1,45 @@
+"""Stockage des cartes par contenu : table carte_blobs, empreinte et nom d'origine sur cartes
+
+Revision ID: 5590b36a3e30
+Revises: b7b7f237aa38
+Create Date: 2026-10-18 17:02:41.318806
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5590b36a3e30'
+down_revision = 'b7b7f237aa38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('carte_blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    # Les cartes existantes gardent leur chemin (sha256 NULL) et ne sont pas comptées
+    with op.batch_alter_table('cartes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sha256', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('original_name', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('content_type', sa.String(length=100), nullable=True))
+        batch_op.create_index(batch_op.f('ix_cartes_sha256'), ['sha256'], unique=False)
+        batch_op.create_foreign_key('fk_cartes_sha256_carte_blobs', 'carte_blobs', ['sha256'], ['sha256'])
+
+
+def downgrade():
+    with op.batch_alter_table('cartes', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_cartes_sha256_carte_blobs', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_cartes_sha256'))
+        batch_op.drop_column('content_type')
+        batch_op.drop_column('original_name')
+        batch_op.drop_column('sha256')
+
+    op.drop_table('carte_blobs')
@@ -0,0 +1,40 @@
+"""Tables d'agrégats horaire et journalier de historique_erreur
+
+Revision ID: a4d4517d5313
+Revises: 0361ecea8e1a
+Create Date: 2026-10-18 10:41:27.903114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d4517d5313'
+down_revision = '0361ecea8e1a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table_name in ('historique_erreur_horaire', 'historique_erreur_journalier'):
+        op.create_table(table_name,
+        sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('baes_id', sa.Integer(), nullable=False),
+        sa.Column('type_erreur', sa.Enum('erreur_connexion', 'erreur_batterie', name='type_erreur'), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['baes_id'], ['baes.id'], ),
+        sa.PrimaryKeyConstraint('bucket', 'baes_id', 'type_erreur')
+        )
+    op.create_table('rollup_watermark',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('rollup_watermark')
+    op.drop_table('historique_erreur_journalier')
+    op.drop_table('historique_erreur_horaire')
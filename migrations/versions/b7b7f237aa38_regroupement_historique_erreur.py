@@ -0,0 +1,33 @@
+"""Regroupement des erreurs répétées : occurrences et last_seen sur historique_erreur
+
+Revision ID: b7b7f237aa38
+Revises: 3908fc79b739
+Create Date: 2026-10-18 16:25:09.640271
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7b7f237aa38'
+down_revision = '3908fc79b739'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('historique_erreur', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('occurrences', sa.Integer(), server_default='1', nullable=False))
+        batch_op.add_column(sa.Column('last_seen', sa.DateTime(timezone=True), nullable=True))
+
+    op.execute("UPDATE historique_erreur SET last_seen = timestamp")
+
+    with op.batch_alter_table('historique_erreur', schema=None) as batch_op:
+        batch_op.alter_column('last_seen', existing_type=sa.DateTime(timezone=True), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('historique_erreur', schema=None) as batch_op:
+        batch_op.drop_column('last_seen')
+        batch_op.drop_column('occurrences')
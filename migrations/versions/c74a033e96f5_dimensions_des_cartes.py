@@ -0,0 +1,31 @@
+"""Dimensions et taille des cartes normalisées à l'upload
+
+Revision ID: c74a033e96f5
+Revises: 5590b36a3e30
+Create Date: 2026-10-18 21:14:07.502193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c74a033e96f5'
+down_revision = '5590b36a3e30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # NULL pour les cartes existantes, qui ne sont pas renormalisées
+    with op.batch_alter_table('cartes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('width', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('height', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('size', sa.BigInteger(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('cartes', schema=None) as batch_op:
+        batch_op.drop_column('size')
+        batch_op.drop_column('height')
+        batch_op.drop_column('width')
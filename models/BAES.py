@@ -11,7 +11,7 @@ class Baes(TimestampMixin,db.Model):
     position = db.Column(db.JSON, nullable=False)
 
     # La clé étrangère est optionnelle (nullable=True) car une BAES ne peut pas ne pas être affectée à un étage.
-    etage_id = db.Column(db.Integer, db.ForeignKey('etages.id'), nullable=False)
+    etage_id = db.Column(db.Integer, db.ForeignKey('etages.id'), nullable=False, index=True)
     # Relation one-to-many : Une BAES a plusieurs historiques d'erreurs.
     erreurs = db.relationship('HistoriqueErreur', backref='baes', lazy=True)
 
@@ -20,7 +20,10 @@ from .batiment import Batiment
 from .role import Role
 from .site import Site
 from .carte import Carte
+from .carte_blob import CarteBlob
 from .etage import Etage
 from .baes import Baes
 from .historique_erreur import HistoriqueErreur
+from .historique_erreur_rollup import ErreurRollupHoraire, ErreurRollupJournalier, RollupWatermark
+from .baes_status import BaesStatus
 from .user import User
@@ -0,0 +1,22 @@
+from sqlalchemy import DateTime
+
+from templates.TimestampMixin import current_time
+from . import db
+from .historique_erreur import error_types
+
+
+class BaesStatus(db.Model):
+    # Dernier état connu d'une BAES, tenu à jour dans la transaction qui insère ses erreurs
+    __tablename__ = 'baes_status'
+
+    baes_id = db.Column(db.Integer, db.ForeignKey('baes.id', ondelete='CASCADE'), primary_key=True)
+    last_type_erreur = db.Column(db.Enum(*error_types, name='type_erreur'), nullable=False)
+    last_timestamp = db.Column(DateTime(timezone=True), nullable=False)
+    # Fenêtre glissante par paliers : elle démarre à la première erreur et compte les suivantes
+    # jusqu'à window_start + BAES_STATUS_WINDOW_HOURS, puis repart de l'erreur suivante
+    window_start = db.Column(DateTime(timezone=True), nullable=False)
+    window_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(DateTime(timezone=True), default=current_time, onupdate=current_time, nullable=False)
+
+    def __repr__(self):
+        return f"<BaesStatus(baes_id={self.baes_id}, last_type_erreur={self.last_type_erreur})>"
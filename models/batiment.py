@@ -11,7 +11,7 @@ class Batiment(TimestampMixin,db.Model):
     polygon_points = db.Column(db.JSON)
     name = db.Column(db.String(50), nullable=False)
     # La clé étrangère est optionnelle (nullable=True) car un bâtiment peut ne pas appartenir à un site.
-    site_id = db.Column(db.Integer, db.ForeignKey('sites.id'), nullable=True)
+    site_id = db.Column(db.Integer, db.ForeignKey('sites.id'), nullable=True, index=True)
     # Relation one-to-many : Un bâtiment a plusieurs étages.
     etages = db.relationship('Etage', backref='batiment', lazy=True)
 
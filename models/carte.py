@@ -7,6 +7,15 @@ class Carte(TimestampMixin,db.Model):
     __tablename__ = 'cartes'
     id = db.Column(db.Integer, primary_key=True)
     chemin = db.Column(db.String(255), nullable=False)
+    # Contenu adressé par empreinte (NULL pour les cartes uploadées avant le stockage par contenu)
+    sha256 = db.Column(db.String(64), db.ForeignKey('carte_blobs.sha256'), nullable=True, index=True)
+    # Nom du fichier tel qu'envoyé par le client, rendu au téléchargement
+    original_name = db.Column(db.String(255), nullable=True)
+    content_type = db.Column(db.String(100), nullable=True)
+    # Dimensions (px) et taille (octets) de l'image normalisée à l'upload
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
+    size = db.Column(db.BigInteger, nullable=True)
     # La carte peut être liée à un seul étage ou à un seul site (mais pas les deux)
     etage_id = db.Column(db.Integer, db.ForeignKey('etages.id'), nullable=True, unique=True)
     site_id = db.Column(db.Integer, db.ForeignKey('sites.id'), nullable=True, unique=True)
@@ -0,0 +1,16 @@
+from templates.TimestampMixin import TimestampMixin
+from . import db
+
+
+class CarteBlob(TimestampMixin, db.Model):
+    # Contenu d'un fichier de carte, stocké une seule fois sous son empreinte SHA-256
+    # (uploads/blobs/<2 premiers caractères>/<sha256>) et partagé par toutes les cartes identiques
+    __tablename__ = 'carte_blobs'
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    # Nombre de cartes qui référencent ce contenu : le fichier est supprimé quand il tombe à 0
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CarteBlob {self.sha256} ({self.ref_count} cartes)>"
@@ -8,7 +8,7 @@ class Etage(TimestampMixin,db.Model):
     __tablename__ = 'etages'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    batiment_id = db.Column(db.Integer, db.ForeignKey('batiments.id'), nullable=False)
+    batiment_id = db.Column(db.Integer, db.ForeignKey('batiments.id'), nullable=False, index=True)
 
     # One-to-one vers Carte via etage_id
     carte = db.relationship('Carte', backref='etage', uselist=False, foreign_keys='Carte.etage_id')
@@ -10,8 +10,18 @@ error_types = ('erreur_connexion', 'erreur_batterie')
 def current_time():
     return datetime.now(timezone.utc)
 
+
+def same_as_timestamp(context):
+    # Par défaut, la dernière occurrence est la première
+    return context.get_current_parameters().get('timestamp') or current_time()
+
 class HistoriqueErreur(TimestampMixin,db.Model):
     __tablename__ = 'historique_erreur'
+    __table_args__ = (
+        # Historique d'une BAES sur une période, et erreurs d'un type sur une période
+        db.Index('ix_historique_erreur_baes_id_timestamp', 'baes_id', 'timestamp'),
+        db.Index('ix_historique_erreur_type_erreur_timestamp', 'type_erreur', 'timestamp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     baes_id = db.Column(db.Integer, db.ForeignKey('baes.id'), nullable=False)
@@ -22,6 +32,10 @@ class HistoriqueErreur(TimestampMixin,db.Model):
         default=current_time,
         nullable=False
     )
+    # Regroupement des erreurs répétées (ERREURS_COALESCE_WINDOW_SECONDS) : nombre d'événements
+    # représentés par la ligne et horodatage du dernier d'entre eux
+    occurrences = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    last_seen = db.Column(DateTime(timezone=True), default=same_as_timestamp, nullable=False)
 
     def __repr__(self):
         return f"<HistoriqueErreur(baes_id={self.baes_id}, type_erreur={self.type_erreur}, timestamp={self.timestamp})>"
@@ -0,0 +1,43 @@
+from sqlalchemy import DateTime
+
+from templates.TimestampMixin import current_time
+from . import db
+from .historique_erreur import error_types
+
+# Nom de la ligne de rollup_watermark suivie par l'agrégation de historique_erreur
+HISTORIQUE_WATERMARK = 'historique_erreur'
+
+
+class RollupMixin:
+    # Nombre d'erreurs d'un type pour une BAES sur un intervalle (début de l'intervalle en UTC).
+    # La clé commence par bucket : les lectures du tableau de bord filtrent sur une période.
+    bucket = db.Column(DateTime(timezone=True), primary_key=True)
+    baes_id = db.Column(db.Integer, db.ForeignKey('baes.id'), primary_key=True)
+    type_erreur = db.Column(db.Enum(*error_types, name='type_erreur'), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ErreurRollupHoraire(RollupMixin, db.Model):
+    __tablename__ = 'historique_erreur_horaire'
+
+    def __repr__(self):
+        return f"<ErreurRollupHoraire(baes_id={self.baes_id}, bucket={self.bucket}, count={self.count})>"
+
+
+class ErreurRollupJournalier(RollupMixin, db.Model):
+    __tablename__ = 'historique_erreur_journalier'
+
+    def __repr__(self):
+        return f"<ErreurRollupJournalier(baes_id={self.baes_id}, bucket={self.bucket}, count={self.count})>"
+
+
+class RollupWatermark(db.Model):
+    # Dernier ID de historique_erreur intégré aux agrégats (une ligne par traitement)
+    __tablename__ = 'rollup_watermark'
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(DateTime(timezone=True), default=current_time, onupdate=current_time, nullable=False)
+
+    def __repr__(self):
+        return f"<RollupWatermark {self.name}={self.last_id}>"
@@ -11,6 +11,8 @@ from .user_routes import user_bp
 from .user_site_routes import user_site_bp
 from .baes_routes import baes_bp
 from .historique_erreur_routes import historique_erreur_bp
+from .cache_routes import cache_bp
+from .analytics_routes import analytics_bp
 
 
 
@@ -25,4 +27,6 @@ def init_app(app):
     app.register_blueprint(site_carte_bp, url_prefix='/sites/carte')  # Pour la relation one-to-one site-carte
     app.register_blueprint(user_role_bp, url_prefix='/role/users') # Préfixe modifié pour éviter conflit
     app.register_blueprint(baes_bp, url_prefix='/baes')
-    app.register_blueprint(historique_erreur_bp, url_prefix='/erreurs')
\ No newline at end of file
+    app.register_blueprint(historique_erreur_bp, url_prefix='/erreurs')
+    app.register_blueprint(cache_bp, url_prefix='/cache')
+    app.register_blueprint(analytics_bp, url_prefix='/analytics')
\ No newline at end of file
@@ -0,0 +1,135 @@
+# routes/analytics_routes.py
+from flask import Blueprint, jsonify, current_app
+from flasgger import swag_from
+
+from services.erreurs import FilterError
+
+
+analytics_bp = Blueprint('analytics_bp', __name__)
+
+INDICATORS_PROPERTIES = {
+    'failures': {'type': 'integer', 'example': 3, 'description': "Nombre d'incidents."},
+    'errors': {
+        'type': 'object',
+        'example': {'erreur_connexion': 5, 'erreur_batterie': 1},
+        'description': "Occurrences d'erreurs par type."
+    },
+    'downtime_hours': {'type': 'number', 'example': 74.5},
+    'availability': {'type': 'number', 'example': 89.653, 'description': 'Disponibilité en pourcentage.'},
+    'mtbf_hours': {'type': 'number', 'example': 215.17, 'description': 'Temps de fonctionnement moyen entre pannes.'},
+    'mean_interval_hours': {'type': 'number', 'example': 240.0, 'description': "Écart moyen entre débuts d'incidents."}
+}
+
+@analytics_bp.route('/reliability', methods=['GET'])
+@swag_from({
+    'tags': ['Analytique'],
+    'description': "MTBF, disponibilité et temps d'arrêt des BAES d'un site, bâtiment ou étage sur une période "
+                   "(30 derniers jours par défaut), par BAES, par étage, par bâtiment et pour tout le périmètre. "
+                   "Les erreurs successives d'une BAES forment un incident tant qu'elles se suivent à moins de "
+                   "ANALYTICS_RECOVERY_HOURS ; l'incident dure de sa première erreur à sa dernière occurrence "
+                   "+ ANALYTICS_RECOVERY_HOURS. Calcul vectorisé avec NumPy.",
+    'parameters': [
+        {
+            'name': 'scope',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['site', 'batiment', 'etage'],
+            'required': True,
+            'description': 'Niveau du périmètre.'
+        },
+        {
+            'name': 'id',
+            'in': 'query',
+            'type': 'integer',
+            'required': True,
+            'description': 'ID du site, du bâtiment ou de l\'étage.'
+        },
+        {
+            'name': 'from',
+            'in': 'query',
+            'type': 'string',
+            'format': 'date-time',
+            'required': False,
+            'description': 'Début de la période, date ISO 8601 ; par défaut 30 jours avant to.'
+        },
+        {
+            'name': 'to',
+            'in': 'query',
+            'type': 'string',
+            'format': 'date-time',
+            'required': False,
+            'description': 'Fin de la période, date ISO 8601 ; par défaut maintenant.'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Indicateurs de fiabilité.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'scope': {'type': 'string', 'example': 'site'},
+                    'id': {'type': 'integer', 'example': 1},
+                    'from': {'type': 'string', 'format': 'date-time'},
+                    'to': {'type': 'string', 'format': 'date-time'},
+                    'recovery_hours': {'type': 'number', 'example': 24},
+                    'baes': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': dict(
+                                {'baes_id': {'type': 'integer'}, 'etage_id': {'type': 'integer'}},
+                                **INDICATORS_PROPERTIES
+                            )
+                        }
+                    },
+                    'etages': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': dict(
+                                {'id': {'type': 'integer'}, 'baes_count': {'type': 'integer'}},
+                                **INDICATORS_PROPERTIES
+                            )
+                        }
+                    },
+                    'batiments': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': dict(
+                                {'id': {'type': 'integer'}, 'baes_count': {'type': 'integer'}},
+                                **INDICATORS_PROPERTIES
+                            )
+                        }
+                    },
+                    'summary': {
+                        'type': 'object',
+                        'properties': dict({'baes_count': {'type': 'integer'}}, **INDICATORS_PROPERTIES)
+                    }
+                }
+            }
+        },
+        400: {'description': 'Paramètres invalides.'},
+        404: {'description': 'Aucune BAES dans ce périmètre.'},
+        501: {'description': "NumPy n'est pas installé."},
+        500: {'description': 'Erreur interne.'}
+    }
+})
+def get_reliability():
+    try:
+        # NumPy n'est chargé qu'à la première requête d'analytique
+        from services.analytics import get_reliability_args, reliability
+    except ImportError as e:
+        current_app.logger.error(f"Error in get_reliability: {e}")
+        return jsonify({'error': "Le module d'analytique nécessite NumPy (pip install numpy)"}), 501
+    try:
+        scope, scope_id, start, end = get_reliability_args()
+        result = reliability(scope, scope_id, start, end)
+        if result is None:
+            return jsonify({'error': 'Aucune BAES dans ce périmètre'}), 404
+        return jsonify(result), 200
+    except FilterError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error in get_reliability: {e}")
+        return jsonify({'error': str(e)}), 500
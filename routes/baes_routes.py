@@ -1,8 +1,133 @@
 # routes/baes_routes.py
 from flask import Blueprint, request, jsonify, current_app
 from flasgger import swag_from
-from models.batiment import Batiment
+from models.baes import Baes
+from models.etage import Etage
 from models import db
+from utils.bulk import (
+    BULK_RESPONSES, BULK_UPDATE_RESPONSES, BulkError, Field, bulk_insert, bulk_response, bulk_update,
+    bulk_update_response, check_existing_ids, check_foreign_key, existing_values, get_bulk_items, validate_items,
+    validate_updates, value_owners
+)
 
 
-baes_bp = Blueprint('baes_bp', __name__)
\ No newline at end of file
+baes_bp = Blueprint('baes_bp', __name__)
+
+BAES_BULK_FIELDS = [
+    Field('name', str, required=True, max_length=50),
+    Field('position', (dict, list), required=True),
+    Field('etage_id', int, required=True)
+]
+
+@baes_bp.route('/bulk', methods=['POST'])
+@swag_from({
+    'tags': ['BAES'],
+    'description': "Crée plusieurs BAES en une seule transaction (un seul executemany). "
+                   "Les éléments invalides (champ manquant, étage inconnu, nom déjà utilisé) sont ignorés et signalés ; "
+                   "les IDs sont renvoyés dans l'ordre du tableau reçu.",
+    'consumes': ['application/json'],
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'name': {'type': 'string', 'example': 'BAES 1'},
+                        'position': {'type': 'object', 'example': {'x': 120, 'y': 45}},
+                        'etage_id': {'type': 'integer', 'example': 1}
+                    },
+                    'required': ['name', 'position', 'etage_id']
+                }
+            }
+        }
+    ],
+    'responses': BULK_RESPONSES
+})
+def create_baes_bulk():
+    try:
+        items = get_bulk_items()
+        rows, errors = validate_items(items, BAES_BULK_FIELDS)
+        check_foreign_key(rows, errors, 'etage_id', Etage.id, 'Étage non trouvé')
+
+        # Le nom d'une BAES est unique : doublons dans le tableau et noms déjà en base
+        taken = existing_values(Baes.name, [row['name'] for row in rows.values()])
+        for index in list(rows):
+            name = rows[index]['name']
+            if name in taken:
+                del rows[index]
+                errors.append({'index': index, 'error': f'Le nom {name} est déjà utilisé'})
+            else:
+                taken.add(name)
+
+        ids = bulk_insert(Baes, list(rows.values()))
+        db.session.commit()
+        return bulk_response(len(items), rows, ids, errors)
+    except BulkError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in create_baes_bulk: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@baes_bp.route('/bulk', methods=['PUT'])
+@swag_from({
+    'tags': ['BAES'],
+    'description': "Met à jour plusieurs BAES en une seule transaction. Chaque élément contient l'ID "
+                   "et les seuls champs à modifier ; les éléments invalides sont ignorés et signalés.",
+    'consumes': ['application/json'],
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'id': {'type': 'integer', 'example': 1},
+                        'name': {'type': 'string', 'example': 'BAES-42'},
+                        'position': {'type': 'object', 'example': {'x': 120, 'y': 48}},
+                        'etage_id': {'type': 'integer', 'example': 3}
+                    },
+                    'required': ['id']
+                }
+            }
+        }
+    ],
+    'responses': BULK_UPDATE_RESPONSES
+})
+def update_baes_bulk():
+    try:
+        items = get_bulk_items()
+        rows, errors = validate_updates(items, BAES_BULK_FIELDS)
+        check_existing_ids(Baes, rows, errors, 'BAES non trouvée')
+        check_foreign_key(rows, errors, 'etage_id', Etage.id, 'Étage non trouvé')
+
+        # Le nom d'une BAES est unique : un nouveau nom ne doit appartenir ni à une autre BAES
+        # en base, ni à un autre élément du tableau
+        owners = value_owners(Baes.name, Baes.id, [row['name'] for row in rows.values() if 'name' in row])
+        claimed = set()
+        for index in list(rows):
+            name = rows[index].get('name')
+            if name is None:
+                continue
+            if owners.get(name, rows[index]['id']) != rows[index]['id'] or name in claimed:
+                del rows[index]
+                errors.append({'index': index, 'error': f'Le nom {name} est déjà utilisé'})
+            else:
+                claimed.add(name)
+
+        bulk_update(Baes, list(rows.values()))
+        db.session.commit()
+        return bulk_update_response(len(items), rows, errors)
+    except BulkError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in update_baes_bulk: {e}")
+        return jsonify({'error': str(e)}), 500
@@ -2,44 +2,60 @@
 from flask import Blueprint, request, jsonify, current_app
 from flasgger import swag_from
 from models.batiment import Batiment
+from models.site import Site
 from models import db
+from utils.bulk import (
+    BULK_RESPONSES, BULK_UPDATE_RESPONSES, BulkError, Field, bulk_insert, bulk_response, bulk_update,
+    bulk_update_response, check_existing_ids, check_foreign_key, get_bulk_items, validate_items, validate_updates
+)
+from utils.cache import cached
+from utils.conditional import conditional_collection
+from utils.pagination import PAGINATION_PARAMETERS, PaginationError, paginate, paginated_schema
+from utils.streaming import STREAM_PARAMETER, StreamFormatError, get_stream_format, stream_query
+from utils.serializers import batiment_serializer
 
 
 batiment_bp = Blueprint('batiment_bp', __name__)
 
+BATIMENT_BULK_FIELDS = [
+    Field('name', str, required=True, max_length=50),
+    Field('polygon_points', (dict, list)),
+    Field('site_id', int)
+]
+
+
 @batiment_bp.route('/', methods=['GET'])
 @swag_from({
     'tags': ['Batiment CRUD'],
-    'description': 'Récupère la liste de tous les bâtiments.',
+    'description': "Récupère la liste paginée des bâtiments (pagination par curseur sur l'ID).",
+    'parameters': PAGINATION_PARAMETERS + [STREAM_PARAMETER],
     'responses': {
         200: {
-            'description': 'Liste des bâtiments.',
-            'schema': {
-                'type': 'array',
-                'items': {
-                    'type': 'object',
-                    'properties': {
-                        'id': {'type': 'integer', 'example': 1},
-                        'name': {'type': 'string', 'example': 'Batiment 1'},
-                        'polygon_points': {'type': 'object'},
-                        'site_id': {'type': 'integer', 'example': 1}
-                    }
-                }
-            }
+            'description': 'Page de bâtiments.',
+            'schema': paginated_schema({
+                'id': {'type': 'integer', 'example': 1},
+                'name': {'type': 'string', 'example': 'Batiment 1'},
+                'polygon_points': {'type': 'object'},
+                'site_id': {'type': 'integer', 'example': 1}
+            })
         },
+        304: {'description': 'Collection inchangée depuis If-None-Match / If-Modified-Since.'},
+        400: {'description': 'Paramètres de pagination ou de flux invalides.'},
         500: {'description': 'Erreur interne.'}
     }
 })
+@conditional_collection(Batiment)
+@cached(Batiment)
 def get_batiments():
     try:
-        batiments = Batiment.query.all()
-        result = [{
-            'id': b.id,
-            'name': b.name,
-            'polygon_points': b.polygon_points,
-            'site_id': b.site_id
-        } for b in batiments]
-        return jsonify(result), 200
+        stream_format = get_stream_format()
+        if stream_format:
+            return stream_query(batiment_serializer.select().order_by(Batiment.id), batiment_serializer.dump, stream_format)
+        batiments, next_cursor = paginate(batiment_serializer.select(), Batiment.id)
+        result = [batiment_serializer.dump(b) for b in batiments]
+        return jsonify({'items': result, 'next': next_cursor}), 200
+    except (PaginationError, StreamFormatError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in get_batiments: {e}")
         return jsonify({'error': str(e)}), 500
@@ -73,17 +89,12 @@ def get_batiments():
         404: {'description': "Bâtiment non trouvé."}
     }
 })
+@cached(Batiment)
 def get_batiment(batiment_id):
     try:
-        batiment = Batiment.query.get(batiment_id)
-        if not batiment:
+        result = batiment_serializer.get(batiment_id)
+        if not result:
             return jsonify({'error': 'Bâtiment non trouvé'}), 404
-        result = {
-            'id': batiment.id,
-            'name': batiment.name,
-            'polygon_points': batiment.polygon_points,
-            'site_id': batiment.site_id
-        }
         return jsonify(result), 200
     except Exception as e:
         current_app.logger.error(f"Error in get_batiment: {e}")
@@ -138,12 +149,7 @@ def create_batiment():
         )
         db.session.add(batiment)
         db.session.commit()
-        result = {
-            'id': batiment.id,
-            'name': batiment.name,
-            'polygon_points': batiment.polygon_points,
-            'site_id': batiment.site_id
-        }
+        result = batiment_serializer.dump(batiment)
         return jsonify(result), 201
     except Exception as e:
         db.session.rollback()
@@ -206,12 +212,7 @@ def update_batiment(batiment_id):
         if 'site_id' in data:
             batiment.site_id = data['site_id']
         db.session.commit()
-        result = {
-            'id': batiment.id,
-            'name': batiment.name,
-            'polygon_points': batiment.polygon_points,
-            'site_id': batiment.site_id
-        }
+        result = batiment_serializer.dump(batiment)
         return jsonify(result), 200
     except Exception as e:
         db.session.rollback()
@@ -256,3 +257,89 @@ def delete_batiment(batiment_id):
         db.session.rollback()
         current_app.logger.error(f"Error in delete_batiment: {e}")
         return jsonify({'error': str(e)}), 500
+
+@batiment_bp.route('/bulk', methods=['POST'])
+@swag_from({
+    'tags': ['Batiment CRUD'],
+    'description': "Crée plusieurs bâtiments en une seule transaction (un seul executemany). "
+                   "Les éléments invalides sont ignorés et signalés ; les IDs sont renvoyés dans l'ordre du tableau reçu.",
+    'consumes': ['application/json'],
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'name': {'type': 'string', 'example': 'Batiment 1'},
+                        'polygon_points': {'type': 'object', 'example': {"points": [[0,0],[1,1]]}},
+                        'site_id': {'type': 'integer', 'example': 1}
+                    },
+                    'required': ['name']
+                }
+            }
+        }
+    ],
+    'responses': BULK_RESPONSES
+})
+def create_batiments_bulk():
+    try:
+        items = get_bulk_items()
+        rows, errors = validate_items(items, BATIMENT_BULK_FIELDS)
+        check_foreign_key(rows, errors, 'site_id', Site.id, 'Site non trouvé')
+        ids = bulk_insert(Batiment, list(rows.values()))
+        db.session.commit()
+        return bulk_response(len(items), rows, ids, errors)
+    except BulkError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in create_batiments_bulk: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@batiment_bp.route('/bulk', methods=['PUT'])
+@swag_from({
+    'tags': ['Batiment CRUD'],
+    'description': "Met à jour plusieurs bâtiments en une seule transaction. Chaque élément contient l'ID "
+                   "et les seuls champs à modifier ; les éléments invalides sont ignorés et signalés.",
+    'consumes': ['application/json'],
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'id': {'type': 'integer', 'example': 1},
+                        'name': {'type': 'string', 'example': 'Batiment A'},
+                        'polygon_points': {'type': 'object', 'example': {"points": [[0,0],[1,1]]}},
+                        'site_id': {'type': 'integer', 'example': 2}
+                    },
+                    'required': ['id']
+                }
+            }
+        }
+    ],
+    'responses': BULK_UPDATE_RESPONSES
+})
+def update_batiments_bulk():
+    try:
+        items = get_bulk_items()
+        rows, errors = validate_updates(items, BATIMENT_BULK_FIELDS)
+        check_existing_ids(Batiment, rows, errors, 'Bâtiment non trouvé')
+        check_foreign_key(rows, errors, 'site_id', Site.id, 'Site non trouvé')
+        bulk_update(Batiment, list(rows.values()))
+        db.session.commit()
+        return bulk_update_response(len(items), rows, errors)
+    except BulkError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in update_batiments_bulk: {e}")
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,31 @@
+# routes/cache_routes.py
+from flask import Blueprint, jsonify
+from flasgger import swag_from
+from utils.cache import read_cache
+
+cache_bp = Blueprint('cache_bp', __name__)
+
+@cache_bp.route('/stats', methods=['GET'])
+@swag_from({
+    'tags': ['Monitoring'],
+    'description': "Statistiques du cache de lecture en mémoire (propres au processus qui répond).",
+    'responses': {
+        200: {
+            'description': 'Compteurs du cache.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'size': {'type': 'integer', 'example': 42},
+                    'maxsize': {'type': 'integer', 'example': 1024},
+                    'ttl': {'type': 'integer', 'example': 300},
+                    'hits': {'type': 'integer', 'example': 1250},
+                    'misses': {'type': 'integer', 'example': 80},
+                    'hit_ratio': {'type': 'number', 'example': 0.9398},
+                    'invalidations': {'type': 'integer', 'example': 12}
+                }
+            }
+        }
+    }
+})
+def get_cache_stats():
+    return jsonify(read_cache.stats()), 200
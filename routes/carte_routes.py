@@ -1,15 +1,117 @@
 # routes/carte_routes.py
 import os
 from flask import Blueprint, request, jsonify, current_app, send_from_directory
-from werkzeug.utils import secure_filename
+from sqlalchemy import select
+from flasgger import swag_from
 from models.carte import Carte
+from models.etage import Etage
+from models.site import Site
 from models import db
+from services.blobs import remove_carte, store_carte
+from services.tiles import TILE_FORMATS, level_size, read_tile_info, tile_builder, tile_path
+from services.uploads import (
+    UPLOAD_CHUNK_SIZE, UPLOAD_EXPIRY_HOURS, UPLOAD_MAX_SIZE, OffsetMismatch, UploadError, UploadNotFound,
+    abort_upload, append_chunk, complete_upload, finalize_upload, init_upload, purge_expired, read_metadata
+)
+from utils.conditional import send_immutable_file
 
 carte_bp = Blueprint('carte_bp', __name__)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
+def get_relation_ids(values):
+    """etage_id / site_id optionnels de l'upload (la carte est alors assignée directement)."""
+    relations = {}
+    for field in ('etage_id', 'site_id'):
+        value = values.get(field)
+        if value:
+            try:
+                relations[field] = int(value)
+            except ValueError:
+                raise ValueError(f'Le champ {field} doit être un entier')
+    return relations
+
+def check_carte_target(relations):
+    """
+    Cible d'un upload par morceaux : exactement un étage ou un site, existant et encore
+    sans carte, pour ne pas découvrir l'erreur au commit, après le transfert.
+    Retourne une réponse d'erreur, ou None.
+    """
+    if len(relations) != 1:
+        return jsonify({'error': 'Un seul des champs etage_id ou site_id est requis'}), 400
+    (field, target_id), = relations.items()
+    model, label = (Etage, 'Étage') if field == 'etage_id' else (Site, 'Site')
+    if db.session.get(model, target_id) is None:
+        return jsonify({'error': f'{label} non trouvé'}), 404
+    if db.session.query(Carte.id).filter_by(**relations).first() is not None:
+        return jsonify({'error': f'{label} déjà associé à une carte'}), 409
+    return None
+
+def dump_uploaded(carte, existing):
+    return {
+        'message': 'Fichier uploadé avec succès',
+        'id': carte.id,
+        'chemin': carte.chemin,
+        'sha256': carte.sha256,
+        'original_name': carte.original_name,
+        'width': carte.width,
+        'height': carte.height,
+        'size': carte.size,
+        'deduplicated': existing
+    }
+
+UPLOADED_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'message': {'type': 'string', 'example': 'Fichier uploadé avec succès'},
+        'id': {'type': 'integer', 'example': 1},
+        'chemin': {'type': 'string', 'example': 'uploads/blobs/9f/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08'},
+        'sha256': {'type': 'string', 'example': '9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08'},
+        'original_name': {'type': 'string', 'example': 'plan.jpg'},
+        'width': {'type': 'integer', 'example': 4032},
+        'height': {'type': 'integer', 'example': 3024},
+        'size': {'type': 'integer', 'description': 'Taille en octets après normalisation', 'example': 1843200},
+        'deduplicated': {'type': 'boolean', 'example': False}
+    }
+}
+
+UPLOAD_STATUS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'upload_id': {'type': 'string', 'example': '3f2a9c0d4b6e4e1f9a7c2b8d5e6f7a81'},
+        'filename': {'type': 'string', 'example': 'plan_rdc.png'},
+        'size': {'type': 'integer', 'example': 157286400},
+        'offset': {'type': 'integer', 'example': 41943040, 'description': 'Octets déjà reçus : reprendre à cet offset.'},
+        'chunk_size': {'type': 'integer', 'example': 8388608, 'description': 'Taille de morceau conseillée.'}
+    }
+}
+
+UPLOAD_ID_PARAMETER = {
+    'name': 'upload_id',
+    'in': 'path',
+    'type': 'string',
+    'required': True,
+    'description': "ID renvoyé à l'ouverture de l'upload"
+}
+
+def upload_config():
+    config = current_app.config
+    # Un morceau est un corps de requête : il reste sous MAX_CONTENT_LENGTH
+    chunk_size = config.get('CARTE_UPLOAD_CHUNK_SIZE', UPLOAD_CHUNK_SIZE)
+    if config.get('MAX_CONTENT_LENGTH'):
+        chunk_size = min(chunk_size, config['MAX_CONTENT_LENGTH'])
+    return config['UPLOAD_FOLDER'], chunk_size
+
+def dump_upload_status(metadata, chunk_size):
+    return {
+        'upload_id': metadata['upload_id'],
+        'filename': metadata['filename'],
+        'size': metadata['size'],
+        'offset': metadata['offset'],
+        'chunk_size': chunk_size
+    }
+
 @carte_bp.route('/upload-carte', methods=['POST'])
 def upload_carte():
     # Vérifier que le fichier est présent dans la requête
@@ -21,29 +123,380 @@ def upload_carte():
         return jsonify({'error': 'Nom de fichier vide'}), 400
 
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        # Créer le dossier si nécessaire
-        os.makedirs(upload_folder, exist_ok=True)
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
-
-        # Enregistrer le chemin dans la base de données
-        carte = Carte(chemin=file_path)
-        db.session.add(carte)
-        db.session.commit()
+        try:
+            relations = get_relation_ids(request.form)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        try:
+            # Fichier stocké sous l'empreinte SHA-256 de son contenu : deux plans de même nom ne
+            # s'écrasent plus et un même plan envoyé pour plusieurs étages n'est stocké qu'une fois
+            carte, existing = store_carte(file, current_app.config['UPLOAD_FOLDER'], **relations)
+            db.session.commit()
+            tile_builder.submit(current_app._get_current_object(), carte.sha256, carte.chemin)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error in upload_carte: {e}")
+            return jsonify({'error': str(e)}), 500
 
-        return jsonify({'message': 'Fichier uploadé avec succès', 'chemin': file_path}), 200
+        return jsonify(dump_uploaded(carte, existing)), 200
 
     return jsonify({'error': 'Extension de fichier non autorisée'}), 400
 
 @carte_bp.route('/download-carte/<int:carte_id>', methods=['GET'])
 def download_carte(carte_id):
-    # Récupérer l'enregistrement correspondant à la carte
-    carte = Carte.query.get(carte_id)
+    # Récupérer l'enregistrement correspondant à la carte (colonnes utiles seulement)
+    carte = db.session.execute(
+        select(Carte.chemin, Carte.sha256, Carte.original_name, Carte.content_type).where(Carte.id == carte_id)
+    ).first()
     if not carte:
         return jsonify({'error': 'Carte non trouvée'}), 404
 
+    if carte.sha256 is not None:
+        # Contenu adressé par empreinte : l'ETag fort est l'empreinte elle-même, et le contenu
+        # d'une carte ne change jamais (cache immutable, 304 sans lire le fichier)
+        if not current_app.config.get('X_ACCEL_REDIRECT_PREFIX') and not os.path.exists(carte.chemin):
+            return jsonify({'error': 'Fichier de la carte introuvable'}), 404
+        return send_immutable_file(carte.chemin, carte.content_type, carte.sha256, carte.original_name)
+
     # Extraire le nom du fichier à partir du chemin stocké
     filename = os.path.basename(carte.chemin)
     return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
+
+@carte_bp.route('/<int:carte_id>', methods=['DELETE'])
+@swag_from({
+    'tags': ['Carte Operations'],
+    'description': "Supprime une carte. Son fichier n'est effacé que si aucune autre carte ne partage "
+                   "le même contenu (compteur de références).",
+    'parameters': [
+        {
+            'name': 'carte_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'ID de la carte à supprimer'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Carte supprimée avec succès.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'message': {'type': 'string', 'example': 'Carte supprimée avec succès'}
+                }
+            }
+        },
+        404: {'description': 'Carte non trouvée.'},
+        500: {'description': 'Erreur interne.'}
+    }
+})
+def delete_carte(carte_id):
+    try:
+        carte = Carte.query.get(carte_id)
+        if not carte:
+            return jsonify({'error': 'Carte non trouvée'}), 404
+        remove_carte(carte, current_app.config['UPLOAD_FOLDER'])
+        return jsonify({'message': 'Carte supprimée avec succès'}), 200
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in delete_carte: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@carte_bp.route('/uploads', methods=['POST'])
+@swag_from({
+    'tags': ['Carte Operations'],
+    'description': "Ouvre un upload par morceaux (plans volumineux). Le client envoie ensuite les morceaux "
+                   "(PUT /cartes/uploads/<upload_id>?offset=), peut reprendre après une coupure à l'offset "
+                   "renvoyé par GET, puis finalise : l'empreinte SHA-256 annoncée est vérifiée et la carte "
+                   "n'est créée qu'à ce moment. La carte est assignée à un étage ou à un site (un seul des "
+                   "deux), vérifié dès l'ouverture.",
+    'consumes': ['application/json'],
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'filename': {'type': 'string', 'example': 'plan_rdc.png'},
+                    'size': {'type': 'integer', 'example': 157286400},
+                    'sha256': {'type': 'string', 'example': '9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08'},
+                    'etage_id': {'type': 'integer', 'example': 1},
+                    'site_id': {'type': 'integer'}
+                },
+                'required': ['filename', 'size', 'sha256']
+            }
+        }
+    ],
+    'responses': {
+        201: {'description': 'Upload ouvert.', 'schema': UPLOAD_STATUS_SCHEMA},
+        400: {'description': 'Champ manquant ou invalide, extension non autorisée ou fichier trop volumineux.'},
+        404: {'description': 'Étage ou site non trouvé.'},
+        409: {'description': "L'étage ou le site a déjà une carte."},
+        500: {'description': 'Erreur interne.'}
+    }
+})
+def open_upload():
+    try:
+        data = request.get_json(silent=True)
+        if not data or not data.get('filename'):
+            return jsonify({'error': 'Le champ "filename" est requis'}), 400
+        if not allowed_file(data['filename']):
+            return jsonify({'error': 'Extension de fichier non autorisée'}), 400
+        relations = get_relation_ids(data)
+        error = check_carte_target(relations)
+        if error:
+            return error
+        upload_folder, chunk_size = upload_config()
+        purge_expired(upload_folder, current_app.config.get('CARTE_UPLOAD_EXPIRY_HOURS', UPLOAD_EXPIRY_HOURS))
+        metadata = init_upload(
+            upload_folder, data['filename'], data.get('size'), data.get('sha256'),
+            current_app.config.get('CARTE_UPLOAD_MAX_SIZE', UPLOAD_MAX_SIZE),
+            **relations
+        )
+        return jsonify(dump_upload_status(metadata, chunk_size)), 201
+    except (UploadError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error in open_upload: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@carte_bp.route('/uploads/<upload_id>', methods=['GET'])
+@swag_from({
+    'tags': ['Carte Operations'],
+    'description': "État d'un upload par morceaux : 'offset' indique où reprendre après une coupure.",
+    'parameters': [UPLOAD_ID_PARAMETER],
+    'responses': {
+        200: {'description': "État de l'upload.", 'schema': UPLOAD_STATUS_SCHEMA},
+        404: {'description': 'Upload inconnu, expiré ou déjà finalisé.'}
+    }
+})
+def get_upload(upload_id):
+    try:
+        upload_folder, chunk_size = upload_config()
+        return jsonify(dump_upload_status(read_metadata(upload_folder, upload_id), chunk_size)), 200
+    except UploadNotFound:
+        return jsonify({'error': 'Upload non trouvé'}), 404
+    except Exception as e:
+        current_app.logger.error(f"Error in get_upload: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@carte_bp.route('/uploads/<upload_id>', methods=['PUT'])
+@swag_from({
+    'tags': ['Carte Operations'],
+    'description': "Envoie un morceau (corps brut application/octet-stream) à la position 'offset', qui doit "
+                   "être égale au nombre d'octets déjà reçus. Le morceau est écrit par blocs, sans être "
+                   "gardé en mémoire.",
+    'consumes': ['application/octet-stream'],
+    'parameters': [
+        UPLOAD_ID_PARAMETER,
+        {
+            'name': 'offset',
+            'in': 'query',
+            'type': 'integer',
+            'required': True,
+            'description': 'Position du morceau dans le fichier'
+        },
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {'type': 'string', 'format': 'binary'}
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Morceau reçu.',
+            'schema': {'type': 'object', 'properties': {'offset': {'type': 'integer', 'example': 50331648}}}
+        },
+        400: {'description': 'Offset manquant ou morceau dépassant la taille annoncée.'},
+        404: {'description': 'Upload inconnu, expiré ou déjà finalisé.'},
+        409: {
+            'description': "L'offset ne correspond pas aux données reçues ; reprendre à l'offset renvoyé.",
+            'schema': {'type': 'object', 'properties': {'offset': {'type': 'integer', 'example': 41943040}}}
+        },
+        500: {'description': 'Erreur interne.'}
+    }
+})
+def put_upload_chunk(upload_id):
+    try:
+        offset = request.args.get('offset', type=int)
+        if offset is None:
+            return jsonify({'error': 'Le paramètre offset est requis et doit être un entier'}), 400
+        upload_folder, _ = upload_config()
+        return jsonify({'offset': append_chunk(upload_folder, upload_id, offset, request.stream)}), 200
+    except UploadNotFound:
+        return jsonify({'error': 'Upload non trouvé'}), 404
+    except OffsetMismatch as e:
+        return jsonify({'error': str(e), 'offset': e.offset}), 409
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error in put_upload_chunk: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@carte_bp.route('/uploads/<upload_id>/finalize', methods=['POST'])
+@swag_from({
+    'tags': ['Carte Operations'],
+    'description': "Termine un upload par morceaux : vérifie la taille et l'empreinte SHA-256 annoncées, "
+                   "puis crée la carte (contenu dédupliqué comme pour /cartes/upload-carte). "
+                   "Si l'empreinte ne correspond pas, l'upload est supprimé. En cas d'échec de la création "
+                   "(par exemple, une carte assignée entre-temps à l'étage), l'upload est gardé : "
+                   "la finalisation peut être relancée sans renvoyer le fichier.",
+    'parameters': [UPLOAD_ID_PARAMETER],
+    'responses': {
+        200: {'description': 'Carte créée.', 'schema': UPLOADED_SCHEMA},
+        400: {'description': 'Upload incomplet ou empreinte invalide.'},
+        404: {'description': 'Upload inconnu, expiré ou déjà finalisé, ou étage ou site non trouvé.'},
+        409: {'description': "L'étage ou le site a déjà une carte."},
+        500: {'description': 'Erreur interne.'}
+    }
+})
+def finalize_carte_upload(upload_id):
+    try:
+        upload_folder, _ = upload_config()
+        # Cible revérifiée : une carte a pu lui être assignée depuis l'ouverture
+        error = check_carte_target(read_metadata(upload_folder, upload_id)['relations'])
+        if error:
+            return error
+        carte, existing = finalize_upload(upload_folder, upload_id)
+        db.session.commit()
+        complete_upload(upload_folder, upload_id)
+        tile_builder.submit(current_app._get_current_object(), carte.sha256, carte.chemin)
+        return jsonify(dump_uploaded(carte, existing)), 200
+    except UploadNotFound:
+        return jsonify({'error': 'Upload non trouvé'}), 404
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in finalize_carte_upload: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@carte_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@swag_from({
+    'tags': ['Carte Operations'],
+    'description': 'Abandonne un upload par morceaux et supprime les données reçues.',
+    'parameters': [UPLOAD_ID_PARAMETER],
+    'responses': {
+        200: {'description': 'Upload abandonné.'},
+        404: {'description': 'Upload inconnu, expiré ou déjà finalisé.'}
+    }
+})
+def delete_upload(upload_id):
+    try:
+        upload_folder, _ = upload_config()
+        read_metadata(upload_folder, upload_id)
+        abort_upload(upload_folder, upload_id)
+        return jsonify({'message': 'Upload abandonné'}), 200
+    except UploadNotFound:
+        return jsonify({'error': 'Upload non trouvé'}), 404
+    except Exception as e:
+        current_app.logger.error(f"Error in delete_upload: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def get_tile_info(carte_id):
+    """
+    (empreinte, description de la pyramide) d'une carte, ou une réponse d'erreur : 404 si la
+    carte n'existe pas ou n'a pas de contenu adressé, 503 tant que la pyramide se construit
+    (la construction est relancée si aucune n'est en cours, par exemple après un redémarrage).
+    """
+    row = db.session.execute(select(Carte.sha256, Carte.chemin).where(Carte.id == carte_id)).first()
+    if row is None:
+        return None, (jsonify({'error': 'Carte non trouvée'}), 404)
+    if row.sha256 is None:
+        return None, (jsonify({'error': "Carte uploadée avant le stockage par contenu : pas de tuiles"}), 404)
+    info = read_tile_info(current_app.config['UPLOAD_FOLDER'], row.sha256)
+    if info is None:
+        if tile_builder.failed(row.sha256):
+            return None, (jsonify({'error': 'Tuiles indisponibles : image illisible'}), 404)
+        if not tile_builder.pending(row.sha256) and os.path.exists(row.chemin):
+            tile_builder.submit(current_app._get_current_object(), row.sha256, row.chemin)
+        return None, (jsonify({'error': 'Tuiles en cours de génération'}), 503, {'Retry-After': '2'})
+    return (row.sha256, info), None
+
+@carte_bp.route('/<int:carte_id>/tiles', methods=['GET'])
+@swag_from({
+    'tags': ['Carte Operations'],
+    'description': "Description de la pyramide de tuiles d'une carte (construite en arrière-plan après l'upload) : "
+                   "taille de l'image, taille des tuiles, niveau de zoom maximal (pleine résolution) et format. "
+                   "Le niveau 0 tient dans une tuile ; chaque niveau double la résolution du précédent.",
+    'parameters': [
+        {
+            'name': 'carte_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'ID de la carte'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Pyramide disponible.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'width': {'type': 'integer', 'example': 8000},
+                    'height': {'type': 'integer', 'example': 5000},
+                    'tile_size': {'type': 'integer', 'example': 256},
+                    'max_zoom': {'type': 'integer', 'example': 5},
+                    'format': {'type': 'string', 'enum': list(TILE_FORMATS), 'example': 'jpg'},
+                    'url': {'type': 'string', 'example': '/cartes/1/tiles/{z}/{x}/{y}'}
+                }
+            }
+        },
+        404: {'description': 'Carte non trouvée ou sans contenu adressé.'},
+        503: {'description': 'Tuiles en cours de génération (voir Retry-After).'}
+    }
+})
+def get_carte_tiles(carte_id):
+    try:
+        result, error = get_tile_info(carte_id)
+        if error:
+            return error
+        _, info = result
+        return jsonify(dict(info, url=f'/cartes/{carte_id}/tiles/{{z}}/{{x}}/{{y}}')), 200
+    except Exception as e:
+        current_app.logger.error(f"Error in get_carte_tiles: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@carte_bp.route('/<int:carte_id>/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+@swag_from({
+    'tags': ['Carte Operations'],
+    'description': "Tuile (x, y) du niveau de zoom z d'une carte. Réponse cachable un an (immutable) : "
+                   "une vue de plan ne télécharge que les tuiles visibles.",
+    'produces': list(TILE_FORMATS.values()),
+    'parameters': [
+        {'name': 'carte_id', 'in': 'path', 'type': 'integer', 'required': True, 'description': 'ID de la carte'},
+        {'name': 'z', 'in': 'path', 'type': 'integer', 'required': True, 'description': 'Niveau de zoom'},
+        {'name': 'x', 'in': 'path', 'type': 'integer', 'required': True, 'description': 'Colonne de la tuile'},
+        {'name': 'y', 'in': 'path', 'type': 'integer', 'required': True, 'description': 'Ligne de la tuile'}
+    ],
+    'responses': {
+        200: {'description': 'Image de la tuile.'},
+        304: {'description': 'Tuile inchangée (If-None-Match).'},
+        404: {'description': 'Carte ou tuile inexistante.'},
+        503: {'description': 'Tuiles en cours de génération (voir Retry-After).'}
+    }
+})
+def get_carte_tile(carte_id, z, x, y):
+    try:
+        result, error = get_tile_info(carte_id)
+        if error:
+            return error
+        sha256, info = result
+        if z > info['max_zoom']:
+            return jsonify({'error': 'Tuile inexistante'}), 404
+        _, _, columns, rows = level_size(info, z)
+        if x >= columns or y >= rows:
+            return jsonify({'error': 'Tuile inexistante'}), 404
+        fmt = info['format']
+        return send_immutable_file(
+            tile_path(current_app.config['UPLOAD_FOLDER'], sha256, z, x, y, fmt),
+            TILE_FORMATS[fmt],
+            f'{sha256}-{z}-{x}-{y}'
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error in get_carte_tile: {e}")
+        return jsonify({'error': str(e)}), 500
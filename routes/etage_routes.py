@@ -1,38 +1,62 @@
 # routes/etage_routes.py
+from datetime import datetime, timezone
+
 from flask import Blueprint, request, jsonify, current_app
 from flasgger import swag_from
+from models.baes import Baes
+from models.batiment import Batiment
 from models.etage import Etage
 from models import db
+from services.baes_status import STATUS_ITEM_PROPERTIES, dump_status, etage_statuses
+from utils.bulk import (
+    BULK_RESPONSES, BULK_UPDATE_RESPONSES, BulkError, Field, bulk_insert, bulk_response, bulk_update,
+    bulk_update_response, check_existing_ids, check_foreign_key, get_bulk_items, validate_items, validate_updates
+)
+from utils.cache import cached
+from utils.conditional import conditional_collection
+from utils.pagination import PAGINATION_PARAMETERS, PaginationError, paginate, paginated_schema
+from utils.streaming import STREAM_PARAMETER, StreamFormatError, get_stream_format, stream_query
+from utils.serializers import etage_serializer
 
 etage_bp = Blueprint('etage_bp', __name__)
 
+ETAGE_BULK_FIELDS = [
+    Field('name', str, required=True, max_length=100),
+    Field('batiment_id', int, required=True)
+]
+
+
 @etage_bp.route('/', methods=['GET'])
 @swag_from({
     'tags': ['Etage CRUD'],
-    'description': 'Récupère la liste de tous les étages.',
+    'description': "Récupère la liste paginée des étages (pagination par curseur sur l'ID).",
+    'parameters': PAGINATION_PARAMETERS + [STREAM_PARAMETER],
     'responses': {
         200: {
-            'description': 'Liste des étages.',
-            'schema': {
-                'type': 'array',
-                'items': {
-                    'type': 'object',
-                    'properties': {
-                        'id': {'type': 'integer', 'example': 1},
-                        'name': {'type': 'string', 'example': 'Etage 1'},
-                        'batiment_id': {'type': 'integer', 'example': 1}
-                    }
-                }
-            }
+            'description': 'Page d\'étages.',
+            'schema': paginated_schema({
+                'id': {'type': 'integer', 'example': 1},
+                'name': {'type': 'string', 'example': 'Etage 1'},
+                'batiment_id': {'type': 'integer', 'example': 1}
+            })
         },
+        304: {'description': 'Collection inchangée depuis If-None-Match / If-Modified-Since.'},
+        400: {'description': 'Paramètres de pagination ou de flux invalides.'},
         500: {'description': 'Erreur interne.'}
     }
 })
+@conditional_collection(Etage)
+@cached(Etage)
 def get_etages():
     try:
-        etages = Etage.query.all()
-        result = [{'id': e.id, 'name': e.name, 'batiment_id': e.batiment_id} for e in etages]
-        return jsonify(result), 200
+        stream_format = get_stream_format()
+        if stream_format:
+            return stream_query(etage_serializer.select().order_by(Etage.id), etage_serializer.dump, stream_format)
+        etages, next_cursor = paginate(etage_serializer.select(), Etage.id)
+        result = [etage_serializer.dump(e) for e in etages]
+        return jsonify({'items': result, 'next': next_cursor}), 200
+    except (PaginationError, StreamFormatError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in get_etages: {e}")
         return jsonify({'error': str(e)}), 500
@@ -65,12 +89,12 @@ def get_etages():
         404: {'description': "Étage non trouvé."}
     }
 })
+@cached(Etage)
 def get_etage(etage_id):
     try:
-        etage = Etage.query.get(etage_id)
-        if not etage:
+        result = etage_serializer.get(etage_id)
+        if not result:
             return jsonify({'error': "Étage non trouvé"}), 404
-        result = {'id': etage.id, 'name': etage.name, 'batiment_id': etage.batiment_id}
         return jsonify(result), 200
     except Exception as e:
         current_app.logger.error(f"Error in get_etage: {e}")
@@ -119,7 +143,7 @@ def create_etage():
         etage = Etage(name=data['name'], batiment_id=data['batiment_id'])
         db.session.add(etage)
         db.session.commit()
-        result = {'id': etage.id, 'name': etage.name, 'batiment_id': etage.batiment_id}
+        result = etage_serializer.dump(etage)
         return jsonify(result), 201
     except Exception as e:
         db.session.rollback()
@@ -178,7 +202,7 @@ def update_etage(etage_id):
         if 'batiment_id' in data:
             etage.batiment_id = data['batiment_id']
         db.session.commit()
-        result = {'id': etage.id, 'name': etage.name, 'batiment_id': etage.batiment_id}
+        result = etage_serializer.dump(etage)
         return jsonify(result), 200
     except Exception as e:
         db.session.rollback()
@@ -223,3 +247,120 @@ def delete_etage(etage_id):
         db.session.rollback()
         current_app.logger.error(f"Error in delete_etage: {e}")
         return jsonify({'error': str(e)}), 500
+
+@etage_bp.route('/bulk', methods=['POST'])
+@swag_from({
+    'tags': ['Etage CRUD'],
+    'description': "Crée plusieurs étages en une seule transaction (un seul executemany). "
+                   "Les éléments invalides sont ignorés et signalés ; les IDs sont renvoyés dans l'ordre du tableau reçu.",
+    'consumes': ['application/json'],
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'name': {'type': 'string', 'example': 'Etage 1'},
+                        'batiment_id': {'type': 'integer', 'example': 1}
+                    },
+                    'required': ['name', 'batiment_id']
+                }
+            }
+        }
+    ],
+    'responses': BULK_RESPONSES
+})
+def create_etages_bulk():
+    try:
+        items = get_bulk_items()
+        rows, errors = validate_items(items, ETAGE_BULK_FIELDS)
+        check_foreign_key(rows, errors, 'batiment_id', Batiment.id, 'Bâtiment non trouvé')
+        ids = bulk_insert(Etage, list(rows.values()))
+        db.session.commit()
+        return bulk_response(len(items), rows, ids, errors)
+    except BulkError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in create_etages_bulk: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@etage_bp.route('/bulk', methods=['PUT'])
+@swag_from({
+    'tags': ['Etage CRUD'],
+    'description': "Met à jour plusieurs étages en une seule transaction. Chaque élément contient l'ID "
+                   "et les seuls champs à modifier ; les éléments invalides sont ignorés et signalés.",
+    'consumes': ['application/json'],
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'id': {'type': 'integer', 'example': 1},
+                        'name': {'type': 'string', 'example': 'Etage 2'},
+                        'batiment_id': {'type': 'integer', 'example': 1}
+                    },
+                    'required': ['id']
+                }
+            }
+        }
+    ],
+    'responses': BULK_UPDATE_RESPONSES
+})
+def update_etages_bulk():
+    try:
+        items = get_bulk_items()
+        rows, errors = validate_updates(items, ETAGE_BULK_FIELDS)
+        check_existing_ids(Etage, rows, errors, 'Étage non trouvé')
+        check_foreign_key(rows, errors, 'batiment_id', Batiment.id, 'Bâtiment non trouvé')
+        bulk_update(Etage, list(rows.values()))
+        db.session.commit()
+        return bulk_update_response(len(items), rows, errors)
+    except BulkError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in update_etages_bulk: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@etage_bp.route('/<int:etage_id>/baes/status', methods=['GET'])
+@swag_from({
+    'tags': ['Etage CRUD'],
+    'description': "État courant de chaque BAES de l'étage : dernière erreur et nombre d'erreurs dans la fenêtre "
+                   "en cours (BAES_STATUS_WINDOW_HOURS). Lu en une requête sur la table baes_status.",
+    'parameters': [
+        {
+            'name': 'etage_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': "ID de l'étage"
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'État des BAES.',
+            'schema': {'type': 'array', 'items': {'type': 'object', 'properties': STATUS_ITEM_PROPERTIES}}
+        },
+        404: {'description': "Étage non trouvé."}
+    }
+})
+def get_etage_baes_status(etage_id):
+    try:
+        rows = etage_statuses(etage_id)
+        if not rows and db.session.get(Etage, etage_id) is None:
+            return jsonify({'error': 'Étage non trouvé'}), 404
+        now = datetime.now(timezone.utc)
+        return jsonify([dump_status(row, now) for row in rows]), 200
+    except Exception as e:
+        current_app.logger.error(f"Error in get_etage_baes_status: {e}")
+        return jsonify({'error': str(e)}), 500
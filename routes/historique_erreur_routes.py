@@ -1,8 +1,436 @@
 # routes/historique_erreur_routes.py
-from flask import Blueprint, request, jsonify, current_app
+import math
+
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from flasgger import swag_from
-from models.batiment import Batiment
 from models import db
+from models.historique_erreur import HistoriqueErreur, error_types
+from services.erreurs import (
+    FilterError, get_filters, read_events_payload, record_events, resolve_baes, select_erreurs, validate_events
+)
+from services.events import (
+    STREAM_HEARTBEAT_SECONDS, STREAM_QUEUE_SIZE, STREAM_REPLAY_MAX, broker, iter_sse, replay_since
+)
+from services.export import EXPORT_FORMATS, export_filename, get_export_args, iter_export
+from services.stats import BUCKETS, GROUP_BY_LEVELS, error_counts, get_stats_args
+from services.write_behind import write_behind
+from utils.bulk import BulkError
+from utils.pagination import PAGINATION_PARAMETERS, PaginationError, paginate_recent, paginated_schema
+from utils.serializers import historique_serializer
+
+
+historique_erreur_bp = Blueprint('historique_erreur_bp', __name__)
+
+TIME_RANGE_PARAMETERS = [
+    {
+        'name': 'from',
+        'in': 'query',
+        'type': 'string',
+        'format': 'date-time',
+        'required': False,
+        'description': 'Début de la période (inclus), date ISO 8601 ; UTC si aucun fuseau.'
+    },
+    {
+        'name': 'to',
+        'in': 'query',
+        'type': 'string',
+        'format': 'date-time',
+        'required': False,
+        'description': 'Fin de la période (exclue), date ISO 8601 ; UTC si aucun fuseau.'
+    }
+]
+
+@historique_erreur_bp.route('/', methods=['GET'])
+@swag_from({
+    'tags': ['Historique des erreurs'],
+    'description': "Récupère l'historique des erreurs, du plus récent au plus ancien, filtré par BAES, "
+                   "type et période. Pagination par curseur sur (timestamp, id).",
+    'parameters': [
+        {
+            'name': 'baes_id',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'ID de la BAES.'
+        },
+        {
+            'name': 'type',
+            'in': 'query',
+            'type': 'string',
+            'enum': list(error_types),
+            'required': False,
+            'description': "Type d'erreur."
+        }
+    ] + TIME_RANGE_PARAMETERS + PAGINATION_PARAMETERS,
+    'responses': {
+        200: {
+            'description': "Page d'erreurs.",
+            'schema': paginated_schema({
+                'id': {'type': 'integer', 'example': 1},
+                'baes_id': {'type': 'integer', 'example': 1},
+                'type_erreur': {'type': 'string', 'example': 'erreur_batterie'},
+                'timestamp': {'type': 'string', 'format': 'date-time', 'example': '2025-03-19T08:30:00+00:00'},
+                'occurrences': {'type': 'integer', 'example': 1, 'description': 'Événements regroupés dans la ligne.'},
+                'last_seen': {'type': 'string', 'format': 'date-time', 'example': '2025-03-19T08:30:00+00:00'}
+            })
+        },
+        400: {'description': 'Paramètres de filtre ou de pagination invalides.'},
+        500: {'description': 'Erreur interne.'}
+    }
+})
+def get_erreurs():
+    try:
+        query = select_erreurs(*get_filters())
+        erreurs, next_cursor = paginate_recent(query, HistoriqueErreur.timestamp, HistoriqueErreur.id)
+        result = [historique_serializer.dump(e) for e in erreurs]
+        return jsonify({'items': result, 'next': next_cursor}), 200
+    except (FilterError, PaginationError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error in get_erreurs: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@historique_erreur_bp.route('/batch', methods=['POST'])
+@swag_from({
+    'tags': ['Historique des erreurs'],
+    'description': "Ingestion en masse d'événements d'erreur BAES. Le corps est un tableau JSON, "
+                   "ou du NDJSON (un objet par ligne) avec le Content-Type application/x-ndjson. "
+                   "Les BAES du lot sont vérifiées en une requête puis les lignes valides sont insérées "
+                   "en un seul executemany, et l'état de chaque BAES (baes_status) est mis à jour dans la même "
+                   "transaction ; les événements invalides sont ignorés et signalés par index. "
+                   "Sans timestamp, l'heure de réception (UTC) est utilisée.",
+    'consumes': ['application/json', 'application/x-ndjson'],
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'baes_id': {'type': 'integer', 'example': 1},
+                        'type_erreur': {'type': 'string', 'enum': list(error_types), 'example': 'erreur_batterie'},
+                        'timestamp': {'type': 'string', 'format': 'date-time', 'example': '2025-03-19T08:30:00Z'}
+                    },
+                    'required': ['baes_id', 'type_erreur']
+                }
+            }
+        }
+    ],
+    'responses': {
+        201: {
+            'description': 'Tous les événements ont été enregistrés.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'inserted': {'type': 'integer', 'example': 500},
+                    'rejected': {'type': 'integer', 'example': 0},
+                    'errors': {'type': 'array', 'items': {'type': 'object'}, 'example': []}
+                }
+            }
+        },
+        207: {
+            'description': "Enregistrement partiel : les événements refusés sont détaillés dans 'errors'.",
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'inserted': {'type': 'integer', 'example': 498},
+                    'rejected': {'type': 'integer', 'example': 2},
+                    'errors': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'index': {'type': 'integer', 'example': 17},
+                                'error': {'type': 'string', 'example': 'BAES non trouvée'}
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        202: {
+            'description': "Mode écriture différée (ERREURS_WRITE_BEHIND) : les événements valides sont en file "
+                           "et seront enregistrés par lots ; 'errors' détaille les refus.",
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'accepted': {'type': 'integer', 'example': 498},
+                    'rejected': {'type': 'integer', 'example': 2},
+                    'errors': {'type': 'array', 'items': {'type': 'object'}, 'example': []}
+                }
+            }
+        },
+        400: {'description': "Corps invalide ou aucun événement valide (rien n'est inséré)."},
+        429: {'description': "Mode écriture différée : file pleine, rien n'est accepté (voir l'en-tête Retry-After)."},
+        500: {'description': "Erreur interne (la transaction est annulée, rien n'est inséré)."}
+    }
+})
+def ingest_erreurs_batch():
+    try:
+        items = read_events_payload()
+        events, errors = validate_events(items)
+        events = resolve_baes(events, errors)
+        errors.sort(key=lambda e: e['index'])
+
+        if current_app.config.get('ERREURS_WRITE_BEHIND'):
+            # Écriture différée : la réponse n'attend pas le commit
+            if not events:
+                return jsonify({'accepted': 0, 'rejected': len(errors), 'errors': errors}), 400
+            if not write_behind.offer(current_app._get_current_object(), events):
+                retry_after = max(1, math.ceil(write_behind.flush_interval))
+                return jsonify({'error': "File d'ingestion pleine, réessayez plus tard"}), 429, {'Retry-After': str(retry_after)}
+            return jsonify({'accepted': len(events), 'rejected': len(errors), 'errors': errors}), 202
+
+        inserted = record_events(events)
+        db.session.commit()
+
+        if not errors:
+            status = 201
+        elif inserted:
+            status = 207
+        else:
+            status = 400
+        return jsonify({'inserted': inserted, 'rejected': len(errors), 'errors': errors}), status
+    except BulkError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in ingest_erreurs_batch: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@historique_erreur_bp.route('/stats', methods=['GET'])
+@swag_from({
+    'tags': ['Historique des erreurs'],
+    'description': "Nombre d'erreurs par BAES, étage, bâtiment ou site et par intervalle de temps (UTC), "
+                   "ventilé par type d'erreur. Le calcul est fait par la base ; si from et to tombent sur des "
+                   "débuts d'heure (bucket=hour) ou de jour (day, week), les tables d'agrégats sont lues au lieu "
+                   "de l'historique brut. Chaque ligne de 'rows' suit l'ordre de 'columns'.",
+    'parameters': [
+        {
+            'name': 'group_by',
+            'in': 'query',
+            'type': 'string',
+            'enum': list(GROUP_BY_LEVELS),
+            'default': 'baes',
+            'required': False,
+            'description': 'Niveau de regroupement.'
+        },
+        {
+            'name': 'bucket',
+            'in': 'query',
+            'type': 'string',
+            'enum': list(BUCKETS),
+            'default': 'day',
+            'required': False,
+            'description': 'Largeur des intervalles (les semaines commencent le lundi).'
+        }
+    ] + TIME_RANGE_PARAMETERS,
+    'responses': {
+        200: {
+            'description': 'Compteurs agrégés.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'group_by': {'type': 'string', 'example': 'etage'},
+                    'bucket': {'type': 'string', 'example': 'day'},
+                    'source': {
+                        'type': 'string',
+                        'enum': ['rollup', 'raw'],
+                        'description': "'rollup' si les agrégats ont été lus (complétés des lignes non encore agrégées)."
+                    },
+                    'columns': {
+                        'type': 'array',
+                        'items': {'type': 'string'},
+                        'example': ['etage_id', 'bucket'] + list(error_types) + ['total']
+                    },
+                    'rows': {
+                        'type': 'array',
+                        'items': {'type': 'array', 'items': {}},
+                        'example': [[1, '2025-03-19T00:00:00+00:00', 4, 1, 5]]
+                    }
+                }
+            }
+        },
+        400: {'description': 'Paramètres invalides.'},
+        500: {'description': 'Erreur interne.'}
+    }
+})
+def get_erreurs_stats():
+    try:
+        group_by, bucket, start, end = get_stats_args()
+        rows, source = error_counts(group_by, bucket, start, end)
+        return jsonify({
+            'group_by': group_by,
+            'bucket': bucket,
+            'source': source,
+            'columns': [f'{group_by}_id', 'bucket'] + list(error_types) + ['total'],
+            'rows': rows
+        }), 200
+    except FilterError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error in get_erreurs_stats: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@historique_erreur_bp.route('/export', methods=['GET'])
+@swag_from({
+    'tags': ['Historique des erreurs'],
+    'description': "Export complet de l'historique des erreurs (CSV ou NDJSON), éventuellement limité à un site "
+                   "et à une période, en pièce jointe. Les lignes sont lues par un curseur serveur et écrites "
+                   "au fil de l'eau (compressées en gzip si demandé) : la mémoire reste constante quel que soit "
+                   "le volume. Les lignes sont triées par ID.",
+    'produces': ['text/csv', 'application/x-ndjson', 'application/gzip'],
+    'parameters': [
+        {
+            'name': 'site_id',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': "N'exporter que les erreurs des BAES de ce site."
+        }
+    ] + TIME_RANGE_PARAMETERS + [
+        {
+            'name': 'format',
+            'in': 'query',
+            'type': 'string',
+            'enum': list(EXPORT_FORMATS),
+            'default': 'csv',
+            'required': False,
+            'description': "Format de l'export (colonnes id, baes_id, type_erreur, timestamp, occurrences, last_seen)."
+        },
+        {
+            'name': 'gzip',
+            'in': 'query',
+            'type': 'boolean',
+            'default': False,
+            'required': False,
+            'description': 'Compresse le fichier en gzip à la volée (.gz).'
+        }
+    ],
+    'responses': {
+        200: {'description': 'Fichier en flux.'},
+        400: {'description': 'Paramètres invalides.'},
+        500: {'description': 'Erreur interne.'}
+    }
+})
+def export_erreurs():
+    try:
+        site_id, start, end, fmt, compress = get_export_args()
+        filename = export_filename(site_id, start, end, fmt, compress)
+        return Response(
+            stream_with_context(iter_export(site_id, start, end, fmt, compress)),
+            mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt],
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+    except FilterError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error in export_erreurs: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@historique_erreur_bp.route('/stream', methods=['GET'])
+@swag_from({
+    'tags': ['Historique des erreurs'],
+    'description': "Flux Server-Sent Events des nouvelles erreurs (événement 'erreur', id = ID de l'erreur), "
+                   "éventuellement limité à un site. Avec l'en-tête Last-Event-ID (ou le paramètre last_event_id), "
+                   "les erreurs manquées sont d'abord relues depuis la base. Un client trop lent reçoit "
+                   "l'événement 'dropped' et doit se reconnecter. Si plus de ERREURS_STREAM_REPLAY_MAX erreurs "
+                   "ont été manquées, la reprise se termine par l'événement 'truncated' et le flux est fermé : "
+                   "le client se reconnecte avec le dernier ID reçu pour lire la suite.",
+    'produces': ['text/event-stream'],
+    'parameters': [
+        {
+            'name': 'site_id',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Ne recevoir que les erreurs des BAES de ce site.'
+        },
+        {
+            'name': 'Last-Event-ID',
+            'in': 'header',
+            'type': 'integer',
+            'required': False,
+            'description': 'ID de la dernière erreur reçue (reprise après déconnexion).'
+        },
+        {
+            'name': 'last_event_id',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': "Équivalent de l'en-tête Last-Event-ID."
+        }
+    ],
+    'responses': {
+        200: {'description': 'Flux text/event-stream.'},
+        400: {'description': 'Paramètres invalides.'}
+    }
+})
+def stream_erreurs():
+    try:
+        site_id = request.args.get('site_id')
+        if site_id is not None:
+            try:
+                site_id = int(site_id)
+            except ValueError:
+                return jsonify({'error': 'Le paramètre site_id doit être un entier'}), 400
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        if last_event_id is not None:
+            try:
+                last_event_id = int(last_event_id)
+            except ValueError:
+                return jsonify({'error': 'Last-Event-ID doit être un entier'}), 400
 
+        config = current_app.config
+        # Abonnement avant la reprise : une erreur commitée entre les deux n'est pas perdue
+        subscription = broker.subscribe(site_id, config.get('ERREURS_STREAM_QUEUE_SIZE', STREAM_QUEUE_SIZE))
+        try:
+            replayed, truncated = [], False
+            if last_event_id is not None:
+                replayed, truncated = replay_since(
+                    last_event_id, site_id, config.get('ERREURS_STREAM_REPLAY_MAX', STREAM_REPLAY_MAX)
+                )
+            # Le flux peut durer des heures : la connexion SQL est rendue au pool dès maintenant
+            db.session.remove()
+        except Exception:
+            broker.unsubscribe(subscription)
+            raise
+        heartbeat = config.get('ERREURS_STREAM_HEARTBEAT_SECONDS', STREAM_HEARTBEAT_SECONDS)
+        return Response(
+            iter_sse(subscription, replayed, heartbeat, truncated),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error in stream_erreurs: {e}")
+        return jsonify({'error': str(e)}), 500
 
-historique_erreur_bp = Blueprint('historique_erreur_bp', __name__)
\ No newline at end of file
+@historique_erreur_bp.route('/queue', methods=['GET'])
+@swag_from({
+    'tags': ['Historique des erreurs'],
+    'description': "État de la file d'écriture différée de ce processus (mode ERREURS_WRITE_BEHIND).",
+    'responses': {
+        200: {
+            'description': 'Compteurs de la file.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'enabled': {'type': 'boolean', 'example': True},
+                    'queued': {'type': 'integer', 'example': 1200},
+                    'maxsize': {'type': 'integer', 'example': 100000},
+                    'written': {'type': 'integer', 'example': 250000},
+                    'failed': {'type': 'integer', 'example': 0},
+                    'rejected': {'type': 'integer', 'example': 0},
+                    'running': {'type': 'boolean', 'example': True}
+                }
+            }
+        }
+    }
+})
+def get_erreurs_queue():
+    stats = write_behind.stats()
+    stats['enabled'] = bool(current_app.config.get('ERREURS_WRITE_BEHIND'))
+    return jsonify(stats), 200
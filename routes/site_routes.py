@@ -1,37 +1,62 @@
 # routes/site_routes.py
+from datetime import datetime, timezone
+
 from flask import Blueprint, request, jsonify, current_app
 from flasgger import swag_from
+from sqlalchemy.orm import joinedload, selectinload
+from models.batiment import Batiment
+from models.baes import Baes
+from models.carte import Carte
+from models.etage import Etage
 from models.site import Site
 from models import db
+from services.baes_status import STATUS_ITEM_PROPERTIES, dump_status, site_statuses
+from utils.cache import cached
+from utils.conditional import conditional_collection
+from utils.pagination import PAGINATION_PARAMETERS, PaginationError, paginate, paginated_schema
+from utils.streaming import STREAM_PARAMETER, StreamFormatError, get_stream_format, stream_query
+from utils.serializers import baes_serializer, batiment_serializer, etage_serializer, site_serializer
 
 site_bp = Blueprint('site_bp', __name__)
 
+# Niveaux de l'arborescence : 0 = site, 1 = bâtiments, 2 = étages, 3 = BAES
+TREE_MAX_DEPTH = 3
+# Les clés étrangères vers le parent sont implicites dans l'arborescence
+tree_batiment_serializer = batiment_serializer.only('id', 'name', 'polygon_points')
+tree_etage_serializer = etage_serializer.only('id', 'name')
+tree_baes_serializer = baes_serializer.only('id', 'name', 'position')
+
+
 @site_bp.route('/', methods=['GET'])
 @swag_from({
     'tags': ['Site CRUD'],
-    'description': 'Récupère la liste de tous les sites.',
+    'description': 'Récupère la liste paginée des sites (pagination par curseur sur l\'ID).',
+    'parameters': PAGINATION_PARAMETERS + [STREAM_PARAMETER],
     'responses': {
         200: {
-            'description': 'Liste des sites.',
-            'schema': {
-                'type': 'array',
-                'items': {
-                    'type': 'object',
-                    'properties': {
-                        'id': {'type': 'integer', 'example': 1},
-                        'name': {'type': 'string', 'example': 'Site 1'},
-                    }
-                }
-            }
+            'description': 'Page de sites.',
+            'schema': paginated_schema({
+                'id': {'type': 'integer', 'example': 1},
+                'name': {'type': 'string', 'example': 'Site 1'},
+            })
         },
+        304: {'description': 'Collection inchangée depuis If-None-Match / If-Modified-Since.'},
+        400: {'description': 'Paramètres de pagination ou de flux invalides.'},
         500: {'description': 'Erreur interne.'}
     }
 })
+@conditional_collection(Site)
+@cached(Site)
 def get_sites():
     try:
-        sites = Site.query.all()
-        result = [{'id': s.id, 'name': s.name} for s in sites]
-        return jsonify(result), 200
+        stream_format = get_stream_format()
+        if stream_format:
+            return stream_query(site_serializer.select().order_by(Site.id), site_serializer.dump, stream_format)
+        sites, next_cursor = paginate(site_serializer.select(), Site.id)
+        result = [site_serializer.dump(s) for s in sites]
+        return jsonify({'items': result, 'next': next_cursor}), 200
+    except (PaginationError, StreamFormatError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in get_sites: {e}")
         return jsonify({'error': str(e)}), 500
@@ -63,12 +88,12 @@ def get_sites():
         404: {'description': 'Site non trouvé.'}
     }
 })
+@cached(Site)
 def get_site(site_id):
     try:
-        site = Site.query.get(site_id)
-        if not site:
+        result = site_serializer.get(site_id)
+        if not result:
             return jsonify({'error': 'Site non trouvé'}), 404
-        result = {'id': site.id, 'name': site.name}
         return jsonify(result), 200
     except Exception as e:
         current_app.logger.error(f"Error in get_site: {e}")
@@ -115,7 +140,7 @@ def create_site():
         site = Site(name=data['name'])
         db.session.add(site)
         db.session.commit()
-        result = {'id': site.id, 'name': site.name}
+        result = site_serializer.dump(site)
         return jsonify(result), 201
     except Exception as e:
         db.session.rollback()
@@ -170,7 +195,7 @@ def update_site(site_id):
         if 'name' in data:
             site.name = data['name']
         db.session.commit()
-        result = {'id': site.id, 'name': site.name}
+        result = site_serializer.dump(site)
         return jsonify(result), 200
     except Exception as e:
         db.session.rollback()
@@ -215,3 +240,154 @@ def delete_site(site_id):
         db.session.rollback()
         current_app.logger.error(f"Error in delete_site: {e}")
         return jsonify({'error': str(e)}), 500
+
+@site_bp.route('/<int:site_id>/tree', methods=['GET'])
+@swag_from({
+    'tags': ['Site CRUD'],
+    'description': "Récupère l'arborescence d'un site (Site → Bâtiments → Étages → BAES) avec l'ID de la carte de chaque niveau, "
+                   "chargée en une requête par niveau.",
+    'parameters': [
+        {
+            'name': 'site_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'ID du site'
+        },
+        {
+            'name': 'depth',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'default': TREE_MAX_DEPTH,
+            'description': "Profondeur maximale : 0 = site seul, 1 = bâtiments, 2 = étages, 3 = BAES."
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Arborescence du site.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'id': {'type': 'integer', 'example': 1},
+                    'name': {'type': 'string', 'example': 'Site 1'},
+                    'carte_id': {'type': 'integer', 'example': 5},
+                    'batiments': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'id': {'type': 'integer', 'example': 1},
+                                'name': {'type': 'string', 'example': 'Batiment 1'},
+                                'polygon_points': {'type': 'object'},
+                                'etages': {
+                                    'type': 'array',
+                                    'items': {
+                                        'type': 'object',
+                                        'properties': {
+                                            'id': {'type': 'integer', 'example': 1},
+                                            'name': {'type': 'string', 'example': 'Etage 1'},
+                                            'carte_id': {'type': 'integer', 'example': 3},
+                                            'baes': {
+                                                'type': 'array',
+                                                'items': {
+                                                    'type': 'object',
+                                                    'properties': {
+                                                        'id': {'type': 'integer', 'example': 1},
+                                                        'name': {'type': 'string', 'example': 'BAES 1'},
+                                                        'position': {'type': 'object'}
+                                                    }
+                                                }
+                                            }
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        400: {'description': 'Paramètre depth invalide.'},
+        404: {'description': 'Site non trouvé.'},
+        500: {'description': 'Erreur interne.'}
+    }
+})
+@cached(Site, Batiment, Etage, Baes, Carte)
+def get_site_tree(site_id):
+    try:
+        depth = request.args.get('depth', TREE_MAX_DEPTH)
+        try:
+            depth = int(depth)
+        except ValueError:
+            depth = -1
+        if not 0 <= depth <= TREE_MAX_DEPTH:
+            return jsonify({'error': f'Le paramètre depth doit être compris entre 0 et {TREE_MAX_DEPTH}'}), 400
+
+        # Une requête par niveau : les cartes (one-to-one) sont jointes à leur niveau,
+        # les enfants sont chargés par un SELECT ... IN sur les IDs du niveau parent.
+        options = [joinedload(Site.carte)]
+        if depth >= 1:
+            batiments = selectinload(Site.batiments)
+            options.append(batiments)
+            if depth >= 2:
+                etages = batiments.selectinload(Batiment.etages)
+                options.append(etages.joinedload(Etage.carte))
+                if depth >= 3:
+                    options.append(etages.selectinload(Etage.baes))
+        site = Site.query.options(*options).filter(Site.id == site_id).first()
+        if not site:
+            return jsonify({'error': 'Site non trouvé'}), 404
+
+        result = site_serializer.dump(site)
+        result['carte_id'] = site.carte.id if site.carte else None
+        if depth >= 1:
+            result['batiments'] = []
+            for batiment in site.batiments:
+                batiment_data = tree_batiment_serializer.dump(batiment)
+                if depth >= 2:
+                    batiment_data['etages'] = []
+                    for etage in batiment.etages:
+                        etage_data = tree_etage_serializer.dump(etage)
+                        etage_data['carte_id'] = etage.carte.id if etage.carte else None
+                        if depth >= 3:
+                            etage_data['baes'] = [tree_baes_serializer.dump(b) for b in etage.baes]
+                        batiment_data['etages'].append(etage_data)
+                result['batiments'].append(batiment_data)
+        return jsonify(result), 200
+    except Exception as e:
+        current_app.logger.error(f"Error in get_site_tree: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@site_bp.route('/<int:site_id>/baes/status', methods=['GET'])
+@swag_from({
+    'tags': ['Site CRUD'],
+    'description': "État courant de chaque BAES du site (tous bâtiments et étages) : dernière erreur et nombre d'erreurs dans la fenêtre "
+                   "en cours (BAES_STATUS_WINDOW_HOURS). Lu en une requête sur la table baes_status.",
+    'parameters': [
+        {
+            'name': 'site_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': "ID du site"
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'État des BAES.',
+            'schema': {'type': 'array', 'items': {'type': 'object', 'properties': STATUS_ITEM_PROPERTIES}}
+        },
+        404: {'description': "Site non trouvé."}
+    }
+})
+def get_site_baes_status(site_id):
+    try:
+        rows = site_statuses(site_id)
+        if not rows and db.session.get(Site, site_id) is None:
+            return jsonify({'error': 'Site non trouvé'}), 404
+        now = datetime.now(timezone.utc)
+        return jsonify([dump_status(row, now) for row in rows]), 200
+    except Exception as e:
+        current_app.logger.error(f"Error in get_site_baes_status: {e}")
+        return jsonify({'error': str(e)}), 500
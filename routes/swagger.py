@@ -12,9 +12,16 @@ from models.BAES import BAES
 from models.historique_erreur import HistoriqueErreur
 from models.user import User
 from models.role import Role
+from utils.pagination import PAGINATION_PARAMETERS, PaginationError, paginate, paginated_schema
+from utils.streaming import STREAM_PARAMETER, StreamFormatError, get_stream_format, stream_query
+from utils.serializers import (
+    baes_serializer, batiment_serializer, etage_serializer, historique_serializer,
+    role_serializer, site_serializer, user_serializer
+)
 
 swagger_bp = Blueprint('swagger', __name__)
 
+
 ###############################
 # Endpoints de tests "généraux"
 ###############################
@@ -81,29 +88,31 @@ def test_creation():
 @swagger_bp.route('/test-sites', methods=['GET'])
 @swag_from({
     'tags': ['Database Tests'],
-    'description': 'Récupère et retourne la liste de tous les sites dans la base de données.',
+    'description': 'Récupère et retourne, page par page, la liste des sites de la base de données.',
+    'parameters': PAGINATION_PARAMETERS + [STREAM_PARAMETER],
     'responses': {
         200: {
             'description': 'Liste des sites.',
-            'schema': {
-                'type': 'array',
-                'items': {
-                    'type': 'object',
-                    'properties': {
-                        'id': {'type': 'integer', 'example': 1},
-                        'name': {'type': 'string', 'example': 'Site 1'},
-                    }
-                }
-            }
+            'schema': paginated_schema({
+                'id': {'type': 'integer', 'example': 1},
+                'name': {'type': 'string', 'example': 'Site 1'},
+            })
         },
+        400: {'description': 'Paramètres de pagination ou de flux invalides.'},
         500: {'description': 'Erreur lors de la récupération des sites.'}
     }
 })
 def test_sites():
     try:
-        sites = Site.query.all()
-        sites_data = [{'id': site.id, 'name': site.name} for site in sites]
-        return jsonify(sites_data)
+        stream_format = get_stream_format()
+        serializer = site_serializer
+        if stream_format:
+            return stream_query(serializer.select().order_by(Site.id), serializer.dump, stream_format)
+        sites, next_cursor = paginate(serializer.select(), Site.id)
+        sites_data = [serializer.dump(s) for s in sites]
+        return jsonify({'items': sites_data, 'next': next_cursor})
+    except (PaginationError, StreamFormatError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in test_sites: {e}")
         return jsonify({'error': str(e)}), 500
@@ -111,30 +120,32 @@ def test_sites():
 @swagger_bp.route('/test-batiments', methods=['GET'])
 @swag_from({
     'tags': ['Database Tests'],
-    'description': 'Récupère et retourne la liste de tous les bâtiments dans la base de données.',
+    'description': 'Récupère et retourne, page par page, la liste des bâtiments de la base de données.',
+    'parameters': PAGINATION_PARAMETERS + [STREAM_PARAMETER],
     'responses': {
         200: {
             'description': 'Liste des bâtiments.',
-            'schema': {
-                'type': 'array',
-                'items': {
-                    'type': 'object',
-                    'properties': {
-                        'id': {'type': 'integer', 'example': 1},
-                        'name': {'type': 'string', 'example': 'Batiment 1'},
-                        'polygon_points': {'type': 'object'}
-                    }
-                }
-            }
+            'schema': paginated_schema({
+                'id': {'type': 'integer', 'example': 1},
+                'name': {'type': 'string', 'example': 'Batiment 1'},
+                'polygon_points': {'type': 'object'}
+            })
         },
+        400: {'description': 'Paramètres de pagination ou de flux invalides.'},
         500: {'description': 'Erreur lors de la récupération des bâtiments.'}
     }
 })
 def test_batiments():
     try:
-        batiments = Batiment.query.all()
-        batiments_data = [{'id': b.id, 'name': b.name, 'polygon_points': b.polygon_points} for b in batiments]
-        return jsonify(batiments_data)
+        stream_format = get_stream_format()
+        serializer = batiment_serializer.only('id', 'name', 'polygon_points')
+        if stream_format:
+            return stream_query(serializer.select().order_by(Batiment.id), serializer.dump, stream_format)
+        batiments, next_cursor = paginate(serializer.select(), Batiment.id)
+        batiments_data = [serializer.dump(b) for b in batiments]
+        return jsonify({'items': batiments_data, 'next': next_cursor})
+    except (PaginationError, StreamFormatError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in test_batiments: {e}")
         return jsonify({'error': str(e)}), 500
@@ -142,29 +153,31 @@ def test_batiments():
 @swagger_bp.route('/test-etages', methods=['GET'])
 @swag_from({
     'tags': ['Database Tests'],
-    'description': 'Récupère et retourne la liste de tous les étages dans la base de données.',
+    'description': 'Récupère et retourne, page par page, la liste des étages de la base de données.',
+    'parameters': PAGINATION_PARAMETERS + [STREAM_PARAMETER],
     'responses': {
         200: {
             'description': 'Liste des étages.',
-            'schema': {
-                'type': 'array',
-                'items': {
-                    'type': 'object',
-                    'properties': {
-                        'id': {'type': 'integer', 'example': 1},
-                        'name': {'type': 'string', 'example': 'Etage 1'}
-                    }
-                }
-            }
+            'schema': paginated_schema({
+                'id': {'type': 'integer', 'example': 1},
+                'name': {'type': 'string', 'example': 'Etage 1'}
+            })
         },
+        400: {'description': 'Paramètres de pagination ou de flux invalides.'},
         500: {'description': 'Erreur lors de la récupération des étages.'}
     }
 })
 def test_etages():
     try:
-        etages = Etage.query.all()
-        etages_data = [{'id': e.id, 'name': e.name} for e in etages]
-        return jsonify(etages_data)
+        stream_format = get_stream_format()
+        serializer = etage_serializer.only('id', 'name')
+        if stream_format:
+            return stream_query(serializer.select().order_by(Etage.id), serializer.dump, stream_format)
+        etages, next_cursor = paginate(serializer.select(), Etage.id)
+        etages_data = [serializer.dump(e) for e in etages]
+        return jsonify({'items': etages_data, 'next': next_cursor})
+    except (PaginationError, StreamFormatError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in test_etages: {e}")
         return jsonify({'error': str(e)}), 500
@@ -172,30 +185,32 @@ def test_etages():
 @swagger_bp.route('/test-baes', methods=['GET'])
 @swag_from({
     'tags': ['Database Tests'],
-    'description': 'Récupère et retourne la liste de tous les BAES dans la base de données.',
+    'description': 'Récupère et retourne, page par page, la liste des BAES de la base de données.',
+    'parameters': PAGINATION_PARAMETERS + [STREAM_PARAMETER],
     'responses': {
         200: {
             'description': 'Liste des BAES.',
-            'schema': {
-                'type': 'array',
-                'items': {
-                    'type': 'object',
-                    'properties': {
-                        'id': {'type': 'integer', 'example': 1},
-                        'name': {'type': 'string', 'example': 'BAES 1'},
-                        'position': {'type': 'object'}
-                    }
-                }
-            }
+            'schema': paginated_schema({
+                'id': {'type': 'integer', 'example': 1},
+                'name': {'type': 'string', 'example': 'BAES 1'},
+                'position': {'type': 'object'}
+            })
         },
+        400: {'description': 'Paramètres de pagination ou de flux invalides.'},
         500: {'description': 'Erreur lors de la récupération des BAES.'}
     }
 })
 def test_baes():
     try:
-        baes_list = BAES.query.all()
-        baes_data = [{'id': b.id, 'name': b.name, 'position': b.position} for b in baes_list]
-        return jsonify(baes_data)
+        stream_format = get_stream_format()
+        serializer = baes_serializer.only('id', 'name', 'position')
+        if stream_format:
+            return stream_query(serializer.select().order_by(BAES.id), serializer.dump, stream_format)
+        baes_list, next_cursor = paginate(serializer.select(), BAES.id)
+        baes_data = [serializer.dump(b) for b in baes_list]
+        return jsonify({'items': baes_data, 'next': next_cursor})
+    except (PaginationError, StreamFormatError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in test_baes: {e}")
         return jsonify({'error': str(e)}), 500
@@ -203,36 +218,35 @@ def test_baes():
 @swagger_bp.route('/test-historique', methods=['GET'])
 @swag_from({
     'tags': ['Database Tests'],
-    'description': "Récupère et retourne la liste de tous les historiques d'erreur dans la base de données.",
+    'description': "Récupère et retourne, page par page, la liste des historiques d'erreur de la base de données.",
+    'parameters': PAGINATION_PARAMETERS + [STREAM_PARAMETER],
     'responses': {
         200: {
             'description': "Liste des historiques d'erreur.",
-            'schema': {
-                'type': 'array',
-                'items': {
-                    'type': 'object',
-                    'properties': {
-                        'id': {'type': 'integer', 'example': 1},
-                        'baes_id': {'type': 'integer', 'example': 1},
-                        'type_erreur': {'type': 'string', 'example': 'erreur_connexion'},
-                        'timestamp': {'type': 'string', 'format': 'date-time'}
-                    }
-                }
-            }
+            'schema': paginated_schema({
+                'id': {'type': 'integer', 'example': 1},
+                'baes_id': {'type': 'integer', 'example': 1},
+                'type_erreur': {'type': 'string', 'example': 'erreur_connexion'},
+                'timestamp': {'type': 'string', 'format': 'date-time'},
+                'occurrences': {'type': 'integer', 'example': 1, 'description': 'Événements regroupés dans la ligne.'},
+                'last_seen': {'type': 'string', 'format': 'date-time', 'example': '2025-03-19T08:30:00+00:00'}
+            })
         },
+        400: {'description': 'Paramètres de pagination ou de flux invalides.'},
         500: {'description': "Erreur lors de la récupération de l'historique des erreurs."}
     }
 })
 def test_historique():
     try:
-        historique = HistoriqueErreur.query.all()
-        historique_data = [{
-            'id': h.id,
-            'baes_id': h.baes_id,
-            'type_erreur': h.type_erreur,
-            'timestamp': h.timestamp.isoformat() if h.timestamp else None
-        } for h in historique]
-        return jsonify(historique_data)
+        stream_format = get_stream_format()
+        serializer = historique_serializer
+        if stream_format:
+            return stream_query(serializer.select().order_by(HistoriqueErreur.id), serializer.dump, stream_format)
+        historique, next_cursor = paginate(serializer.select(), HistoriqueErreur.id)
+        historique_data = [serializer.dump(h) for h in historique]
+        return jsonify({'items': historique_data, 'next': next_cursor})
+    except (PaginationError, StreamFormatError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in test_historique: {e}")
         return jsonify({'error': str(e)}), 500
@@ -240,29 +254,31 @@ def test_historique():
 @swagger_bp.route('/test-users', methods=['GET'])
 @swag_from({
     'tags': ['Database Tests'],
-    'description': "Récupère et retourne la liste de tous les utilisateurs dans la base de données.",
+    'description': "Récupère et retourne, page par page, la liste des utilisateurs de la base de données.",
+    'parameters': PAGINATION_PARAMETERS + [STREAM_PARAMETER],
     'responses': {
         200: {
             'description': "Liste des utilisateurs.",
-            'schema': {
-                'type': 'array',
-                'items': {
-                    'type': 'object',
-                    'properties': {
-                        'id': {'type': 'integer', 'example': 1},
-                        'login': {'type': 'string', 'example': 'user1'}
-                    }
-                }
-            }
+            'schema': paginated_schema({
+                'id': {'type': 'integer', 'example': 1},
+                'login': {'type': 'string', 'example': 'user1'}
+            })
         },
+        400: {'description': 'Paramètres de pagination ou de flux invalides.'},
         500: {'description': "Erreur lors de la récupération des utilisateurs."}
     }
 })
 def test_users():
     try:
-        users = User.query.all()
-        users_data = [{'id': u.id, 'login': u.login} for u in users]
-        return jsonify(users_data)
+        stream_format = get_stream_format()
+        serializer = user_serializer
+        if stream_format:
+            return stream_query(serializer.select().order_by(User.id), serializer.dump, stream_format)
+        users, next_cursor = paginate(serializer.select(), User.id)
+        users_data = [serializer.dump(u) for u in users]
+        return jsonify({'items': users_data, 'next': next_cursor})
+    except (PaginationError, StreamFormatError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in test_users: {e}")
         return jsonify({'error': str(e)}), 500
@@ -270,29 +286,31 @@ def test_users():
 @swagger_bp.route('/test-roles', methods=['GET'])
 @swag_from({
     'tags': ['Database Tests'],
-    'description': "Récupère et retourne la liste de tous les rôles dans la base de données.",
+    'description': "Récupère et retourne, page par page, la liste des rôles de la base de données.",
+    'parameters': PAGINATION_PARAMETERS + [STREAM_PARAMETER],
     'responses': {
         200: {
             'description': "Liste des rôles.",
-            'schema': {
-                'type': 'array',
-                'items': {
-                    'type': 'object',
-                    'properties': {
-                        'id': {'type': 'integer', 'example': 1},
-                        'name': {'type': 'string', 'example': 'admin'}
-                    }
-                }
-            }
+            'schema': paginated_schema({
+                'id': {'type': 'integer', 'example': 1},
+                'name': {'type': 'string', 'example': 'admin'}
+            })
         },
+        400: {'description': 'Paramètres de pagination ou de flux invalides.'},
         500: {'description': "Erreur lors de la récupération des rôles."}
     }
 })
 def test_roles():
     try:
-        roles = Role.query.all()
-        roles_data = [{'id': r.id, 'name': r.name} for r in roles]
-        return jsonify(roles_data)
+        stream_format = get_stream_format()
+        serializer = role_serializer
+        if stream_format:
+            return stream_query(serializer.select().order_by(Role.id), serializer.dump, stream_format)
+        roles, next_cursor = paginate(serializer.select(), Role.id)
+        roles_data = [serializer.dump(r) for r in roles]
+        return jsonify({'items': roles_data, 'next': next_cursor})
+    except (PaginationError, StreamFormatError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in test_roles: {e}")
         return jsonify({'error': str(e)}), 500
@@ -304,7 +322,8 @@ def test_roles():
 @swagger_bp.route('/carte/upload', methods=['POST'])
 @swag_from({
     'tags': ['Carte Operations'],
-    'description': "Upload d'une carte. Fournissez un fichier via le champ 'file'.",
+    'description': "Upload d'une carte. Fournissez un fichier via le champ 'file'. Le fichier est stocké sous "
+                   "l'empreinte SHA-256 de son contenu : un contenu déjà connu n'est pas stocké une seconde fois.",
     'consumes': ["multipart/form-data"],
     'parameters': [
         {
@@ -313,6 +332,20 @@ def test_roles():
             'type': 'file',
             'required': True,
             'description': 'Fichier image à uploader (png, jpg, jpeg, gif)'
+        },
+        {
+            'name': 'etage_id',
+            'in': 'formData',
+            'type': 'integer',
+            'required': False,
+            'description': "Assigne directement la carte à cet étage"
+        },
+        {
+            'name': 'site_id',
+            'in': 'formData',
+            'type': 'integer',
+            'required': False,
+            'description': 'Assigne directement la carte à ce site'
         }
     ],
     'responses': {
@@ -322,7 +355,14 @@ def test_roles():
                 'type': 'object',
                 'properties': {
                     'message': {'type': 'string', 'example': 'Fichier uploadé avec succès'},
-                    'chemin': {'type': 'string', 'example': 'uploads/monfichier.png'}
+                    'id': {'type': 'integer', 'example': 1},
+                    'chemin': {'type': 'string', 'example': 'uploads/blobs/9f/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08'},
+                    'sha256': {'type': 'string', 'example': '9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08'},
+                    'original_name': {'type': 'string', 'example': 'plan.jpg'},
+                    'width': {'type': 'integer', 'example': 4032},
+                    'height': {'type': 'integer', 'example': 3024},
+                    'size': {'type': 'integer', 'description': 'Taille en octets après normalisation', 'example': 1843200},
+                    'deduplicated': {'type': 'boolean', 'example': False, 'description': 'Contenu déjà stocké pour une autre carte.'}
                 }
             }
         },
@@ -337,7 +377,8 @@ def swagger_upload_carte():
 @swagger_bp.route('/carte/download/<int:carte_id>', methods=['GET'])
 @swag_from({
     'tags': ['Carte Operations'],
-    'description': "Téléchargement d'une carte via son ID.",
+    'description': "Téléchargement d'une carte via son ID. L'ETag (fort) est l'empreinte SHA-256 du contenu et la "
+                   "réponse est cachable indéfiniment (immutable) ; les requêtes Range reçoivent une réponse 206.",
     'parameters': [
         {
             'name': 'carte_id',
@@ -345,11 +386,28 @@ def swagger_upload_carte():
             'type': 'integer',
             'required': True,
             'description': 'ID de la carte à télécharger'
+        },
+        {
+            'name': 'Range',
+            'in': 'header',
+            'type': 'string',
+            'required': False,
+            'description': "Plage d'octets à télécharger, par exemple bytes=0-1048575"
+        },
+        {
+            'name': 'If-None-Match',
+            'in': 'header',
+            'type': 'string',
+            'required': False,
+            'description': 'ETag déjà en cache : 304 si le fichier est le même'
         }
     ],
     'responses': {
         200: {'description': 'Fichier retourné avec succès.'},
-        404: {'description': 'Carte non trouvée.'}
+        206: {'description': 'Partie du fichier demandée par Range.'},
+        304: {'description': 'Fichier inchangé.'},
+        404: {'description': 'Carte non trouvée.'},
+        416: {'description': 'Plage demandée invalide.'}
     }
 })
 def swagger_download_carte(carte_id):
@@ -359,7 +417,8 @@ def swagger_download_carte(carte_id):
 @swagger_bp.route('/carte/delete/<int:carte_id>', methods=['DELETE'])
 @swag_from({
     'tags': ['Carte Operations'],
-    'description': "Supprime une carte via son ID.",
+    'description': "Supprime une carte via son ID. Son fichier n'est effacé que si aucune autre carte ne "
+                   "partage le même contenu.",
     'parameters': [
         {
             'name': 'carte_id',
@@ -383,13 +442,8 @@ def swagger_download_carte(carte_id):
     }
 })
 def swagger_delete_carte(carte_id):
-    from models.carte import Carte
-    carte = Carte.query.get(carte_id)
-    if not carte:
-        return jsonify({'error': 'Carte non trouvée'}), 404
-    db.session.delete(carte)
-    db.session.commit()
-    return jsonify({'message': 'Carte supprimée avec succès'}), 200
+    from routes.carte_routes import delete_carte
+    return delete_carte(carte_id)
 
 @swagger_bp.route('/carte/get/<int:carte_id>', methods=['GET'])
 @swag_from({
@@ -411,7 +465,12 @@ def swagger_delete_carte(carte_id):
                 'type': 'object',
                 'properties': {
                     'id': {'type': 'integer', 'example': 1},
-                    'chemin': {'type': 'string', 'example': 'uploads/monfichier.png'}
+                    'chemin': {'type': 'string', 'example': 'uploads/monfichier.png'},
+                    'sha256': {'type': 'string', 'example': '9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08'},
+                    'original_name': {'type': 'string', 'example': 'plan.jpg'},
+                    'width': {'type': 'integer', 'example': 4032},
+                    'height': {'type': 'integer', 'example': 3024},
+                    'size': {'type': 'integer', 'description': 'Taille en octets après normalisation', 'example': 1843200}
                 }
             }
         },
@@ -423,4 +482,12 @@ def swagger_get_carte(carte_id):
     carte = Carte.query.get(carte_id)
     if not carte:
         return jsonify({'error': 'Carte non trouvée'}), 404
-    return jsonify({'id': carte.id, 'chemin': carte.chemin}), 200
+    return jsonify({
+        'id': carte.id,
+        'chemin': carte.chemin,
+        'sha256': carte.sha256,
+        'original_name': carte.original_name,
+        'width': carte.width,
+        'height': carte.height,
+        'size': carte.size
+    }), 200
@@ -1,9 +1,11 @@
 # routes/user_role_routes.py
 from flask import Blueprint, request, jsonify, current_app
 from flasgger import swag_from
+from sqlalchemy.orm import joinedload
 from models.user import User
 from models.role import Role
-from models import db
+from models import db, user_roles
+from utils.cache import cached
 
 user_role_bp = Blueprint('user_role_bp', __name__)
 
@@ -38,9 +40,10 @@ user_role_bp = Blueprint('user_role_bp', __name__)
         500: {'description': "Erreur interne."}
     }
 })
+@cached(User, Role, user_roles)
 def get_user_roles(user_id):
     try:
-        user = User.query.get(user_id)
+        user = User.query.options(joinedload(User.roles)).get(user_id)
         if not user:
             return jsonify({'error': 'Utilisateur non trouvé'}), 404
         roles = [{'id': role.id, 'name': role.name} for role in user.roles]
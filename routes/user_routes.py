@@ -1,68 +1,74 @@
 # routes/user_routes.py
 from flask import Blueprint, request, jsonify, current_app
 from flasgger import swag_from
+from sqlalchemy.orm import joinedload, selectinload
 from models.user import User
 from models import db
 from models.role import Role
+from utils.pagination import PAGINATION_PARAMETERS, PaginationError, paginate, paginated_schema
+from utils.streaming import STREAM_PARAMETER, StreamFormatError, get_stream_format, stream_query
 
 user_bp = Blueprint('user_bp', __name__)
 
+
+def serialize_user_with_sites(user):
+    return {
+        'id': user.id,
+        'login': user.login,
+        'roles': [role.name for role in user.roles],
+        # Pour chaque site, on retourne uniquement l'id et le nom
+        'sites': [{'id': site.id, 'name': site.name} for site in user.sites]
+    }
+
 # routes/user_routes.py
 @user_bp.route('/', methods=['GET'])
 @swag_from({
     'tags': ['User CRUD'],
-    'description': 'Récupère la liste de tous les utilisateurs avec leurs sites associés.',
+    'description': "Récupère la liste paginée des utilisateurs avec leurs sites associés (pagination par curseur sur l'ID).",
+    'parameters': PAGINATION_PARAMETERS + [STREAM_PARAMETER],
     'responses': {
         200: {
-            'description': 'Liste des utilisateurs avec leurs sites.',
-            'schema': {
-                'type': 'array',
-                'items': {
-                    'type': 'object',
-                    'properties': {
-                        'id': {'type': 'integer', 'example': 1},
-                        'login': {'type': 'string', 'example': 'user1'},
-                        'roles': {
-                            'type': 'array',
-                            'items': {'type': 'string'},
-                            'example': ['user']
-                        },
-                        'sites': {
-                            'type': 'array',
-                            'items': {
-                                'type': 'object',
-                                'properties': {
-                                    'id': {'type': 'integer', 'example': 3},
-                                    'name': {'type': 'string', 'example': 'Site test 1'}
-                                }
-                            },
-                            'example': [
-                                {'id': 3, 'name': 'Site test 1'},
-                                {'id': 4, 'name': 'Site test 2'}
-                            ]
+            'description': 'Page d\'utilisateurs avec leurs sites.',
+            'schema': paginated_schema({
+                'id': {'type': 'integer', 'example': 1},
+                'login': {'type': 'string', 'example': 'user1'},
+                'roles': {
+                    'type': 'array',
+                    'items': {'type': 'string'},
+                    'example': ['user']
+                },
+                'sites': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'id': {'type': 'integer', 'example': 3},
+                            'name': {'type': 'string', 'example': 'Site test 1'}
                         }
-                    }
+                    },
+                    'example': [
+                        {'id': 3, 'name': 'Site test 1'},
+                        {'id': 4, 'name': 'Site test 2'}
+                    ]
                 }
-            }
+            })
         },
+        400: {'description': 'Paramètres de pagination ou de flux invalides.'},
         500: {'description': 'Erreur interne.'}
     }
 })
 def get_users():
     try:
-        users = User.query.all()
-        result = []
-        for user in users:
-            roles = [role.name for role in user.roles]
-            # Pour chaque site, on retourne uniquement l'id et le nom
-            sites = [{'id': site.id, 'name': site.name} for site in user.sites]
-            result.append({
-                'id': user.id,
-                'login': user.login,
-                'roles': roles,
-                'sites': sites
-            })
-        return jsonify(result), 200
+        # Rôles et sites chargés en une requête IN par relation pour toute la page (pas de N+1)
+        query = User.query.options(selectinload(User.roles), selectinload(User.sites))
+        stream_format = get_stream_format()
+        if stream_format:
+            return stream_query(query.order_by(User.id), serialize_user_with_sites, stream_format)
+        users, next_cursor = paginate(query, User.id)
+        result = [serialize_user_with_sites(user) for user in users]
+        return jsonify({'items': result, 'next': next_cursor}), 200
+    except (PaginationError, StreamFormatError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in get_users: {e}")
         return jsonify({'error': str(e)}), 500
@@ -98,7 +104,7 @@ def get_users():
 })
 def get_user(user_id):
     try:
-        user = User.query.get(user_id)
+        user = User.query.options(joinedload(User.roles)).get(user_id)
         if not user:
             return jsonify({'error': 'Utilisateur non trouvé'}), 404
         roles = [role.name for role in user.roles]
@@ -1,6 +1,7 @@
 # routes/user_site_routes.py
 from flask import Blueprint, request, jsonify, current_app
 from flasgger import swag_from
+from sqlalchemy.orm import joinedload
 from models import db
 from models.user import User
 from models.site import Site
@@ -41,7 +42,7 @@ user_site_bp = Blueprint('user_site_bp', __name__)
 })
 def get_user_sites(user_id):
     try:
-        user = User.query.get(user_id)
+        user = User.query.options(joinedload(User.sites)).get(user_id)
         if not user:
             return jsonify({'error': "Utilisateur non trouvé"}), 404
         sites = user.sites
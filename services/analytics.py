@@ -0,0 +1,256 @@
+# services/analytics.py
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from flask import current_app, request
+from sqlalchemy import Float, case, cast, extract, func, literal_column, select
+from sqlalchemy.dialects.mssql import DATETIME2
+
+from models import db
+from models.baes import Baes
+from models.batiment import Batiment
+from models.etage import Etage
+from models.historique_erreur import HistoriqueErreur, error_types
+from services.erreurs import FilterError, get_time_range
+
+SCOPES = ('site', 'batiment', 'etage')
+DEFAULT_PERIOD_DAYS = 30
+# Une BAES en panne signale de nouveau son erreur : sans signalement pendant ce délai
+# après la dernière erreur d'un incident, elle est considérée comme réparée
+RECOVERY_HOURS = 24
+# Lignes lues par aller-retour sur le curseur serveur
+FETCH_BATCH_SIZE = 100000
+
+HOUR = 3600.0
+
+
+def get_reliability_args():
+    """Paramètres de GET /analytics/reliability : scope, id et période (30 derniers jours par défaut)."""
+    scope = request.args.get('scope')
+    if scope not in SCOPES:
+        raise FilterError(f"Le paramètre scope doit valoir {' ou '.join(SCOPES)}")
+    scope_id = request.args.get('id')
+    try:
+        scope_id = int(scope_id)
+    except (TypeError, ValueError):
+        raise FilterError('Le paramètre id est requis et doit être un entier')
+    start, end = get_time_range()
+    if end is None:
+        end = datetime.now(timezone.utc)
+    if start is None:
+        start = end - timedelta(days=DEFAULT_PERIOD_DAYS)
+    if start >= end:
+        raise FilterError('Le paramètre from doit précéder to')
+    return scope, scope_id, start, end
+
+
+def epoch_seconds(column, dialect):
+    """Secondes depuis 1970-01-01 UTC, calculées par la base : aucun datetime Python n'est construit."""
+    if dialect == 'mssql':
+        utc = cast(func.switchoffset(column, literal_column("'+00:00'")), DATETIME2)
+        return func.datediff_big(literal_column('second'), literal_column("'19700101'"), utc)
+    if dialect == 'postgresql':
+        return extract('epoch', column)
+    if dialect == 'sqlite':
+        return (func.julianday(column) - 2440587.5) * 86400.0
+    raise NotImplementedError(f'Calcul de fiabilité non supporté pour {dialect}')
+
+
+def scope_filter(query, scope, scope_id):
+    """Restreint aux BAES du site, bâtiment ou étage donné une requête déjà jointe à baes et etages."""
+    if scope == 'etage':
+        return query.where(Baes.etage_id == scope_id)
+    if scope == 'batiment':
+        return query.where(Etage.batiment_id == scope_id)
+    return query.join(Batiment, Batiment.id == Etage.batiment_id).where(Batiment.site_id == scope_id)
+
+
+def load_baes(scope, scope_id):
+    """BAES du périmètre, triées par ID : (ids, etage_ids, batiment_ids) en tableaux."""
+    query = select(Baes.id, Baes.etage_id, Etage.batiment_id).join(Etage, Etage.id == Baes.etage_id)
+    rows = db.session.execute(scope_filter(query, scope, scope_id).order_by(Baes.id)).all()
+    columns = np.array(rows, dtype=np.int64).reshape(-1, 3)
+    return columns[:, 0], columns[:, 1], columns[:, 2]
+
+
+def load_erreurs(scope, scope_id, start, end, batch_size=FETCH_BATCH_SIZE):
+    """
+    Erreurs du périmètre sur [start, end[ en colonnes NumPy : baes_id, code du type
+    (indice dans error_types), début et dernière occurrence (secondes epoch), occurrences.
+    Les lignes sont lues par paquets et converties paquet par paquet.
+    """
+    dialect = db.session.get_bind().dialect.name
+    type_code = case(
+        {name: index for index, name in enumerate(error_types)}, value=HistoriqueErreur.type_erreur
+    )
+    query = select(
+        HistoriqueErreur.baes_id,
+        type_code,
+        cast(epoch_seconds(HistoriqueErreur.timestamp, dialect), Float),
+        cast(epoch_seconds(HistoriqueErreur.last_seen, dialect), Float),
+        HistoriqueErreur.occurrences
+    ).join(Baes, Baes.id == HistoriqueErreur.baes_id).join(Etage, Etage.id == Baes.etage_id)
+    # Ordre de l'index (baes_id, timestamp) : le calcul n'a plus à trier
+    query = scope_filter(query, scope, scope_id).where(
+        HistoriqueErreur.timestamp >= start, HistoriqueErreur.timestamp < end
+    ).order_by(HistoriqueErreur.baes_id, HistoriqueErreur.timestamp)
+    chunks = [
+        np.array(part, dtype=np.float64).reshape(-1, 5)
+        for part in db.session.execute(query.execution_options(yield_per=batch_size)).partitions()
+    ]
+    data = np.concatenate(chunks) if chunks else np.empty((0, 5))
+    return (
+        data[:, 0].astype(np.int64), data[:, 1].astype(np.int64),
+        data[:, 2], data[:, 3], data[:, 4]
+    )
+
+
+def incidents(group, starts, ends, recovery):
+    """
+    Regroupe les erreurs triées par (groupe, début) en incidents : une erreur ouvre un
+    incident si elle survient plus de ``recovery`` secondes après la fin (dernière
+    occurrence) de toutes les erreurs précédentes de son groupe.
+    Retourne (groupe, début, dernière occurrence) de chaque incident.
+    """
+    if not len(starts):
+        return group[:0], starts[:0], ends[:0]
+    # Maximum cumulé par groupe en un seul accumulate : chaque groupe est décalé
+    # au-delà des valeurs de tous les groupes précédents
+    origin = starts.min()
+    width = ends.max() - origin + 1.0
+    offset = group * width
+    running_end = np.maximum.accumulate(ends - origin + offset) - offset + origin
+
+    first = np.ones(len(starts), dtype=bool)
+    first[1:] = group[1:] != group[:-1]
+    opens = first.copy()
+    opens[1:] |= starts[1:] > running_end[:-1] + recovery
+    index = np.flatnonzero(opens)
+    return group[index], starts[index], np.maximum.reduceat(ends, index)
+
+
+def compute_reliability(baes_ids, erreur_baes, erreur_types, starts, ends, occurrences,
+                        period_start, period_end, recovery):
+    """
+    Indicateurs par BAES (tableaux alignés sur ``baes_ids``, triés) sur la période
+    [period_start, period_end] (secondes epoch) :
+
+    - failures : nombre d'incidents ;
+    - downtime : durée d'indisponibilité, de la première erreur d'un incident à sa
+      dernière occurrence + ``recovery`` (bornée à la fin de période) ;
+    - uptime : période - downtime ; MTBF = uptime / failures ;
+    - interval_sum / interval_count : écarts entre débuts d'incidents successifs ;
+    - errors : occurrences par type d'erreur (colonnes dans l'ordre de error_types).
+    """
+    size = len(baes_ids)
+    # Indice de chaque erreur dans baes_ids par table de correspondance (plus rapide qu'une
+    # recherche dichotomique) ; les erreurs d'une BAES absente de baes_ids sont ignorées
+    lookup = np.full(max(int(baes_ids.max()), int(erreur_baes.max(initial=0))) + 1, -1, dtype=np.int64)
+    lookup[baes_ids] = np.arange(size)
+    group = lookup[erreur_baes]
+    known = group >= 0
+    if not known.all():
+        group, erreur_types, starts, ends, occurrences = (
+            group[known], erreur_types[known], starts[known], ends[known], occurrences[known]
+        )
+    # Tri par (BAES, début) sur une clé unique ; inutile si la base a déjà trié les lignes
+    if len(starts):
+        key = group * (starts.max() - starts.min() + 1.0) + (starts - starts.min())
+        if not (key[1:] >= key[:-1]).all():
+            order = np.argsort(key)
+            group, erreur_types, starts, ends, occurrences = (
+                group[order], erreur_types[order], starts[order], ends[order], occurrences[order]
+            )
+
+    incident_group, incident_start, incident_end = incidents(group, starts, ends, recovery)
+    incident_end = np.minimum(incident_end + recovery, period_end)
+    downtime = np.bincount(incident_group, weights=incident_end - incident_start, minlength=size)
+    failures = np.bincount(incident_group, minlength=size)
+
+    same = incident_group[1:] == incident_group[:-1]
+    gaps = np.diff(incident_start)[same]
+    gap_group = incident_group[1:][same]
+
+    errors = np.bincount(
+        group * len(error_types) + erreur_types, weights=occurrences, minlength=size * len(error_types)
+    ).reshape(size, len(error_types))
+
+    return {
+        'failures': failures,
+        'downtime': downtime,
+        'uptime': (period_end - period_start) - downtime,
+        'interval_sum': np.bincount(gap_group, weights=gaps, minlength=size),
+        'interval_count': np.bincount(gap_group, minlength=size),
+        'errors': errors,
+    }
+
+
+def group_totals(metrics, keys):
+    """Somme des indicateurs par clé (étage, bâtiment) : (clés distinctes, sommes, nombre de BAES)."""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    totals = {}
+    for name, values in metrics.items():
+        if values.ndim == 1:
+            totals[name] = np.bincount(inverse, weights=values, minlength=len(unique))
+        else:
+            totals[name] = np.stack([
+                np.bincount(inverse, weights=values[:, column], minlength=len(unique))
+                for column in range(values.shape[1])
+            ], axis=1)
+    return unique, totals, np.bincount(inverse, minlength=len(unique))
+
+
+def hours(value):
+    return None if not np.isfinite(value) else round(float(value) / HOUR, 2)
+
+
+def dump_indicators(metrics, index, period, baes_count=1):
+    failures = int(metrics['failures'][index])
+    uptime = float(metrics['uptime'][index])
+    interval_count = int(metrics['interval_count'][index])
+    return {
+        'failures': failures,
+        'errors': dict(zip(error_types, (int(n) for n in metrics['errors'][index]))),
+        'downtime_hours': hours(metrics['downtime'][index]),
+        'availability': round(100.0 * uptime / (period * int(baes_count)), 3) if baes_count else None,
+        'mtbf_hours': hours(uptime / failures) if failures else None,
+        'mean_interval_hours': hours(metrics['interval_sum'][index] / interval_count) if interval_count else None,
+    }
+
+
+def reliability(scope, scope_id, start, end):
+    """
+    MTBF, disponibilité et temps d'arrêt des BAES d'un site, bâtiment ou étage :
+    par BAES, par étage, par bâtiment et pour le périmètre. Retourne None si le
+    périmètre ne contient aucune BAES.
+    """
+    recovery = current_app.config.get('ANALYTICS_RECOVERY_HOURS', RECOVERY_HOURS) * HOUR
+    baes_ids, etage_ids, batiment_ids = load_baes(scope, scope_id)
+    if not len(baes_ids):
+        return None
+    period_start, period_end = start.timestamp(), end.timestamp()
+    period = period_end - period_start
+    metrics = compute_reliability(
+        baes_ids, *load_erreurs(scope, scope_id, start, end), period_start, period_end, recovery
+    )
+
+    result = {
+        'scope': scope,
+        'id': scope_id,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'recovery_hours': recovery / HOUR,
+        'baes': [
+            {'baes_id': int(baes_id), 'etage_id': int(etage_id), **dump_indicators(metrics, i, period)}
+            for i, (baes_id, etage_id) in enumerate(zip(baes_ids, etage_ids))
+        ],
+    }
+    for name, keys in (('etages', etage_ids), ('batiments', batiment_ids)):
+        unique, totals, counts = group_totals(metrics, keys)
+        result[name] = [
+            {'id': int(key), 'baes_count': int(counts[i]), **dump_indicators(totals, i, period, counts[i])}
+            for i, key in enumerate(unique)
+        ]
+    _, totals, counts = group_totals(metrics, np.zeros(len(baes_ids), dtype=np.int64))
+    result['summary'] = {'baes_count': int(counts[0]), **dump_indicators(totals, 0, period, counts[0])}
+    return result
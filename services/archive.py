@@ -0,0 +1,95 @@
+# services/archive.py
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+
+from models import db
+from models.historique_erreur import HistoriqueErreur
+from utils.dates import as_utc
+
+RETENTION_DAYS = 365
+# SQL Server escalade les verrous de ligne en verrou de table à partir de 5000 verrous
+# par instruction : les lots restent en dessous
+ARCHIVE_BATCH_SIZE = 4000
+
+
+class ArchiveError(RuntimeError):
+    """
+    Un lot supprimé ne correspond pas au lot archivé : la suppression est annulée, le lot
+    reste en base (et dans le fichier) et sera de nouveau archivé au prochain passage.
+    """
+
+
+def archive_path(directory, now):
+    return os.path.join(directory, f"historique_erreur_{now:%Y%m%dT%H%M%SZ}.ndjson.gz")
+
+
+def dump_row(row):
+    return {
+        column: as_utc(value).isoformat() if isinstance(value, datetime) else value
+        for column, value in row._mapping.items()
+    }
+
+
+def archive_erreurs(directory, max_id, retention_days=RETENTION_DAYS, batch_size=ARCHIVE_BATCH_SIZE, log=None):
+    """
+    Archive puis supprime les erreurs plus anciennes que ``retention_days`` jours et
+    d'ID au plus ``max_id`` (le watermark des agrégats : une ligne n'est supprimée
+    qu'une fois comptée dans les tables d'agrégats).
+
+    Les lignes sont lues par ordre d'ID, écrites dans un fichier NDJSON compressé
+    (gzip), synchronisé sur disque, puis supprimées par plage d'ID : une transaction
+    courte par lot. Retourne (nombre de lignes archivées, chemin du fichier ou None).
+    """
+    now = datetime.now(timezone.utc)
+    before = now - timedelta(days=retention_days)
+    table = HistoriqueErreur.__table__
+    os.makedirs(directory, exist_ok=True)
+    path = archive_path(directory, now)
+
+    total = 0
+    last_id = 0
+    raw = out = None
+    try:
+        while True:
+            rows = db.session.execute(
+                select(table)
+                .where(table.c.id > last_id, table.c.id <= max_id, table.c.timestamp < before)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                db.session.commit()
+                break
+            if out is None:
+                raw = open(path, 'wb')
+                out = gzip.GzipFile(fileobj=raw, mode='wb')
+            out.write(b''.join(
+                json.dumps(dump_row(row), separators=(',', ':')).encode('utf-8') + b'\n' for row in rows
+            ))
+            # Le lot doit être sur disque avant que sa suppression ne soit commitée
+            out.flush()
+            os.fsync(raw.fileno())
+
+            first_id, last_id = rows[0].id, rows[-1].id
+            deleted = db.session.execute(
+                delete(table).where(table.c.id >= first_id, table.c.id <= last_id, table.c.timestamp < before)
+            ).rowcount
+            if deleted != len(rows):
+                # Une ligne de la plage a été commitée entre la lecture et la suppression
+                raise ArchiveError(f'Lot {first_id}-{last_id} : {deleted} lignes supprimées pour {len(rows)} archivées')
+            db.session.commit()
+            total += len(rows)
+            if log:
+                log(f"{total} erreurs archivées (jusqu'à l'ID {last_id})")
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if out is not None:
+            out.close()
+            raw.close()
+    return total, path if total else None
@@ -0,0 +1,157 @@
+# services/baes_status.py
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from models import db
+from models.baes import Baes
+from models.baes_status import BaesStatus
+from models.batiment import Batiment
+from models.etage import Etage
+from utils.bulk import chunked
+from utils.dates import as_utc
+from utils.locking import for_update
+
+STATUS_WINDOW_HOURS = 24
+
+
+def status_window():
+    return timedelta(hours=current_app.config.get('BAES_STATUS_WINDOW_HOURS', STATUS_WINDOW_HOURS))
+
+
+def lock_statuses(baes_ids):
+    """Lignes baes_status existantes de ``baes_ids``, verrouillées jusqu'au commit : {baes_id: ligne}."""
+    statuses = {}
+    for chunk in chunked(baes_ids):
+        query = for_update(select(BaesStatus).where(BaesStatus.baes_id.in_(chunk)), BaesStatus)
+        for status in db.session.execute(query).scalars():
+            statuses[status.baes_id] = status
+    return statuses
+
+
+def new_status(baes_id, first):
+    return BaesStatus(
+        baes_id=baes_id, last_type_erreur=first['type_erreur'], last_timestamp=first['timestamp'],
+        window_start=first['timestamp'], window_count=0
+    )
+
+
+def create_statuses(by_baes, statuses):
+    """
+    Crée les lignes baes_status manquantes (première erreur d'une BAES), dans un savepoint.
+    Si un lot concurrent a inséré l'une d'elles entre-temps, chaque ligne est reprise une à
+    une : insérée, ou relue verrouillée pour y reporter les événements.
+    """
+    missing = {baes_id: new_status(baes_id, events[0]) for baes_id, events in by_baes.items() if baes_id not in statuses}
+    if not missing:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add_all(missing.values())
+        statuses.update(missing)
+        return
+    except IntegrityError:
+        pass
+    for baes_id in missing:
+        try:
+            with db.session.begin_nested():
+                status = new_status(baes_id, by_baes[baes_id][0])
+                db.session.add(status)
+            statuses[baes_id] = status
+        except IntegrityError:
+            statuses.update(lock_statuses([baes_id]))
+
+
+def update_statuses(events):
+    """
+    Reporte des événements validés sur baes_status (dernière erreur et compteur de la
+    fenêtre). Les lignes concernées sont verrouillées jusqu'au commit de l'appelant
+    (UPDLOCK sous SQL Server), afin que deux lots simultanés sur une même BAES ne
+    s'écrasent pas ; les lignes manquantes sont créées sans faire échouer le lot.
+    """
+    if not events:
+        return
+    window = status_window()
+    by_baes = {}
+    for event in sorted(events, key=lambda e: e['timestamp']):
+        by_baes.setdefault(event['baes_id'], []).append(event)
+
+    statuses = lock_statuses(list(by_baes))
+    create_statuses(by_baes, statuses)
+
+    for baes_id, baes_events in by_baes.items():
+        status = statuses[baes_id]
+        last_timestamp = as_utc(status.last_timestamp)
+        window_start = as_utc(status.window_start)
+        window_count = status.window_count
+        for event in baes_events:
+            timestamp = event['timestamp']
+            if timestamp >= last_timestamp:
+                status.last_type_erreur = event['type_erreur']
+                last_timestamp = timestamp
+            if timestamp >= window_start + window:
+                window_start, window_count = timestamp, 1
+            elif timestamp >= window_start:
+                window_count += 1
+            # Une erreur antérieure au début de la fenêtre ne change que l'historique
+        status.last_timestamp = last_timestamp
+        status.window_start = window_start
+        status.window_count = window_count
+    db.session.flush()
+
+
+def select_statuses():
+    """BAES et leur dernier état (les BAES sans erreur ont des colonnes d'état nulles)."""
+    return (
+        select(
+            Baes.id, Baes.name, Baes.etage_id, BaesStatus.last_type_erreur,
+            BaesStatus.last_timestamp, BaesStatus.window_start, BaesStatus.window_count
+        )
+        .outerjoin(BaesStatus, BaesStatus.baes_id == Baes.id)
+        .order_by(Baes.id)
+    )
+
+
+def etage_statuses(etage_id):
+    return db.session.execute(select_statuses().where(Baes.etage_id == etage_id)).all()
+
+
+def site_statuses(site_id):
+    query = (
+        select_statuses()
+        .join(Etage, Etage.id == Baes.etage_id)
+        .join(Batiment, Batiment.id == Etage.batiment_id)
+        .where(Batiment.site_id == site_id)
+    )
+    return db.session.execute(query).all()
+
+
+def dump_status(row, now=None):
+    """Sérialise une ligne de select_statuses ; le compteur d'une fenêtre expirée vaut 0."""
+    now = now or datetime.now(timezone.utc)
+    window_count = 0
+    if row.window_start is not None and as_utc(row.window_start) + status_window() > now:
+        window_count = row.window_count
+    return {
+        'baes_id': row.id,
+        'name': row.name,
+        'etage_id': row.etage_id,
+        'last_type_erreur': row.last_type_erreur,
+        'last_timestamp': as_utc(row.last_timestamp).isoformat() if row.last_timestamp else None,
+        'window_count': window_count,
+        'in_error': window_count > 0
+    }
+
+
+# Schéma Swagger d'un élément des routes /etages/<id>/baes/status et /sites/<id>/baes/status
+STATUS_ITEM_PROPERTIES = {
+    'baes_id': {'type': 'integer', 'example': 1},
+    'name': {'type': 'string', 'example': 'BAES 1'},
+    'etage_id': {'type': 'integer', 'example': 1},
+    'last_type_erreur': {'type': 'string', 'example': 'erreur_batterie', 'description': 'null si aucune erreur.'},
+    'last_timestamp': {'type': 'string', 'format': 'date-time', 'example': '2025-03-19T08:30:00+00:00'},
+    'window_count': {'type': 'integer', 'example': 3, 'description': 'Erreurs dans la fenêtre en cours.'},
+    'in_error': {'type': 'boolean', 'example': True}
+}
@@ -0,0 +1,223 @@
+# services/blobs.py
+import hashlib
+import mimetypes
+import os
+import tempfile
+
+from flask import current_app
+from sqlalchemy import delete, event, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import db
+from models.carte import Carte
+from models.carte_blob import CarteBlob
+from services.images import image_normalizer
+from services.tiles import remove_tiles
+
+# Taille des blocs lus puis hachés pendant l'écriture sur disque
+BLOB_CHUNK_SIZE = 64 * 1024
+
+
+def blobs_folder(upload_folder):
+    return os.path.join(upload_folder, 'blobs')
+
+
+def blob_path(upload_folder, sha256):
+    # Un sous-dossier par préfixe de deux caractères : pas de dossier à des milliers d'entrées
+    return os.path.join(blobs_folder(upload_folder), sha256[:2], sha256)
+
+
+def temp_folder(upload_folder):
+    folder = os.path.join(blobs_folder(upload_folder), 'tmp')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def write_temp_blob(stream, upload_folder):
+    """
+    Copie ``stream`` dans un fichier temporaire du dossier des blobs en calculant son
+    SHA-256 au fil de l'écriture. Retourne (sha256, taille, chemin temporaire).
+    """
+    folder = temp_folder(upload_folder)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=folder)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(BLOB_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+    except Exception:
+        os.remove(temp_path)
+        raise
+    return digest.hexdigest(), size, temp_path
+
+
+def normalize_blob(upload_folder, sha256, size, temp_path):
+    """
+    Normalise l'image reçue (orientation, résolution, métadonnées, réencodage) dans un
+    nouveau fichier temporaire, qui remplace ``temp_path``. Un fichier qui n'est pas une
+    image JPEG ou PNG lisible est gardé tel quel.
+    Retourne (sha256, taille, chemin temporaire, largeur, hauteur) du contenu à stocker.
+    """
+    app = current_app._get_current_object()
+    if not app.config.get('CARTE_IMAGE_NORMALIZE', True):
+        return sha256, size, temp_path, None, None
+    fd, output_path = tempfile.mkstemp(dir=temp_folder(upload_folder))
+    os.close(fd)
+    try:
+        result = image_normalizer.normalize(app, temp_path, output_path)
+    except Exception as e:
+        result = None
+        app.logger.error(f"Error in normalize_blob for {sha256}: {e}")
+    if result is None:
+        os.remove(output_path)
+        return sha256, size, temp_path, None, None
+    os.remove(temp_path)
+    normalized_sha256, normalized_size, width, height = result
+    return normalized_sha256, normalized_size, output_path, width, height
+
+
+def change_ref_count(sha256, delta):
+    """
+    Ajoute ``delta`` au compteur du blob en une seule instruction UPDATE : la ligne reste
+    verrouillée (verrou exclusif) jusqu'au commit, sur tous les dialectes. Retourne le
+    nouveau compteur, ou None si le blob n'existe pas.
+    """
+    table = CarteBlob.__table__
+    return db.session.execute(
+        update(table)
+        .where(table.c.sha256 == sha256)
+        .values(ref_count=table.c.ref_count + delta)
+        .returning(table.c.ref_count)
+    ).scalar_one_or_none()
+
+
+def acquire_blob(upload_folder, sha256, size, temp_path):
+    """
+    Ajoute une référence au blob ``sha256`` (créé s'il n'existe pas) et garantit la
+    présence de son fichier : le fichier temporaire y est déplacé, ou supprimé si le
+    contenu est déjà stocké. La ligne reste verrouillée jusqu'au commit de l'appelant,
+    une suppression concurrente du même contenu attend donc ce commit. Le fichier d'un
+    blob créé par la transaction est supprimé si elle est annulée.
+    Retourne True si le contenu était déjà stocké.
+    """
+    created = False
+    if change_ref_count(sha256, 1) is None:
+        try:
+            # Deux uploads simultanés d'un nouveau contenu : le second incrémente la ligne du premier
+            with db.session.begin_nested():
+                db.session.execute(insert(CarteBlob.__table__).values(sha256=sha256, size=size, ref_count=1))
+            created = True
+        except IntegrityError:
+            change_ref_count(sha256, 1)
+
+    path = blob_path(upload_folder, sha256)
+    if os.path.exists(path):
+        os.remove(temp_path)
+        return True
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(temp_path, path)
+    if created:
+        remove_on_rollback(path)
+    return False
+
+
+# Fichiers de blobs créés par la transaction en cours : supprimés si elle se termine sans
+# commit (rollback ou fermeture), pour ne pas laisser de fichier sans ligne carte_blobs.
+# (after_commit et after_rollback se déclenchent aussi pour un savepoint : seule la
+# transaction racine compte)
+
+def remove_on_rollback(path):
+    db.session.info.setdefault('created_blob_files', []).append(path)
+
+
+@event.listens_for(Session, 'after_commit')
+def _keep_created_blob_files(session):
+    if not session.in_nested_transaction():
+        session.info.pop('created_blob_files', None)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _remove_created_blob_files(session, transaction):
+    if transaction.parent is not None:
+        return
+    for path in session.info.pop('created_blob_files', ()):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def create_carte(upload_folder, sha256, size, temp_path, original_name, content_type=None, **relations):
+    """
+    Crée la carte qui référence le contenu ``sha256`` déjà écrit dans ``temp_path``,
+    sans commit. Les images sont d'abord normalisées : la carte référence l'empreinte
+    du contenu normalisé. Retourne (carte, déjà stocké).
+    """
+    try:
+        sha256, size, temp_path, width, height = normalize_blob(upload_folder, sha256, size, temp_path)
+        existing = acquire_blob(upload_folder, sha256, size, temp_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    original_name = original_name[:255]
+    carte = Carte(
+        chemin=blob_path(upload_folder, sha256),
+        sha256=sha256,
+        original_name=original_name,
+        content_type=mimetypes.guess_type(original_name)[0] or content_type,
+        width=width,
+        height=height,
+        size=size,
+        **relations
+    )
+    db.session.add(carte)
+    return carte, existing
+
+
+def store_carte(file, upload_folder, **relations):
+    """
+    Enregistre un fichier de carte uploadé (FileStorage) par contenu et crée la carte
+    qui le référence, sans commit. Retourne (carte, déjà stocké).
+    """
+    sha256, size, temp_path = write_temp_blob(file.stream, upload_folder)
+    return create_carte(upload_folder, sha256, size, temp_path, file.filename, file.mimetype, **relations)
+
+
+def remove_carte(carte, upload_folder):
+    """
+    Supprime la carte et retire sa référence au blob ; le fichier est supprimé avec la
+    dernière référence. Il est d'abord renommé, puis effacé après le commit (ou remis
+    en place si la transaction échoue). Commit inclus.
+    """
+    sha256 = carte.sha256
+    removed = None
+    db.session.delete(carte)
+    try:
+        db.session.flush()
+        # Décrément atomique : un upload concurrent du même contenu attend ce commit
+        if sha256 is not None and (change_ref_count(sha256, -1) or 0) <= 0:
+            table = CarteBlob.__table__
+            db.session.execute(delete(table).where(table.c.sha256 == sha256, table.c.ref_count <= 0))
+            path = blob_path(upload_folder, sha256)
+            if os.path.exists(path):
+                removed = (path, path + '.deleted')
+                os.replace(*removed)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        if removed and os.path.exists(removed[1]):
+            os.replace(removed[1], removed[0])
+        raise
+    if removed:
+        os.remove(removed[1])
+        remove_tiles(upload_folder, sha256)
@@ -0,0 +1,111 @@
+# services/coalesce.py
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db
+
+RECENT_MAXSIZE = 100000
+
+# Ligne d'historique ouverte au regroupement : créée (horloge du serveur) à ``created``,
+# elle accueille les événements de ``timestamp`` à ``timestamp`` + fenêtre
+RecentErreur = namedtuple('RecentErreur', 'row_id timestamp last_seen created')
+
+
+class RecentErreurs:
+    """
+    Dernière ligne d'historique connue par (baes_id, type_erreur), en mémoire et bornée
+    (LRU) : la décision de regrouper un événement ne coûte aucune requête. La table
+    n'est mise à jour qu'après le commit de la transaction qui a écrit les lignes.
+    Propre au processus : plusieurs workers peuvent chacun ouvrir une ligne pour
+    une même BAES, les totaux restent exacts.
+    """
+
+    def __init__(self, maxsize=RECENT_MAXSIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def update(self, entries):
+        with self._lock:
+            for key, entry in entries.items():
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+recent_erreurs = RecentErreurs()
+
+
+def coalesce_rows(rows, window_seconds, now):
+    """
+    Regroupe ``rows`` (dicts baes_id, type_erreur, timestamp) : un événement identique
+    à une ligne ouverte depuis moins de ``window_seconds`` et tombant dans sa fenêtre
+    incrémente ses occurrences au lieu de créer une ligne.
+
+    Retourne (lignes à insérer avec occurrences et last_seen,
+    {row_id: incréments des lignes existantes}).
+    """
+    window = timedelta(seconds=window_seconds)
+    new_rows = []
+    updates = {}
+    open_rows = {}
+    for row in sorted(rows, key=lambda r: r['timestamp']):
+        key = (row['baes_id'], row['type_erreur'])
+        timestamp = row['timestamp']
+        current = open_rows.get(key)
+        if current is not None and timestamp <= current['timestamp'] + window:
+            current['occurrences'] += 1
+            current['last_seen'] = max(current['last_seen'], timestamp)
+            continue
+        entry = recent_erreurs.get(key)
+        if (entry is not None and now - entry.created <= window
+                and entry.timestamp <= timestamp <= entry.timestamp + window):
+            update = updates.setdefault(entry.row_id, {'key': key, 'occurrences': 0, 'last_seen': entry.last_seen})
+            update['occurrences'] += 1
+            update['last_seen'] = max(update['last_seen'], timestamp)
+            continue
+        row['occurrences'] = 1
+        row['last_seen'] = timestamp
+        new_rows.append(row)
+        open_rows[key] = row
+    return new_rows, updates
+
+
+def remember_after_commit(new_rows, updates, now):
+    """Prépare la mise à jour de la table en mémoire, appliquée au commit de la session."""
+    pending = db.session.info.setdefault('recent_erreurs', {})
+    for row_id, update in updates.items():
+        entry = recent_erreurs.get(update['key'])
+        if entry is not None and entry.row_id == row_id:
+            pending[update['key']] = entry._replace(last_seen=max(entry.last_seen, update['last_seen']))
+    # Une clé garde la ligne la plus récente (un événement en retard peut ouvrir une ligne plus ancienne)
+    for row in new_rows:
+        key = (row['baes_id'], row['type_erreur'])
+        latest = pending.get(key) or recent_erreurs.get(key)
+        if latest is None or row['timestamp'] >= latest.timestamp:
+            pending[key] = RecentErreur(row['id'], row['timestamp'], row['last_seen'], now)
+
+
+@event.listens_for(Session, 'after_commit')
+def _remember_committed(session):
+    entries = session.info.pop('recent_erreurs', None)
+    if entries:
+        recent_erreurs.update(entries)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back(session):
+    session.info.pop('recent_erreurs', None)
@@ -0,0 +1,223 @@
+# services/erreurs.py
+import json
+from datetime import datetime, timezone
+
+from flask import current_app, request
+from sqlalchemy import bindparam, case, update
+
+from models import db
+from models.baes import Baes
+from models.historique_erreur import HistoriqueErreur, error_types
+from services.baes_status import update_statuses
+from services.coalesce import coalesce_rows, remember_after_commit
+from services.events import broker, queue_for_publication
+from utils.bulk import BulkError, existing_values
+from utils.dates import as_utc
+from utils.serializers import historique_serializer
+
+BATCH_MAX_EVENTS = 50000
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+
+def read_events_payload():
+    """
+    Lit le corps d'une requête d'ingestion : tableau JSON, ou NDJSON (un objet par
+    ligne) si le Content-Type l'indique. Lève BulkError si le corps est inexploitable.
+    """
+    max_events = current_app.config.get('ERREURS_BATCH_MAX_EVENTS', BATCH_MAX_EVENTS)
+    if request.mimetype in NDJSON_MIMETYPES:
+        items = []
+        for number, line in enumerate(request.stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                raise BulkError(f'Ligne NDJSON {number} invalide')
+            if len(items) > max_events:
+                raise BulkError(f'Au plus {max_events} événements par requête')
+    else:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            raise BulkError('Le corps de la requête doit être un tableau JSON ou du NDJSON')
+        if len(items) > max_events:
+            raise BulkError(f'Au plus {max_events} événements par requête')
+    if not items:
+        raise BulkError('Aucun événement fourni')
+    return items
+
+
+class FilterError(ValueError):
+    """Paramètre de filtre invalide dans la query string (dates, type, identifiants)."""
+
+
+def parse_timestamp(value, now):
+    if value is None:
+        return now
+    if not isinstance(value, str):
+        raise ValueError
+    # Un horodatage sans fuseau est considéré comme UTC ; tout est stocké en UTC
+    return as_utc(datetime.fromisoformat(value))
+
+
+def validate_events(items):
+    """
+    Valide la forme de chaque événement {baes_id, type_erreur, timestamp} sans
+    accès à la base. Retourne (événements valides, erreurs par index).
+    """
+    now = datetime.now(timezone.utc)
+    events = []
+    errors = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'error': 'Chaque événement doit être un objet JSON'})
+            continue
+        baes_id = item.get('baes_id')
+        if not isinstance(baes_id, int) or isinstance(baes_id, bool):
+            errors.append({'index': index, 'error': 'Le champ baes_id doit être un entier'})
+            continue
+        type_erreur = item.get('type_erreur')
+        if type_erreur not in error_types:
+            errors.append({'index': index, 'error': f"type_erreur doit valoir {' ou '.join(error_types)}"})
+            continue
+        try:
+            timestamp = parse_timestamp(item.get('timestamp'), now)
+        except ValueError:
+            errors.append({'index': index, 'error': 'Le champ timestamp doit être une date ISO 8601'})
+            continue
+        events.append({'index': index, 'baes_id': baes_id, 'type_erreur': type_erreur, 'timestamp': timestamp})
+    return events, errors
+
+
+def resolve_baes(events, errors):
+    """Écarte les événements dont la BAES n'existe pas (une requête IN pour toutes les BAES du lot)."""
+    known = existing_values(Baes.id, {event['baes_id'] for event in events})
+    kept = []
+    for event in events:
+        if event['baes_id'] in known:
+            kept.append(event)
+        else:
+            errors.append({'index': event['index'], 'error': 'BAES non trouvée'})
+    return kept
+
+
+def record_events(events):
+    """
+    Enregistre des événements validés : insertion dans l'historique et mise à jour de
+    baes_status, dans la transaction courante. Ne commit pas.
+    """
+    inserted = insert_events(events)
+    update_statuses(events)
+    return inserted
+
+
+def insert_events(events):
+    """
+    Insère les événements en une seule instruction executemany (fast_executemany
+    sur SQL Server quand aucun ID n'est récupéré). Ne commit pas : l'appelant
+    maîtrise la transaction.
+
+    Avec ERREURS_COALESCE_WINDOW_SECONDS, les événements répétés d'une BAES sont
+    regroupés (voir services.coalesce) : ils incrémentent ``occurrences`` d'une
+    ligne existante au lieu d'en créer une. Les IDs générés sont alors récupérés
+    (RETURNING), comme lorsque des clients suivent GET /erreurs/stream.
+    Retourne le nombre d'événements enregistrés.
+    """
+    if not events:
+        return 0
+    now = datetime.now(timezone.utc)
+    rows = [{
+        'baes_id': event['baes_id'],
+        'type_erreur': event['type_erreur'],
+        'timestamp': event['timestamp'],
+        'occurrences': 1,
+        'last_seen': event['timestamp'],
+        'created_at': now,
+        'updated_at': now
+    } for event in events]
+    table = HistoriqueErreur.__table__
+    window = current_app.config.get('ERREURS_COALESCE_WINDOW_SECONDS', 0)
+    updates = {}
+    if window:
+        rows, updates = coalesce_rows(rows, window, now)
+
+    if rows and (window or broker.has_subscribers):
+        ids = db.session.execute(table.insert().returning(table.c.id, sort_by_parameter_order=True), rows).scalars()
+        for row, new_id in zip(rows, ids):
+            row['id'] = new_id
+        if broker.has_subscribers:
+            queue_for_publication(rows)
+    elif rows:
+        db.session.execute(table.insert(), rows)
+
+    if updates:
+        last_seen = bindparam('b_last_seen')
+        db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam('b_id'))
+            .values(
+                occurrences=table.c.occurrences + bindparam('b_occurrences'),
+                last_seen=case((table.c.last_seen < last_seen, last_seen), else_=table.c.last_seen),
+                updated_at=now
+            ),
+            [
+                {'b_id': row_id, 'b_occurrences': increment['occurrences'], 'b_last_seen': increment['last_seen']}
+                for row_id, increment in updates.items()
+            ]
+        )
+    if window:
+        remember_after_commit(rows, updates, now)
+    return len(events)
+
+
+def get_datetime_arg(name):
+    """Lit un paramètre date ISO 8601 de la query string (UTC si sans fuseau), ou None."""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return parse_timestamp(value, None)
+    except ValueError:
+        raise FilterError(f'Le paramètre {name} doit être une date ISO 8601')
+
+
+def get_time_range():
+    """Intervalle [from, to[ de la query string ; chaque borne est optionnelle."""
+    start = get_datetime_arg('from')
+    end = get_datetime_arg('to')
+    if start is not None and end is not None and start >= end:
+        raise FilterError('Le paramètre from doit précéder to')
+    return start, end
+
+
+def get_filters():
+    """Filtres de GET /erreurs : baes_id, type, from, to."""
+    baes_id = request.args.get('baes_id')
+    if baes_id is not None:
+        try:
+            baes_id = int(baes_id)
+        except ValueError:
+            raise FilterError('Le paramètre baes_id doit être un entier')
+    type_erreur = request.args.get('type')
+    if type_erreur is not None and type_erreur not in error_types:
+        raise FilterError(f"Le paramètre type doit valoir {' ou '.join(error_types)}")
+    start, end = get_time_range()
+    return baes_id, type_erreur, start, end
+
+
+def select_erreurs(baes_id=None, type_erreur=None, start=None, end=None):
+    """
+    SELECT des erreurs filtrées. Avec baes_id (ou type) le filtre d'égalité suivi de
+    la plage sur timestamp est couvert par l'index composite correspondant.
+    """
+    query = historique_serializer.select()
+    if baes_id is not None:
+        query = query.where(HistoriqueErreur.baes_id == baes_id)
+    if type_erreur is not None:
+        query = query.where(HistoriqueErreur.type_erreur == type_erreur)
+    if start is not None:
+        query = query.where(HistoriqueErreur.timestamp >= start)
+    if end is not None:
+        query = query.where(HistoriqueErreur.timestamp < end)
+    return query
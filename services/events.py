@@ -0,0 +1,190 @@
+# services/events.py
+import json
+import queue
+import threading
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from models import db
+from models.baes import Baes
+from models.batiment import Batiment
+from models.etage import Etage
+from models.historique_erreur import HistoriqueErreur
+from utils.bulk import chunked
+from utils.dates import as_utc
+
+STREAM_QUEUE_SIZE = 1000
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_REPLAY_MAX = 1000
+
+
+class Subscription:
+    """File d'un client SSE ; ``dropped`` passe à True si le client ne suit pas le rythme."""
+
+    def __init__(self, site_id, maxsize):
+        self.site_id = site_id
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = False
+
+
+class ErreurBroker:
+    """
+    Pub/sub en mémoire des erreurs commitées, propre au processus.
+
+    Chaque abonné a une file bornée : un abonné dont la file est pleine est
+    désabonné (et prévenu) plutôt que de faire grossir la mémoire ; il se
+    reconnecte avec Last-Event-ID et rattrape depuis la base.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @property
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def subscribe(self, site_id=None, maxsize=STREAM_QUEUE_SIZE):
+        subscription = Subscription(site_id, maxsize)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, erreurs):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            for erreur in erreurs:
+                if subscription.site_id is not None and erreur['site_id'] != subscription.site_id:
+                    continue
+                try:
+                    subscription.queue.put_nowait(erreur)
+                except queue.Full:
+                    subscription.dropped = True
+                    self.unsubscribe(subscription)
+                    break
+
+
+broker = ErreurBroker()
+
+
+def site_ids_for(baes_ids):
+    """{baes_id: site_id} pour les BAES données (site_id peut être None)."""
+    sites = {}
+    for chunk in chunked(set(baes_ids)):
+        sites.update(db.session.execute(
+            select(Baes.id, Batiment.site_id)
+            .join(Etage, Etage.id == Baes.etage_id)
+            .join(Batiment, Batiment.id == Etage.batiment_id)
+            .where(Baes.id.in_(chunk))
+        ).all())
+    return sites
+
+
+def dump_erreur(erreur_id, baes_id, type_erreur, timestamp, occurrences, site_id):
+    return {
+        'id': erreur_id,
+        'baes_id': baes_id,
+        'type_erreur': type_erreur,
+        'timestamp': as_utc(timestamp).isoformat(),
+        'occurrences': occurrences,
+        'site_id': site_id
+    }
+
+
+def queue_for_publication(rows):
+    """
+    Mémorise des erreurs insérées (dicts avec id) pour les publier au commit de la
+    session courante ; abandonnées si la transaction est annulée.
+    """
+    if not rows:
+        return
+    sites = site_ids_for(row['baes_id'] for row in rows)
+    pending = db.session.info.setdefault('erreurs_to_publish', [])
+    pending.extend(
+        dump_erreur(
+            row['id'], row['baes_id'], row['type_erreur'], row['timestamp'], row['occurrences'],
+            sites.get(row['baes_id'])
+        )
+        for row in rows
+    )
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_committed(session):
+    erreurs = session.info.pop('erreurs_to_publish', None)
+    if erreurs:
+        broker.publish(erreurs)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_unpublished(session):
+    session.info.pop('erreurs_to_publish', None)
+
+
+def replay_since(last_id, site_id=None, limit=STREAM_REPLAY_MAX):
+    """
+    Erreurs d'ID supérieur à ``last_id`` (reprise Last-Event-ID), dans l'ordre, au plus
+    ``limit``. Retourne (erreurs, tronqué) : tronqué si d'autres erreurs suivent.
+    """
+    query = (
+        select(HistoriqueErreur.id, HistoriqueErreur.baes_id, HistoriqueErreur.type_erreur,
+               HistoriqueErreur.timestamp, HistoriqueErreur.occurrences, Batiment.site_id)
+        .join(Baes, Baes.id == HistoriqueErreur.baes_id)
+        .join(Etage, Etage.id == Baes.etage_id)
+        .join(Batiment, Batiment.id == Etage.batiment_id)
+        .where(HistoriqueErreur.id > last_id)
+        .order_by(HistoriqueErreur.id)
+        .limit(limit + 1)
+    )
+    if site_id is not None:
+        query = query.where(Batiment.site_id == site_id)
+    rows = db.session.execute(query).all()
+    return [dump_erreur(*row) for row in rows[:limit]], len(rows) > limit
+
+
+def sse_message(erreur):
+    return f"id: {erreur['id']}\nevent: erreur\ndata: {json.dumps(erreur, separators=(',', ':'))}\n\n"
+
+
+def iter_sse(subscription, replayed, heartbeat=STREAM_HEARTBEAT_SECONDS, truncated=False):
+    """
+    Générateur SSE : les erreurs rejouées depuis la base, puis le flux en direct
+    (sans doublon avec la reprise), un commentaire de maintien toutes les
+    ``heartbeat`` secondes, et un événement ``dropped`` si l'abonné est décroché.
+    Une reprise ``truncated`` (plus d'erreurs manquées que la limite) se termine par
+    l'événement ``truncated`` et ferme le flux, sans passer au direct : le client se
+    reconnecte avec le dernier ID reçu et la reprise continue là où elle s'est arrêtée.
+    N'utilise pas la base : aucune connexion n'est retenue pendant le flux.
+    """
+    try:
+        yield "retry: 3000\n\n"
+        last_id = 0
+        for erreur in replayed:
+            last_id = erreur['id']
+            yield sse_message(erreur)
+        if truncated:
+            yield f"event: truncated\ndata: {json.dumps({'last_id': last_id})}\n\n"
+            return
+        while True:
+            try:
+                erreur = subscription.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                if subscription.dropped:
+                    yield "event: dropped\ndata: {}\n\n"
+                    return
+                yield ": ping\n\n"
+                continue
+            if erreur['id'] <= last_id:
+                continue
+            yield sse_message(erreur)
+            if subscription.dropped and subscription.queue.empty():
+                yield "event: dropped\ndata: {}\n\n"
+                return
+    finally:
+        broker.unsubscribe(subscription)
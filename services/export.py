@@ -0,0 +1,121 @@
+# services/export.py
+import csv
+import io
+import zlib
+
+from flask import current_app, request
+
+from models import db
+from models.baes import Baes
+from models.batiment import Batiment
+from models.etage import Etage
+from models.historique_erreur import HistoriqueErreur
+from services.erreurs import FilterError, get_time_range
+from utils.serializers import historique_serializer
+from utils.streaming import STREAM_BATCH_SIZE, iter_json
+
+# Lignes lues par aller-retour sur le curseur serveur pendant un export
+EXPORT_BATCH_SIZE = 5000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def get_export_args():
+    """Paramètres de GET /erreurs/export : site_id, from, to, format, gzip."""
+    site_id = request.args.get('site_id')
+    if site_id is not None:
+        try:
+            site_id = int(site_id)
+        except ValueError:
+            raise FilterError('Le paramètre site_id doit être un entier')
+    start, end = get_time_range()
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        raise FilterError(f"Le paramètre format doit valoir {' ou '.join(EXPORT_FORMATS)}")
+    compress = request.args.get('gzip', 'false').lower() in ('1', 'true', 'yes')
+    return site_id, start, end, fmt, compress
+
+
+def select_export(site_id=None, start=None, end=None):
+    """
+    SELECT des erreurs à exporter, dans l'ordre des ID (parcours de la clé primaire,
+    sans tri). Le filtre par site passe par les jointures BAES → étage → bâtiment.
+    """
+    query = historique_serializer.select().order_by(HistoriqueErreur.id)
+    if site_id is not None:
+        query = (
+            query.join(Baes, Baes.id == HistoriqueErreur.baes_id)
+            .join(Etage, Etage.id == Baes.etage_id)
+            .join(Batiment, Batiment.id == Etage.batiment_id)
+            .where(Batiment.site_id == site_id)
+        )
+    if start is not None:
+        query = query.where(HistoriqueErreur.timestamp >= start)
+    if end is not None:
+        query = query.where(HistoriqueErreur.timestamp < end)
+    return query
+
+
+def iter_csv(rows, serialize, fields, batch_size=STREAM_BATCH_SIZE):
+    """Sérialise ``rows`` en CSV (ligne d'en-tête comprise), un morceau par paquet de lignes."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(fields)
+    count = 0
+    for row in rows:
+        data = serialize(row)
+        writer.writerow([data[field] for field in fields])
+        count += 1
+        if count >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            count = 0
+    yield buffer.getvalue()
+
+
+def iter_gzip(chunks):
+    """Compresse au fil de l'eau (format gzip) un flux de morceaux texte."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(site_id, start, end, fmt, compress, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Générateur de l'export : les lignes sont lues via un curseur serveur (``yield_per``)
+    et chaque paquet est écrit (et compressé) dès sa lecture ; la mémoire reste
+    constante quelle que soit la taille de l'historique.
+    """
+    query = select_export(site_id, start, end).execution_options(yield_per=batch_size)
+    rows = db.session.execute(query)
+    try:
+        if fmt == 'csv':
+            chunks = iter_csv(rows, historique_serializer.dump, historique_serializer.fields, batch_size)
+        else:
+            chunks = iter_json(rows, historique_serializer.dump, 'ndjson', batch_size)
+        if compress:
+            chunks = iter_gzip(chunks)
+        yield from chunks
+    except Exception as e:
+        current_app.logger.error(f"Error in iter_export: {e}")
+        raise
+    finally:
+        rows.close()
+
+
+def export_filename(site_id, start, end, fmt, compress):
+    parts = ['historique_erreur']
+    if site_id is not None:
+        parts.append(f'site{site_id}')
+    if start is not None:
+        parts.append(f'{start:%Y%m%d}')
+    if end is not None:
+        parts.append(f'{end:%Y%m%d}')
+    return '_'.join(parts) + f'.{fmt}' + ('.gz' if compress else '')
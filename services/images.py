@@ -0,0 +1,111 @@
+# services/images.py
+import hashlib
+import io
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+IMAGE_MAX_SIZE = 8192
+IMAGE_QUALITY = 85
+IMAGE_WORKERS = 2
+
+
+def convert_to_srgb(image, icc_profile):
+    """
+    Convertit en RGB une image JPEG d'un autre espace (CMYK, YCCK). Le profil d'origine
+    décrit cet espace : les couleurs passent par lui vers sRGB, dont le profil remplace
+    l'original. Sans profil exploitable, conversion directe et aucun profil intégré.
+    Retourne (image, profil).
+    """
+    from PIL import ImageCms
+
+    if icc_profile:
+        try:
+            source = ImageCms.ImageCmsProfile(io.BytesIO(icc_profile))
+            srgb = ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB'))
+            image = ImageCms.profileToProfile(image, source, srgb, outputMode='RGB')
+            return image, srgb.tobytes()
+        except (ImageCms.PyCMSError, OSError, ValueError):
+            pass
+    return image.convert('RGB'), None
+
+
+def normalize_image(source_path, destination_path, max_size=IMAGE_MAX_SIZE, quality=IMAGE_QUALITY):
+    """
+    Normalise une image JPEG ou PNG dans ``destination_path`` : orientation EXIF
+    appliquée, plus grand côté limité à ``max_size`` px, métadonnées (EXIF, XMP,
+    commentaires) supprimées hors profil de couleurs, réencodage (JPEG progressif
+    à ``quality``, PNG optimisé). Un JPEG CMYK est converti en sRGB, profil compris.
+    Exécutée dans un processus du pool.
+    Retourne (sha256, taille, largeur, hauteur), ou None pour un autre format.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as image:
+        fmt = image.format
+        if fmt not in ('JPEG', 'PNG'):
+            return None
+        if fmt == 'JPEG':
+            # Décodage directement à 1/2, 1/4 ou 1/8 de la taille si l'image dépasse largement max_size
+            image.draft('RGB', (max_size, max_size))
+        icc_profile = image.info.get('icc_profile')
+        image = ImageOps.exif_transpose(image)
+    if max(image.size) > max_size:
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+    output = io.BytesIO()
+    if fmt == 'JPEG':
+        if image.mode not in ('RGB', 'L'):
+            # Le profil d'origine (CMYK) ne décrit plus les pixels RGB
+            image, icc_profile = convert_to_srgb(image, icc_profile)
+        image.save(output, 'JPEG', quality=quality, optimize=True, progressive=True, icc_profile=icc_profile)
+    else:
+        image.save(output, 'PNG', optimize=True, icc_profile=icc_profile)
+
+    data = output.getbuffer()
+    with open(destination_path, 'wb') as f:
+        f.write(data)
+    width, height = image.size
+    return hashlib.sha256(data).hexdigest(), len(data), width, height
+
+
+class ImageNormalizer:
+    """
+    Exécute normalize_image dans un pool de processus : le décodage et le réencodage
+    des grandes photos ne retiennent pas le GIL des threads qui servent les requêtes.
+    Les processus sont lancés en « spawn » (pas de fork d'un processus multi-thread).
+    """
+
+    def __init__(self, workers=IMAGE_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self, app):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=app.config.get('CARTE_IMAGE_WORKERS', self.workers),
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def normalize(self, app, source_path, destination_path):
+        executor = self._get_executor(app)
+        future = executor.submit(
+            normalize_image, source_path, destination_path,
+            app.config.get('CARTE_IMAGE_MAX_SIZE', IMAGE_MAX_SIZE),
+            app.config.get('CARTE_IMAGE_QUALITY', IMAGE_QUALITY)
+        )
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            # Processus tué (mémoire) : pool recréé à la prochaine image
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+
+
+image_normalizer = ImageNormalizer()
@@ -0,0 +1,156 @@
+# services/rollup.py
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, bindparam, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db
+from models.historique_erreur import HistoriqueErreur
+from models.historique_erreur_rollup import (
+    HISTORIQUE_WATERMARK, ErreurRollupHoraire, ErreurRollupJournalier, RollupWatermark
+)
+from services.stats import bucket_datetime, bucket_expression
+from utils.bulk import chunked
+from utils.locking import for_update
+
+ROLLUP_BATCH_SIZE = 50000
+# Les lignes plus récentes que ce délai ne sont pas encore agrégées : une transaction
+# d'insertion plus ancienne (ID plus petit) peut ne pas être encore commitée, et une
+# ligne regroupant des erreurs répétées peut encore voir ses occurrences augmenter
+# (flask erreurs rollup ajoute ERREURS_COALESCE_WINDOW_SECONDS à ce délai)
+ROLLUP_LAG_SECONDS = 60
+
+
+class WatermarkConflict(RuntimeError):
+    """Le watermark a été avancé par un autre passage pendant le lot : le lot est annulé."""
+
+
+def lock_watermark():
+    """Ligne de watermark verrouillée jusqu'à la fin de la transaction (créée au premier passage)."""
+    query = for_update(
+        select(RollupWatermark).where(RollupWatermark.name == HISTORIQUE_WATERMARK), RollupWatermark
+    )
+    watermark = db.session.execute(query).scalar_one_or_none()
+    if watermark is None:
+        try:
+            # Deux premiers passages simultanés : le second relit la ligne créée par le premier
+            with db.session.begin_nested():
+                db.session.add(RollupWatermark(name=HISTORIQUE_WATERMARK, last_id=0))
+        except IntegrityError:
+            pass
+        watermark = db.session.execute(query).scalar_one()
+    return watermark
+
+
+def advance_watermark(last_id, upper):
+    """
+    Avance le watermark de ``last_id`` à ``upper`` si personne ne l'a déplacé entre-temps ;
+    sinon WatermarkConflict (le lot serait compté deux fois).
+    """
+    result = db.session.execute(
+        update(RollupWatermark)
+        .where(RollupWatermark.name == HISTORIQUE_WATERMARK, RollupWatermark.last_id == last_id)
+        .values(last_id=upper)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        raise WatermarkConflict(f'Watermark déplacé pendant le lot {last_id}-{upper}')
+
+
+def next_upper_id(last_id, batch_size, lag):
+    """Plus grand ID du prochain lot : au plus ``batch_size`` lignes après ``last_id``, assez anciennes."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=lag)
+    ids = (
+        select(HistoriqueErreur.id)
+        .where(HistoriqueErreur.id > last_id, HistoriqueErreur.created_at <= cutoff)
+        .order_by(HistoriqueErreur.id)
+        .limit(batch_size)
+        .subquery()
+    )
+    return db.session.execute(select(func.max(ids.c.id))).scalar()
+
+
+def upsert_counts(model, counts):
+    """Ajoute ``counts`` {(bucket, baes_id, type_erreur): n} aux lignes de ``model`` (executemany)."""
+    table = model.__table__
+    buckets = [key[0] for key in counts]
+    existing = set()
+    for baes_ids in chunked({key[1] for key in counts}):
+        rows = db.session.execute(
+            select(table.c.bucket, table.c.baes_id, table.c.type_erreur).where(
+                table.c.bucket.between(min(buckets), max(buckets)),
+                table.c.baes_id.in_(baes_ids)
+            )
+        )
+        existing.update((bucket_datetime(bucket), baes_id, type_erreur) for bucket, baes_id, type_erreur in rows)
+
+    updates = [
+        {'b_bucket': bucket, 'b_baes_id': baes_id, 'b_type_erreur': type_erreur, 'b_count': n}
+        for (bucket, baes_id, type_erreur), n in counts.items() if (bucket, baes_id, type_erreur) in existing
+    ]
+    inserts = [
+        {'bucket': bucket, 'baes_id': baes_id, 'type_erreur': type_erreur, 'count': n}
+        for (bucket, baes_id, type_erreur), n in counts.items() if (bucket, baes_id, type_erreur) not in existing
+    ]
+    if updates:
+        db.session.execute(
+            update(table)
+            .where(and_(
+                table.c.bucket == bindparam('b_bucket'),
+                table.c.baes_id == bindparam('b_baes_id'),
+                table.c.type_erreur == bindparam('b_type_erreur')
+            ))
+            .values(count=table.c.count + bindparam('b_count')),
+            updates
+        )
+    if inserts:
+        db.session.execute(insert(table), inserts)
+
+
+def rollup_batch(batch_size=ROLLUP_BATCH_SIZE, lag=ROLLUP_LAG_SECONDS):
+    """
+    Agrège le prochain lot de historique_erreur (IDs au-delà du watermark) dans les
+    tables horaire et journalière, puis avance le watermark, dans une seule transaction.
+    Retourne le nombre de lignes source traitées (0 quand il n'y a plus rien à faire).
+    """
+    try:
+        watermark = lock_watermark()
+        upper = next_upper_id(watermark.last_id, batch_size, lag)
+        if upper is None:
+            db.session.commit()
+            return 0
+
+        dialect = db.session.get_bind().dialect.name
+        hour = bucket_expression(HistoriqueErreur.timestamp, 'hour', dialect)
+        rows = db.session.execute(
+            select(HistoriqueErreur.baes_id, HistoriqueErreur.type_erreur, hour, func.sum(HistoriqueErreur.occurrences))
+            .where(HistoriqueErreur.id > watermark.last_id, HistoriqueErreur.id <= upper)
+            .group_by(HistoriqueErreur.baes_id, HistoriqueErreur.type_erreur, hour)
+        ).all()
+
+        hourly = Counter()
+        daily = Counter()
+        for baes_id, type_erreur, bucket, n in rows:
+            bucket = bucket_datetime(bucket)
+            hourly[(bucket, baes_id, type_erreur)] += n
+            daily[(bucket.replace(hour=0), baes_id, type_erreur)] += n
+        upsert_counts(ErreurRollupHoraire, hourly)
+        upsert_counts(ErreurRollupJournalier, daily)
+
+        advance_watermark(watermark.last_id, upper)
+        db.session.commit()
+        return sum(hourly.values())
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def run_rollup(batch_size=ROLLUP_BATCH_SIZE, lag=ROLLUP_LAG_SECONDS):
+    """Enchaîne les lots jusqu'à rattraper le délai de sécurité ; retourne le total traité."""
+    total = 0
+    while True:
+        processed = rollup_batch(batch_size, lag)
+        if not processed:
+            return total
+        total += processed
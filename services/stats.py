@@ -0,0 +1,166 @@
+# services/stats.py
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import case, cast, func, literal_column, select
+from sqlalchemy.dialects.mssql import DATETIME2
+
+from models import db
+from models.baes import Baes
+from models.batiment import Batiment
+from models.etage import Etage
+from models.historique_erreur import HistoriqueErreur, error_types
+from models.historique_erreur_rollup import (
+    HISTORIQUE_WATERMARK, ErreurRollupHoraire, ErreurRollupJournalier, RollupWatermark
+)
+from services.erreurs import FilterError, get_time_range
+from utils.dates import as_utc
+
+GROUP_BY_LEVELS = ('baes', 'etage', 'batiment', 'site')
+BUCKETS = ('hour', 'day', 'week')
+
+
+def get_stats_args():
+    """Lit group_by, bucket, from et to dans la query string."""
+    group_by = request.args.get('group_by', 'baes')
+    if group_by not in GROUP_BY_LEVELS:
+        raise FilterError(f"Le paramètre group_by doit valoir {', '.join(GROUP_BY_LEVELS)}")
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        raise FilterError(f"Le paramètre bucket doit valoir {', '.join(BUCKETS)}")
+    start, end = get_time_range()
+    return group_by, bucket, start, end
+
+
+def bucket_expression(column, bucket, dialect):
+    """
+    Début de l'intervalle (UTC) contenant ``column``, calculé par la base. Les
+    semaines commencent le lundi. Aucune valeur n'est passée en paramètre lié :
+    SQL Server exige que l'expression du SELECT soit identique à celle du GROUP BY.
+    """
+    if dialect == 'mssql':
+        # DATETIMEOFFSET ramené en UTC puis arrondi par DATEDIFF depuis 1900-01-01 (un lundi)
+        utc = cast(func.switchoffset(column, literal_column("'+00:00'")), DATETIME2)
+        zero = literal_column('0')
+        if bucket == 'week':
+            days = func.datediff(literal_column('day'), zero, utc)
+            # Division entière explicite (l'opérateur / de SQLAlchemy forcerait une division réelle)
+            weeks = days.op('/')(literal_column('7'))
+            return func.dateadd(literal_column('day'), weeks.op('*')(literal_column('7')), zero)
+        unit = literal_column(bucket)
+        return func.dateadd(unit, func.datediff(unit, zero, utc), zero)
+    if dialect == 'postgresql':
+        return func.date_trunc(literal_column(f"'{bucket}'"), func.timezone(literal_column("'UTC'"), column))
+    if dialect == 'sqlite':
+        if bucket == 'week':
+            return func.strftime(literal_column("'%Y-%m-%dT00:00:00'"), column,
+                                 literal_column("'weekday 0'"), literal_column("'-6 days'"))
+        fmt = '%Y-%m-%dT%H:00:00' if bucket == 'hour' else '%Y-%m-%dT00:00:00'
+        return func.strftime(literal_column(f"'{fmt}'"), column)
+    raise NotImplementedError(f'Agrégation par intervalle non supportée pour {dialect}')
+
+
+def group_key(query, group_by, baes_column):
+    """Ajoute les jointures nécessaires et retourne (requête, colonne de regroupement)."""
+    if group_by == 'baes':
+        return query, baes_column
+    query = query.join(Baes, Baes.id == baes_column)
+    if group_by == 'etage':
+        return query, Baes.etage_id
+    query = query.join(Etage, Etage.id == Baes.etage_id)
+    if group_by == 'batiment':
+        return query, Etage.batiment_id
+    query = query.join(Batiment, Batiment.id == Etage.batiment_id)
+    return query, Batiment.site_id
+
+
+def bucket_datetime(value):
+    # Selon le dialecte un début d'intervalle revient en datetime (avec ou sans fuseau) ou en texte ISO
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return as_utc(value)
+
+
+def format_bucket(value):
+    return bucket_datetime(value).isoformat()
+
+
+def is_aligned(value, unit):
+    """Vrai si ``value`` (UTC) tombe sur un début d'heure ou de jour."""
+    if value is None:
+        return True
+    if value.minute or value.second or value.microsecond:
+        return False
+    return unit == 'hour' or value.hour == 0
+
+
+def rollup_source(bucket, start, end):
+    """
+    Table d'agrégats utilisable pour ``bucket`` sur [start, end[ : l'horaire pour des
+    heures, la journalière pour des jours ou des semaines, à condition que les bornes
+    tombent sur des débuts d'intervalle de cette table. Sinon None.
+    """
+    model, unit = (ErreurRollupHoraire, 'hour') if bucket == 'hour' else (ErreurRollupJournalier, 'day')
+    if is_aligned(start, unit) and is_aligned(end, unit):
+        return model
+    return None
+
+
+def rollup_watermark():
+    """Dernier ID de historique_erreur intégré aux agrégats (0 si aucun)."""
+    last_id = db.session.execute(
+        select(RollupWatermark.last_id).where(RollupWatermark.name == HISTORIQUE_WATERMARK)
+    ).scalar()
+    return last_id or 0
+
+
+def counts_query(source, time_column, weight, group_by, bucket, dialect, start, end):
+    """GROUP BY (niveau, intervalle) sur ``source``, chaque ligne pesant ``weight`` erreurs."""
+    bucket_start = bucket_expression(time_column, bucket, dialect)
+    query, key = group_key(select().select_from(source), group_by, source.baes_id)
+    per_type = [
+        func.sum(case((source.type_erreur == type_erreur, weight), else_=0))
+        for type_erreur in error_types
+    ]
+    query = query.add_columns(key, bucket_start, *per_type, func.sum(weight))
+    if start is not None:
+        query = query.where(time_column >= start)
+    if end is not None:
+        query = query.where(time_column < end)
+    return query.group_by(key, bucket_start)
+
+
+def error_counts(group_by, bucket, start=None, end=None):
+    """
+    Nombre d'erreurs par (niveau, intervalle), ventilé par type_erreur. Retourne
+    (lignes [id, début d'intervalle, un compteur par type, total], source).
+
+    Si les bornes le permettent, les agrégats (voir services.rollup) sont lus et
+    complétés par les seules lignes brutes postérieures au watermark : le résultat
+    est exact sans attendre le prochain passage du traitement d'agrégation.
+    """
+    dialect = db.session.get_bind().dialect.name
+    raw = counts_query(
+        HistoriqueErreur, HistoriqueErreur.timestamp, HistoriqueErreur.occurrences,
+        group_by, bucket, dialect, start, end
+    )
+    rollup = rollup_source(bucket, start, end)
+    watermark = rollup_watermark() if rollup is not None else 0
+    if not watermark:
+        queries, source = [raw], 'raw'
+    else:
+        queries = [
+            counts_query(rollup, rollup.bucket, rollup.count, group_by, bucket, dialect, start, end),
+            raw.where(HistoriqueErreur.id > watermark)
+        ]
+        source = 'rollup'
+
+    merged = {}
+    for query in queries:
+        for row in db.session.execute(query):
+            counts = merged.setdefault((row[0], format_bucket(row[1])), [0] * (len(error_types) + 1))
+            for position, count in enumerate(row[2:]):
+                counts[position] += int(count or 0)
+    rows = [[key, bucket_start] + counts for (key, bucket_start), counts in merged.items()]
+    rows.sort(key=lambda row: (row[1], row[0]))
+    return rows, source
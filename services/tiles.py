@@ -0,0 +1,177 @@
+# services/tiles.py
+import json
+import math
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from models import db
+from models.carte_blob import CarteBlob
+from utils.locking import file_lock
+
+TILE_SIZE = 256
+TILE_WORKERS = 2
+TILE_FORMATS = {'jpg': 'image/jpeg', 'png': 'image/png'}
+
+
+def tiles_folder(upload_folder, sha256):
+    # Les tuiles dépendent du seul contenu : partagées par les cartes d'un même blob
+    return os.path.join(upload_folder, 'tiles', sha256[:2], sha256)
+
+
+def tile_path(upload_folder, sha256, z, x, y, fmt):
+    return os.path.join(tiles_folder(upload_folder, sha256), str(z), f'{x}_{y}.{fmt}')
+
+
+def tiles_lock(upload_folder, sha256):
+    """
+    Verrou des pyramides d'un préfixe d'empreinte (un fichier par dossier tiles/<xx>) :
+    sérialise la mise en place d'une pyramide et la suppression des tuiles, entre workers.
+    """
+    folder = os.path.dirname(tiles_folder(upload_folder, sha256))
+    os.makedirs(folder, exist_ok=True)
+    return open(os.path.join(folder, '.lock'), 'a')
+
+
+def read_tile_info(upload_folder, sha256):
+    """Description de la pyramide (taille, niveaux, format) ou None si elle n'est pas encore construite."""
+    try:
+        with open(os.path.join(tiles_folder(upload_folder, sha256), 'info.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def level_size(info, z):
+    """(largeur, hauteur, colonnes, lignes) du niveau ``z`` ; le niveau max_zoom est la pleine résolution."""
+    scale = 2 ** (info['max_zoom'] - z)
+    width = max(1, math.ceil(info['width'] / scale))
+    height = max(1, math.ceil(info['height'] / scale))
+    return width, height, math.ceil(width / info['tile_size']), math.ceil(height / info['tile_size'])
+
+
+def build_pyramid(source_path, destination, tile_size=TILE_SIZE):
+    """
+    Découpe l'image en tuiles ``tile_size`` px à chaque niveau de zoom, du niveau 0
+    (toute l'image dans une tuile) à la pleine résolution, dans ``destination`` :
+    <z>/<x>_<y>.<format> et info.json (écrit en dernier).
+    """
+    from PIL import Image
+
+    with Image.open(source_path) as image:
+        image.load()
+        transparent = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        fmt = 'png' if transparent else 'jpg'
+        level = image.convert('RGBA' if transparent else 'RGB')
+    width, height = level.size
+    max_zoom = max(0, math.ceil(math.log2(max(width, height) / tile_size)))
+
+    for z in range(max_zoom, -1, -1):
+        os.makedirs(os.path.join(destination, str(z)), exist_ok=True)
+        level_width, level_height = level.size
+        for x in range(math.ceil(level_width / tile_size)):
+            for y in range(math.ceil(level_height / tile_size)):
+                box = (x * tile_size, y * tile_size,
+                       min((x + 1) * tile_size, level_width), min((y + 1) * tile_size, level_height))
+                tile = level.crop(box)
+                if fmt == 'jpg':
+                    tile.save(os.path.join(destination, str(z), f'{x}_{y}.jpg'), 'JPEG', quality=85)
+                else:
+                    tile.save(os.path.join(destination, str(z), f'{x}_{y}.png'), 'PNG', optimize=True)
+        if z:
+            # Niveau suivant : moitié de la résolution (bords arrondis au supérieur)
+            level = level.reduce(2)
+
+    info = {'width': width, 'height': height, 'tile_size': tile_size, 'max_zoom': max_zoom, 'format': fmt}
+    with open(os.path.join(destination, 'info.json'), 'w', encoding='utf-8') as f:
+        json.dump(info, f)
+    return info
+
+
+class TileBuilder:
+    """
+    Construit les pyramides de tuiles en arrière-plan (pool de threads), une seule fois
+    par contenu : les demandes pour une pyramide déjà construite ou en cours sont ignorées.
+    Une pyramide est construite dans un dossier temporaire puis renommée : un dossier
+    de tuiles visible est toujours complet. Elle est abandonnée si le blob a été
+    supprimé pendant la construction (remove_tiles a déjà eu lieu).
+    """
+
+    def __init__(self, workers=TILE_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._pending = set()
+        # Contenus dont la pyramide a échoué (image illisible) : pas de nouvel essai dans ce processus
+        self._failed = set()
+        self._lock = threading.Lock()
+
+    def submit(self, app, sha256, source_path):
+        upload_folder = app.config['UPLOAD_FOLDER']
+        if read_tile_info(upload_folder, sha256) is not None:
+            return False
+        with self._lock:
+            if sha256 in self._pending or sha256 in self._failed:
+                return False
+            self._pending.add(sha256)
+            if self._executor is None:
+                workers = app.config.get('CARTE_TILE_WORKERS', self.workers)
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='carte-tiles')
+        self._executor.submit(self._build, app, sha256, source_path)
+        return True
+
+    def pending(self, sha256):
+        with self._lock:
+            return sha256 in self._pending
+
+    def failed(self, sha256):
+        with self._lock:
+            return sha256 in self._failed
+
+    def _build(self, app, sha256, source_path):
+        upload_folder = app.config['UPLOAD_FOLDER']
+        destination = tiles_folder(upload_folder, sha256)
+        temp = f'{destination}.{uuid.uuid4().hex}.tmp'
+        try:
+            build_pyramid(source_path, temp, app.config.get('CARTE_TILE_SIZE', TILE_SIZE))
+            # Sous le verrou de remove_tiles : le blob existe encore et ses tuiles seront
+            # supprimées avec lui, ou il a déjà été supprimé et la pyramide est abandonnée
+            with tiles_lock(upload_folder, sha256) as lock, file_lock(lock):
+                if not blob_exists(app, sha256):
+                    shutil.rmtree(temp, ignore_errors=True)
+                    return
+                try:
+                    os.rename(temp, destination)
+                except OSError:
+                    # Pyramide construite entre-temps par un autre processus
+                    shutil.rmtree(temp, ignore_errors=True)
+        except Exception as e:
+            shutil.rmtree(temp, ignore_errors=True)
+            if not blob_exists(app, sha256):
+                # Fichier source supprimé avec le blob : pas un échec de l'image
+                return
+            with self._lock:
+                self._failed.add(sha256)
+            app.logger.error(f"Error in tile build for {sha256}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(sha256)
+
+
+tile_builder = TileBuilder()
+
+
+def blob_exists(app, sha256):
+    """Le blob est-il encore enregistré (transaction et session propres au thread de construction) ?"""
+    with app.app_context():
+        try:
+            return db.session.get(CarteBlob, sha256) is not None
+        finally:
+            db.session.remove()
+
+
+def remove_tiles(upload_folder, sha256):
+    """Supprime les tuiles d'un blob supprimé (après le commit de la suppression)."""
+    with tiles_lock(upload_folder, sha256) as lock, file_lock(lock):
+        shutil.rmtree(tiles_folder(upload_folder, sha256), ignore_errors=True)
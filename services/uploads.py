@@ -0,0 +1,192 @@
+# services/uploads.py
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+
+from services.blobs import BLOB_CHUNK_SIZE, blobs_folder, create_carte, temp_folder
+from utils.locking import file_lock
+
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_MAX_SIZE = 1024 * 1024 * 1024
+UPLOAD_EXPIRY_HOURS = 24
+
+UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+SHA256 = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(ValueError):
+    """Requête du protocole d'upload invalide (400)."""
+
+
+class UploadNotFound(LookupError):
+    """Upload inconnu, expiré ou déjà finalisé (404)."""
+
+
+class OffsetMismatch(ValueError):
+    """Le morceau ne commence pas à la fin des données reçues (409) ; ``offset`` indique où reprendre."""
+
+    def __init__(self, offset):
+        super().__init__(f'Offset attendu : {offset}')
+        self.offset = offset
+
+
+def uploads_folder(upload_folder):
+    # Dans le dossier des blobs : le fichier finalisé y est déplacé sans copie
+    return os.path.join(blobs_folder(upload_folder), 'partial')
+
+
+def upload_paths(upload_folder, upload_id):
+    """(données reçues, métadonnées JSON) d'un upload ; l'ID est vérifié avant de construire un chemin."""
+    if not UPLOAD_ID.match(upload_id):
+        raise UploadNotFound(upload_id)
+    base = os.path.join(uploads_folder(upload_folder), upload_id)
+    return base + '.part', base + '.json'
+
+
+def read_metadata(upload_folder, upload_id):
+    part_path, meta_path = upload_paths(upload_folder, upload_id)
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            metadata = json.load(f)
+        metadata['offset'] = os.path.getsize(part_path)
+    except FileNotFoundError:
+        raise UploadNotFound(upload_id)
+    metadata['upload_id'] = upload_id
+    return metadata
+
+
+def purge_expired(upload_folder, expiry_hours=UPLOAD_EXPIRY_HOURS):
+    """
+    Supprime les uploads sans nouveau morceau depuis ``expiry_hours`` heures (date de
+    modification des fichiers, les métadonnées étant touchées à chaque morceau).
+    """
+    folder = uploads_folder(upload_folder)
+    if not os.path.isdir(folder):
+        return
+    limit = time.time() - expiry_hours * 3600
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        try:
+            if os.path.getmtime(path) < limit:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def init_upload(upload_folder, filename, size, sha256, max_size=UPLOAD_MAX_SIZE, **relations):
+    """
+    Ouvre un upload par morceaux : fichier de données vide et métadonnées (nom, taille
+    et SHA-256 annoncés, étage ou site). Retourne les métadonnées, avec ``upload_id``.
+    """
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        raise UploadError('Le champ size doit être un entier positif')
+    if size > max_size:
+        raise UploadError(f'Fichier trop volumineux (maximum {max_size} octets)')
+    if not isinstance(sha256, str) or not SHA256.match(sha256.lower()):
+        raise UploadError('Le champ sha256 doit être une empreinte SHA-256 hexadécimale')
+
+    os.makedirs(uploads_folder(upload_folder), exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    part_path, meta_path = upload_paths(upload_folder, upload_id)
+    metadata = {
+        'filename': filename[:255],
+        'size': size,
+        'sha256': sha256.lower(),
+        'relations': relations,
+    }
+    open(part_path, 'wb').close()
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f)
+    return read_metadata(upload_folder, upload_id)
+
+
+@contextmanager
+def locked_part(part_path):
+    """Données reçues ouvertes en ajout, sous verrou exclusif (flock, partagé entre les workers)."""
+    with open(part_path, 'ab') as out, file_lock(out):
+        yield out
+
+
+def append_chunk(upload_folder, upload_id, offset, stream):
+    """
+    Ajoute le corps ``stream`` à la suite des données reçues, par blocs (mémoire bornée).
+    ``offset`` doit être égal à la taille déjà reçue, sinon OffsetMismatch indique où
+    reprendre. Un morceau interrompu reste acquis jusqu'au dernier bloc écrit : le client
+    reprend à l'offset renvoyé par GET. Retourne le nouvel offset.
+    Les écritures d'un même upload sont sérialisées : un morceau renvoyé pendant que le
+    premier envoi écrit encore attend la fin de celui-ci, puis est refusé (409).
+    """
+    metadata = read_metadata(upload_folder, upload_id)
+    part_path, _ = upload_paths(upload_folder, upload_id)
+    with locked_part(part_path) as out:
+        # Taille relue sous le verrou : elle a pu changer depuis read_metadata
+        received = os.fstat(out.fileno()).st_size
+        if offset != received:
+            raise OffsetMismatch(received)
+        while True:
+            chunk = stream.read(BLOB_CHUNK_SIZE)
+            if not chunk:
+                break
+            received += len(chunk)
+            if received > metadata['size']:
+                raise UploadError(f"Le morceau dépasse la taille annoncée ({metadata['size']} octets)")
+            out.write(chunk)
+    # Les métadonnées ne sont plus réécrites après l'ouverture : sans cela, purge_expired
+    # supprimerait le .json d'un upload encore actif
+    os.utime(upload_paths(upload_folder, upload_id)[1])
+    return received
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(BLOB_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def finalize_upload(upload_folder, upload_id):
+    """
+    Vérifie la taille et l'empreinte des données reçues puis crée la carte (sans commit)
+    à partir d'un lien physique vers le fichier reçu (copie si le lien est impossible).
+    L'upload reste en place : complete_upload le supprime après le commit, et un commit
+    en échec n'oblige pas à renvoyer le fichier. Retourne (carte, déjà stocké).
+    Un upload dont l'empreinte ne correspond pas est supprimé : il faut le recommencer.
+    """
+    metadata = read_metadata(upload_folder, upload_id)
+    if metadata['offset'] != metadata['size']:
+        raise UploadError(f"Upload incomplet : {metadata['offset']} octets reçus sur {metadata['size']}")
+    part_path, _ = upload_paths(upload_folder, upload_id)
+    if file_sha256(part_path) != metadata['sha256']:
+        abort_upload(upload_folder, upload_id)
+        raise UploadError("L'empreinte SHA-256 des données reçues ne correspond pas : upload annulé")
+    temp_path = os.path.join(temp_folder(upload_folder), uuid.uuid4().hex)
+    try:
+        os.link(part_path, temp_path)
+    except OSError:
+        shutil.copyfile(part_path, temp_path)
+    return create_carte(
+        upload_folder, metadata['sha256'], metadata['size'], temp_path, metadata['filename'],
+        **metadata['relations']
+    )
+
+
+def complete_upload(upload_folder, upload_id):
+    """Supprime l'upload d'une carte commitée."""
+    abort_upload(upload_folder, upload_id)
+
+
+def abort_upload(upload_folder, upload_id):
+    for path in upload_paths(upload_folder, upload_id):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
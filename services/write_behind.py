@@ -0,0 +1,179 @@
+# services/write_behind.py
+import atexit
+import threading
+import time
+from collections import deque
+
+from sqlalchemy.exc import DataError, IntegrityError
+
+from models import db
+from services.erreurs import record_events, resolve_baes
+
+QUEUE_MAXSIZE = 100000
+FLUSH_BATCH_SIZE = 5000
+FLUSH_INTERVAL_SECONDS = 0.5
+FLUSH_RETRIES = 3
+
+# Refus dus au contenu du lot (BAES supprimée depuis la mise en file, valeur invalide) :
+# un nouvel essai échouerait de même
+REJECTED_ERRORS = (IntegrityError, DataError)
+
+
+class WriteBehindQueue:
+    """
+    File d'écriture différée des erreurs BAES.
+
+    La route valide les événements puis les dépose dans une file bornée en mémoire ;
+    un thread d'écriture les enregistre par lots (dès ``batch_size`` événements ou
+    toutes les ``flush_interval`` secondes), une transaction par lot. La file pleine
+    est signalée à l'appelant (429) plutôt que de grossir. Les événements encore en
+    file sont écrits à l'arrêt du processus ; un arrêt brutal (kill -9) les perd.
+    Un événement refusé par la base n'entraîne que son propre abandon (voir _write).
+    """
+
+    def __init__(self, maxsize=QUEUE_MAXSIZE, batch_size=FLUSH_BATCH_SIZE, flush_interval=FLUSH_INTERVAL_SECONDS):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._events = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        # Interrompt l'attente entre deux tentatives quand le processus s'arrête
+        self._stop_requested = threading.Event()
+        self._app = None
+        self.written = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def configure(self, maxsize=None, batch_size=None, flush_interval=None):
+        with self._condition:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if batch_size is not None:
+                self.batch_size = batch_size
+            if flush_interval is not None:
+                self.flush_interval = flush_interval
+
+    def offer(self, app, events):
+        """Ajoute ``events`` à la file (tous ou aucun) ; False si la file est pleine."""
+        with self._condition:
+            if len(self._events) + len(events) > self.maxsize:
+                self.rejected += len(events)
+                return False
+            self._events.extend(events)
+            if self._thread is None:
+                self._start(app)
+            if len(self._events) >= self.batch_size:
+                self._condition.notify()
+            return True
+
+    def _start(self, app):
+        self._app = app
+        self._stopping = False
+        self._stop_requested.clear()
+        self._thread = threading.Thread(target=self._run, name='erreurs-write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _take_batch(self):
+        with self._condition:
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._events) < self.batch_size and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            count = min(len(self._events), self.batch_size)
+            return [self._events.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._write(batch)
+            elif self._stopping:
+                return
+
+    def _write(self, batch):
+        """
+        Écrit le lot, une transaction par sous-lot. Un sous-lot refusé par la base est
+        filtré des BAES supprimées depuis la mise en file, sinon coupé en deux jusqu'à
+        isoler l'événement refusé : seuls les événements fautifs sont abandonnés. Les
+        autres erreurs (connexion, deadlock) sont retentées ``FLUSH_RETRIES`` fois au
+        plus, sans réécrire les sous-lots déjà commités.
+        """
+        pending = [batch]
+        attempt = 0
+        with self._app.app_context():
+            while pending:
+                part = pending.pop()
+                try:
+                    record_events(part)
+                    db.session.commit()
+                    self.written += len(part)
+                    attempt = 0
+                except REJECTED_ERRORS as e:
+                    db.session.rollback()
+                    pending.extend(reversed(self._split_rejected(part, e)))
+                except Exception as e:
+                    db.session.rollback()
+                    attempt += 1
+                    self._app.logger.error(f"Error in write-behind flush (tentative {attempt}): {e}")
+                    if attempt >= FLUSH_RETRIES:
+                        dropped = len(part) + sum(len(p) for p in pending)
+                        self.failed += dropped
+                        self._app.logger.error(f"Write-behind : {dropped} erreurs abandonnées après {FLUSH_RETRIES} tentatives")
+                        return
+                    pending.append(part)
+                    self._stop_requested.wait(attempt)
+                finally:
+                    db.session.remove()
+
+    def _split_rejected(self, part, error):
+        """Sous-lots à réécrire après un refus de la base (les événements abandonnés sont comptés)."""
+        kept = resolve_baes(part, [])
+        if len(kept) == len(part):
+            if len(part) > 1:
+                middle = len(part) // 2
+                return [part[:middle], part[middle:]]
+            kept = []
+        dropped = len(part) - len(kept)
+        self.failed += dropped
+        self._app.logger.error(f"Write-behind : {dropped} erreurs refusées par la base abandonnées : {error}")
+        return [kept] if kept else []
+
+    def stop(self, timeout=30):
+        """Écrit les événements restants puis arrête le thread d'écriture."""
+        with self._condition:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+            self._stop_requested.set()
+            self._condition.notify()
+        thread.join(timeout)
+        with self._condition:
+            self._thread = None
+
+    def stats(self):
+        with self._condition:
+            return {
+                'queued': len(self._events),
+                'maxsize': self.maxsize,
+                'written': self.written,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'running': self._thread is not None
+            }
+
+
+write_behind = WriteBehindQueue()
+
+
+def init_write_behind(app):
+    write_behind.configure(
+        maxsize=app.config.get('ERREURS_WRITE_BEHIND_MAXSIZE', QUEUE_MAXSIZE),
+        batch_size=app.config.get('ERREURS_WRITE_BEHIND_BATCH_SIZE', FLUSH_BATCH_SIZE),
+        flush_interval=app.config.get('ERREURS_WRITE_BEHIND_INTERVAL', FLUSH_INTERVAL_SECONDS)
+    )
@@ -0,0 +1,30 @@
+# tests/conftest.py
+import pytest
+from flask import Flask
+
+from models import db
+from utils.cache import read_cache
+
+
+@pytest.fixture
+def app():
+    """Application minimale sur SQLite en mémoire, avec toutes les routes de l'API."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['TESTING'] = True
+    db.init_app(app)
+
+    from routes import init_app as init_routes
+    init_routes(app)
+
+    with app.app_context():
+        db.create_all()
+        read_cache.clear()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
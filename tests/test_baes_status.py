@@ -0,0 +1,49 @@
+# tests/test_baes_status.py
+from datetime import datetime, timedelta, timezone
+
+from models import db
+from models.baes import Baes
+from models.baes_status import BaesStatus
+from models.batiment import Batiment
+from models.etage import Etage
+from services.baes_status import create_statuses, update_statuses
+
+
+def seed_baes():
+    etage = Etage(name='Etage', batiment=Batiment(name='Batiment'))
+    baes = Baes(name='BAES-1', position={'x': 0, 'y': 0}, etage=etage)
+    db.session.add_all([etage, baes])
+    db.session.commit()
+    return etage.id, baes.id
+
+
+def event(baes_id, timestamp):
+    return {'baes_id': baes_id, 'type_erreur': 'erreur_batterie', 'timestamp': timestamp}
+
+
+def test_missing_status_inserted_concurrently_is_reused(app):
+    _, baes_id = seed_baes()
+    now = datetime.now(timezone.utc)
+    update_statuses([event(baes_id, now)])
+    db.session.commit()
+
+    # Lot qui n'a pas vu la ligne créée par un lot concurrent : pas d'échec sur la clé primaire
+    statuses = {}
+    create_statuses({baes_id: [event(baes_id, now)]}, statuses)
+    assert statuses[baes_id].window_count == 1
+    db.session.rollback()
+
+    update_statuses([event(baes_id, now + timedelta(seconds=1))])
+    db.session.commit()
+    assert db.session.get(BaesStatus, baes_id).window_count == 2
+
+
+def test_status_route_not_cached(app, client):
+    etage_id, baes_id = seed_baes()
+    update_statuses([event(baes_id, datetime.now(timezone.utc) - timedelta(hours=2))])
+    db.session.commit()
+
+    assert client.get(f'/etages/{etage_id}/baes/status').get_json()[0]['window_count'] == 1
+    # La fenêtre expire sans nouveau commit : la réponse suivante doit le refléter
+    app.config['BAES_STATUS_WINDOW_HOURS'] = 1
+    assert client.get(f'/etages/{etage_id}/baes/status').get_json()[0]['window_count'] == 0
@@ -0,0 +1,66 @@
+# tests/test_blobs.py
+import io
+import os
+
+import pytest
+
+from models import db
+from models.carte import Carte
+from models.carte_blob import CarteBlob
+from models.batiment import Batiment
+from models.etage import Etage
+from services.blobs import blob_path, remove_carte, store_carte
+
+
+class Upload:
+    """FileStorage minimal pour store_carte."""
+
+    def __init__(self, data, filename='plan.txt'):
+        self.stream = io.BytesIO(data)
+        self.filename = filename
+        self.mimetype = 'text/plain'
+
+
+@pytest.fixture
+def upload_folder(app, tmp_path):
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    app.config['CARTE_IMAGE_NORMALIZE'] = False
+    return str(tmp_path)
+
+
+def seed_etages(count):
+    batiment = Batiment(name='Batiment')
+    etages = [Etage(name=f'Etage {i}', batiment=batiment) for i in range(count)]
+    db.session.add_all(etages)
+    db.session.commit()
+    return [etage.id for etage in etages]
+
+
+def test_ref_count_follows_uploads_and_deletes(upload_folder):
+    etage_ids = seed_etages(2)
+    first, _ = store_carte(Upload(b'plan'), upload_folder, etage_id=etage_ids[0])
+    db.session.commit()
+    second, existing = store_carte(Upload(b'plan'), upload_folder, etage_id=etage_ids[1])
+    db.session.commit()
+    assert existing
+    path = blob_path(upload_folder, first.sha256)
+    assert db.session.get(CarteBlob, first.sha256).ref_count == 2
+
+    remove_carte(first, upload_folder)
+    db.session.expire_all()
+    assert db.session.get(CarteBlob, second.sha256).ref_count == 1
+    assert os.path.exists(path)
+
+    remove_carte(second, upload_folder)
+    assert db.session.get(CarteBlob, second.sha256) is None
+    assert not os.path.exists(path)
+
+
+def test_rollback_removes_new_blob_file(upload_folder):
+    etage_id, = seed_etages(1)
+    carte, existing = store_carte(Upload(b'nouveau plan'), upload_folder, etage_id=etage_id)
+    path = blob_path(upload_folder, carte.sha256)
+    assert not existing and os.path.exists(path)
+    db.session.rollback()
+    assert not os.path.exists(path)
+    assert db.session.query(Carte).count() == 0
@@ -0,0 +1,116 @@
+# tests/test_bulk.py
+from models import db
+from models.baes import Baes
+from models.batiment import Batiment
+from models.etage import Etage
+from models.site import Site
+
+
+def seed(count=3):
+    site = Site(name='Site')
+    batiment = Batiment(name='Batiment', site=site)
+    etages = [Etage(name=f'Etage {i}', batiment=batiment) for i in range(2)]
+    baes = [Baes(name=f'BAES-{i}', position={'x': i, 'y': 0}, etage=etages[0]) for i in range(count)]
+    db.session.add_all([site, batiment, *etages, *baes])
+    db.session.commit()
+    return etages, [b.id for b in baes]
+
+
+def test_bulk_create_batiments_in_input_order(client):
+    site = Site(name='Site')
+    db.session.add(site)
+    db.session.commit()
+    names = [f'Batiment {i}' for i in (3, 1, 2)]
+    response = client.post('/batiments/bulk', json=[
+        {'name': names[0], 'site_id': site.id},
+        {'name': names[1], 'polygon_points': {'points': [[0, 0], [1, 1]]}},
+        {'name': names[2]},
+    ])
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['created'] == 3 and body['errors'] == []
+    assert [db.session.get(Batiment, new_id).name for new_id in body['ids']] == names
+
+    assert client.post('/batiments/bulk', json=[]).status_code == 400
+    assert client.post('/batiments/bulk', json={'name': 'Batiment'}).status_code == 400
+
+
+def test_bulk_create_etages_partial_failure(client):
+    etages, _ = seed()
+    batiment_id = etages[0].batiment_id
+    response = client.post('/etages/bulk', json=[
+        {'name': 'Etage A', 'batiment_id': batiment_id},
+        {'name': 'Etage B', 'batiment_id': 999},
+        {'batiment_id': batiment_id},
+        'Etage C',
+        {'name': 'Etage D', 'batiment_id': batiment_id},
+    ])
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body['created'] == 2
+    assert body['ids'][1:4] == [None, None, None]
+    assert [db.session.get(Etage, body['ids'][i]).name for i in (0, 4)] == ['Etage A', 'Etage D']
+    assert [error['index'] for error in body['errors']] == [1, 2, 3]
+
+    response = client.post('/etages/bulk', json=[{'name': 'Etage E', 'batiment_id': 999}])
+    assert response.status_code == 400
+    assert response.get_json()['ids'] == [None]
+
+
+def test_bulk_create_baes_rejects_duplicate_names(client):
+    etages, _ = seed()
+    etage_id = etages[1].id
+    response = client.post('/baes/bulk', json=[
+        {'name': 'BAES-A', 'position': {'x': 1, 'y': 1}, 'etage_id': etage_id},
+        {'name': 'BAES-A', 'position': {'x': 2, 'y': 2}, 'etage_id': etage_id},  # doublon du tableau
+        {'name': 'BAES-0', 'position': {'x': 3, 'y': 3}, 'etage_id': etage_id},  # nom déjà en base
+        {'name': 'BAES-B', 'position': {'x': 4, 'y': 4}, 'etage_id': etage_id},
+    ])
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body['created'] == 2
+    assert body['ids'][1:3] == [None, None]
+    assert [error['index'] for error in body['errors']] == [1, 2]
+    created = [db.session.get(Baes, body['ids'][i]) for i in (0, 3)]
+    assert [(b.name, b.position) for b in created] == [('BAES-A', {'x': 1, 'y': 1}), ('BAES-B', {'x': 4, 'y': 4})]
+    assert db.session.query(Baes).filter_by(name='BAES-A').count() == 1
+
+
+def test_bulk_update_etages(client):
+    etages, _ = seed()
+    updated_at = etages[0].updated_at
+    response = client.put('/etages/bulk', json=[
+        {'id': etages[0].id, 'name': 'Rez-de-chaussée'},
+        {'id': 999, 'name': 'Inconnu'},
+        {'id': etages[1].id, 'batiment_id': 999},
+        {'id': etages[1].id, 'name': None},
+    ])
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body['ids'] == [etages[0].id, None, None, None]
+    assert body['updated'] == 1
+    assert [error['index'] for error in body['errors']] == [1, 2, 3]
+    db.session.expire_all()
+    assert db.session.get(Etage, etages[0].id).name == 'Rez-de-chaussée'
+    assert db.session.get(Etage, etages[0].id).updated_at > updated_at
+    assert db.session.get(Etage, etages[1].id).name == 'Etage 1'
+
+
+def test_bulk_update_baes_names_and_fields(client):
+    etages, ids = seed()
+    response = client.put('/baes/bulk', json=[
+        {'id': ids[0], 'name': 'BAES-0'},                       # nom inchangé : accepté
+        {'id': ids[1], 'name': 'BAES-2'},                       # nom d'une autre BAES : refusé
+        {'id': ids[2], 'etage_id': etages[1].id, 'position': {'x': 9, 'y': 9}},
+        {'id': ids[2], 'name': 'Doublon'},                      # ID en double : refusé
+    ])
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body['ids'] == [ids[0], None, ids[2], None]
+    db.session.expire_all()
+    moved = db.session.get(Baes, ids[2])
+    assert moved.etage_id == etages[1].id and moved.position == {'x': 9, 'y': 9}
+    assert db.session.get(Baes, ids[1]).name == 'BAES-1'
+
+    assert client.put('/baes/bulk', json=[{'id': ids[0]}]).status_code == 400
+    assert client.put('/baes/bulk', json={'id': ids[0]}).status_code == 400
@@ -0,0 +1,20 @@
+# tests/test_cache.py
+from models import db
+from models.site import Site
+
+
+def test_cached_page_not_served_for_stream(client):
+    db.session.add_all([Site(name='Site 1'), Site(name='Site 2')])
+    db.session.commit()
+
+    page = client.get('/sites/')
+    assert page.status_code == 200
+    assert page.mimetype == 'application/json'
+
+    stream = client.get('/sites/', headers={'Accept': 'application/x-ndjson'})
+    assert stream.status_code == 200
+    assert stream.mimetype == 'application/x-ndjson'
+    assert len(stream.get_data(as_text=True).splitlines()) == 2
+
+    # La page en cache reste servie aux clients JSON
+    assert client.get('/sites/').get_json() == page.get_json()
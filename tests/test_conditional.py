@@ -0,0 +1,24 @@
+# tests/test_conditional.py
+from models import db
+from models.site import Site
+
+NDJSON = {'Accept': 'application/x-ndjson'}
+
+
+def test_etag_depends_on_negotiated_format(client):
+    db.session.add_all([Site(name='Site 1'), Site(name='Site 2')])
+    db.session.commit()
+
+    page = client.get('/sites/')
+    assert page.status_code == 200
+    assert 'Accept' in page.headers['Vary']
+    etag = page.headers['ETag']
+    assert client.get('/sites/', headers={'If-None-Match': etag}).status_code == 304
+
+    # Même URL, flux NDJSON négocié par Accept : l'ETag de la page ne doit pas valider le flux
+    stream = client.get('/sites/', headers={'If-None-Match': etag, **NDJSON})
+    assert stream.status_code == 200
+    assert stream.mimetype == 'application/x-ndjson'
+    assert stream.headers['ETag'] != etag
+    assert 'Accept' in stream.headers['Vary']
+    assert client.get('/sites/', headers={'If-None-Match': stream.headers['ETag'], **NDJSON}).status_code == 304
@@ -0,0 +1,48 @@
+# tests/test_events.py
+import re
+from datetime import datetime, timezone
+
+from models import db
+from models.baes import Baes
+from models.batiment import Batiment
+from models.etage import Etage
+from models.historique_erreur import HistoriqueErreur
+from models.site import Site
+
+
+def seed_erreurs(count):
+    site = Site(name='Site')
+    etage = Etage(name='Etage', batiment=Batiment(name='Batiment', site=site))
+    baes = Baes(name='BAES-1', position={'x': 0, 'y': 0}, etage=etage)
+    db.session.add_all([site, etage, baes])
+    db.session.flush()
+    now = datetime.now(timezone.utc)
+    erreurs = [
+        HistoriqueErreur(baes_id=baes.id, type_erreur='erreur_connexion', timestamp=now, last_seen=now, occurrences=1)
+        for _ in range(count)
+    ]
+    db.session.add_all(erreurs)
+    db.session.commit()
+    return site.id, [erreur.id for erreur in erreurs]
+
+
+def test_stream_rejects_invalid_site_id(client):
+    response = client.get('/erreurs/stream?site_id=abc')
+    assert response.status_code == 400
+
+
+def test_truncated_replay_resumes_without_gap(app, client):
+    site_id, ids = seed_erreurs(5)
+    app.config['ERREURS_STREAM_REPLAY_MAX'] = 2
+
+    received = []
+    last_id = ids[0] - 1
+    for _ in range(2):
+        # Chaque tranche tronquée se termine par 'truncated' et ferme le flux
+        body = client.get(f'/erreurs/stream?site_id={site_id}', headers={'Last-Event-ID': str(last_id)}).get_data(as_text=True)
+        assert 'event: truncated' in body
+        page = [int(i) for i in re.findall(r'^id: (\d+)$', body, re.M)]
+        assert len(page) == 2
+        received += page
+        last_id = page[-1]
+    assert received == ids[:4]
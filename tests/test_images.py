@@ -0,0 +1,37 @@
+# tests/test_images.py
+import io
+
+import pytest
+
+PIL = pytest.importorskip('PIL')
+from PIL import Image, ImageCms  # noqa: E402
+
+from services.images import convert_to_srgb, normalize_image  # noqa: E402
+
+
+def test_cmyk_jpeg_does_not_keep_its_profile(tmp_path):
+    source = tmp_path / 'plan_cmyk.jpg'
+    destination = tmp_path / 'plan.jpg'
+    # Profil qui ne décrit pas les pixels RGB produits : il ne doit pas être recopié tel quel
+    embedded = ImageCms.ImageCmsProfile(ImageCms.createProfile('LAB')).tobytes()
+    Image.new('CMYK', (64, 32), (255, 0, 0, 0)).save(source, 'JPEG', icc_profile=embedded)
+
+    normalize_image(str(source), str(destination))
+
+    with Image.open(destination) as image:
+        assert image.mode == 'RGB'
+        assert image.info.get('icc_profile') != embedded
+        red, green, blue = image.getpixel((32, 16))
+    # Cyan pur
+    assert red < 40 and green > 200 and blue > 200
+
+
+def test_convert_to_srgb_embeds_srgb_profile():
+    # Conversion par profil (Lab ici, faute de profil CMYK disponible) : le profil sRGB remplace l'original
+    lab = ImageCms.ImageCmsProfile(ImageCms.createProfile('LAB'))
+    image = Image.new('LAB', (4, 4), (255, 128, 128))
+    converted, icc_profile = convert_to_srgb(image, lab.tobytes())
+    assert converted.mode == 'RGB'
+    assert min(converted.getpixel((0, 0))) > 240
+    description = ImageCms.getProfileDescription(ImageCms.ImageCmsProfile(io.BytesIO(icc_profile)))
+    assert 'sRGB' in description
@@ -0,0 +1,61 @@
+# tests/test_rollup.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import mssql
+
+import cli
+from models import db
+from models.baes import Baes
+from models.batiment import Batiment
+from models.etage import Etage
+from models.historique_erreur import HistoriqueErreur
+from models.historique_erreur_rollup import ErreurRollupHoraire, RollupWatermark
+from services.rollup import WatermarkConflict, advance_watermark, lock_watermark, rollup_batch
+from utils.locking import for_update
+
+
+def seed_erreurs(count):
+    etage = Etage(name='Etage', batiment=Batiment(name='Batiment'))
+    baes = Baes(name='BAES-1', position={'x': 0, 'y': 0}, etage=etage)
+    old = datetime.now(timezone.utc) - timedelta(hours=2)
+    db.session.add_all([etage, baes])
+    db.session.flush()
+    db.session.add_all([
+        HistoriqueErreur(baes_id=baes.id, type_erreur='erreur_connexion', timestamp=old, last_seen=old,
+                         occurrences=1, created_at=old, updated_at=old)
+        for _ in range(count)
+    ])
+    db.session.commit()
+
+
+def test_watermark_lock_is_a_real_lock_on_mssql():
+    query = for_update(select(RollupWatermark), RollupWatermark)
+    assert 'WITH (UPDLOCK, HOLDLOCK, ROWLOCK)' in str(query.compile(dialect=mssql.dialect()))
+
+
+def test_rollup_batch_advances_watermark(app):
+    seed_erreurs(5)
+    assert rollup_batch(lag=0) == 5
+    assert rollup_batch(lag=0) == 0
+    assert db.session.execute(select(ErreurRollupHoraire.count)).scalar() == 5
+
+
+def test_moved_watermark_aborts_batch(app):
+    seed_erreurs(3)
+    watermark = lock_watermark()
+    stale = watermark.last_id
+    advance_watermark(stale, stale + 3)
+    # Un second passage parti du même watermark ne doit pas compter le lot une deuxième fois
+    with pytest.raises(WatermarkConflict):
+        advance_watermark(stale, stale + 3)
+    db.session.rollback()
+
+
+def test_rollup_lag_adds_coalesce_window(app, monkeypatch):
+    calls = []
+    monkeypatch.setattr(cli, 'run_rollup', lambda batch_size, lag: calls.append(lag) or 0)
+    app.config['ERREURS_COALESCE_WINDOW_SECONDS'] = 300
+    cli.rollup_from_config(lag=60)
+    assert calls == [360]
@@ -0,0 +1,42 @@
+# tests/test_tiles.py
+import os
+
+import pytest
+
+from models import db
+from models.carte_blob import CarteBlob
+from services.tiles import TileBuilder, read_tile_info, remove_tiles, tiles_folder
+
+PIL = pytest.importorskip('PIL')
+from PIL import Image  # noqa: E402
+
+SHA256 = 'ab' * 32
+
+
+@pytest.fixture
+def source(app, tmp_path):
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    path = tmp_path / 'plan.png'
+    Image.new('RGB', (300, 200), (200, 30, 30)).save(path)
+    return str(path)
+
+
+def test_build_keeps_tiles_of_existing_blob(app, source):
+    db.session.add(CarteBlob(sha256=SHA256, size=1, ref_count=1))
+    db.session.commit()
+    TileBuilder()._build(app, SHA256, source)
+    assert read_tile_info(app.config['UPLOAD_FOLDER'], SHA256)['max_zoom'] == 1
+
+    remove_tiles(app.config['UPLOAD_FOLDER'], SHA256)
+    assert not os.path.exists(tiles_folder(app.config['UPLOAD_FOLDER'], SHA256))
+
+
+def test_build_discarded_when_blob_removed_meanwhile(app, source):
+    # remove_carte a supprimé le blob (et appelé remove_tiles) pendant la construction
+    builder = TileBuilder()
+    builder._build(app, SHA256, source)
+    upload_folder = app.config['UPLOAD_FOLDER']
+    assert not os.path.exists(tiles_folder(upload_folder, SHA256))
+    assert not [name for name in os.listdir(os.path.dirname(tiles_folder(upload_folder, SHA256)))
+                if name.endswith('.tmp')]
+    assert not builder.failed(SHA256)
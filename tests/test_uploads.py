@@ -0,0 +1,120 @@
+# tests/test_uploads.py
+import hashlib
+import io
+import os
+import threading
+import time
+
+import pytest
+
+from models import db
+from models.batiment import Batiment
+from models.carte import Carte
+from models.etage import Etage
+from services.uploads import OffsetMismatch, append_chunk, purge_expired, read_metadata, upload_paths
+
+DATA = b'plan du rez-de-chaussee'
+
+
+@pytest.fixture
+def upload_folder(app, tmp_path):
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'pdf'}
+    app.config['CARTE_IMAGE_NORMALIZE'] = False
+    return str(tmp_path)
+
+
+@pytest.fixture
+def etage_id(app):
+    etage = Etage(name='RDC', batiment=Batiment(name='Batiment'))
+    db.session.add(etage)
+    db.session.commit()
+    return etage.id
+
+
+def open_upload(client, **fields):
+    body = {'filename': 'plan.pdf', 'size': len(DATA), 'sha256': hashlib.sha256(DATA).hexdigest()}
+    body.update(fields)
+    return client.post('/cartes/uploads', json=body)
+
+
+def test_open_checks_target(client, upload_folder, etage_id):
+    assert open_upload(client).status_code == 400
+    assert open_upload(client, etage_id=etage_id, site_id=1).status_code == 400
+    assert open_upload(client, etage_id=etage_id + 1).status_code == 404
+
+    db.session.add(Carte(chemin='plan.pdf', etage_id=etage_id))
+    db.session.commit()
+    assert open_upload(client, etage_id=etage_id).status_code == 409
+
+
+def test_failed_finalize_keeps_upload(client, upload_folder, etage_id):
+    upload_id = open_upload(client, etage_id=etage_id).get_json()['upload_id']
+    assert client.put(f'/cartes/uploads/{upload_id}?offset=0', data=DATA).status_code == 200
+
+    # Carte assignée à l'étage entre l'ouverture et la finalisation
+    other = Carte(chemin='autre.pdf', etage_id=etage_id)
+    db.session.add(other)
+    db.session.commit()
+    assert client.post(f'/cartes/uploads/{upload_id}/finalize').status_code == 409
+    assert client.get(f'/cartes/uploads/{upload_id}').get_json()['offset'] == len(DATA)
+
+    db.session.delete(other)
+    db.session.commit()
+    response = client.post(f'/cartes/uploads/{upload_id}/finalize')
+    assert response.status_code == 200
+    with open(response.get_json()['chemin'], 'rb') as f:
+        assert f.read() == DATA
+    assert client.get(f'/cartes/uploads/{upload_id}').status_code == 404
+
+
+def test_chunk_keeps_metadata_from_expiring(client, upload_folder, etage_id):
+    upload_id = open_upload(client, etage_id=etage_id).get_json()['upload_id']
+    part_path, meta_path = upload_paths(upload_folder, upload_id)
+    opened = time.time() - 2 * 3600
+    os.utime(meta_path, (opened, opened))
+    assert client.put(f'/cartes/uploads/{upload_id}?offset=0', data=DATA[:5]).status_code == 200
+    purge_expired(upload_folder, expiry_hours=1)
+    assert os.path.exists(meta_path) and os.path.exists(part_path)
+
+
+class SlowStream(io.BytesIO):
+    """Corps de requête dont la lecture attend ``release`` (premier envoi encore en cours)."""
+
+    def __init__(self, data, started, release):
+        super().__init__(data)
+        self.started = started
+        self.release = release
+
+    def read(self, size=-1):
+        self.started.set()
+        self.release.wait(5)
+        return super().read(size)
+
+
+def test_concurrent_appends_at_same_offset(client, upload_folder, etage_id):
+    upload_id = open_upload(client, etage_id=etage_id).get_json()['upload_id']
+    started, release = threading.Event(), threading.Event()
+    results = {}
+
+    def first():
+        results['first'] = append_chunk(upload_folder, upload_id, 0, SlowStream(DATA, started, release))
+
+    def retry():
+        try:
+            append_chunk(upload_folder, upload_id, 0, io.BytesIO(DATA))
+        except OffsetMismatch as e:
+            results['retry'] = e.offset
+
+    threads = [threading.Thread(target=first), threading.Thread(target=retry)]
+    threads[0].start()
+    assert started.wait(5)
+    threads[1].start()
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == {'first': len(DATA), 'retry': len(DATA)}
+    assert read_metadata(upload_folder, upload_id)['offset'] == len(DATA)
+    assert client.post(f'/cartes/uploads/{upload_id}/finalize').status_code == 200
@@ -0,0 +1,72 @@
+# tests/test_user_queries.py
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from models import db
+from models.role import Role
+from models.site import Site
+from models.user import User
+from utils.cache import read_cache
+
+ROLES_PER_USER = 3
+SITES_PER_USER = 4
+
+
+@contextmanager
+def count_queries():
+    """Compte les requêtes SQL exécutées dans le bloc."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def seed_users(count):
+    """``count`` utilisateurs, chacun avec ROLES_PER_USER rôles et SITES_PER_USER sites."""
+    roles = [Role(name=f'role{i}') for i in range(ROLES_PER_USER)]
+    sites = [Site(name=f'site{i}') for i in range(SITES_PER_USER)]
+    users = [User(login=f'user{i}', password='secret', roles=roles, sites=sites) for i in range(count)]
+    db.session.add_all(roles + sites + users)
+    db.session.commit()
+    last_id = users[-1].id
+    db.session.expire_all()
+    return last_id
+
+
+def queries_for(client, url):
+    read_cache.clear()
+    with count_queries() as statements:
+        response = client.get(url)
+    assert response.status_code == 200, response.get_json()
+    return len(statements), response.get_json()
+
+
+@pytest.mark.parametrize('url, check', [
+    ('/users/?limit=1000', lambda body, n: len(body['items']) == n and all(
+        len(user['roles']) == ROLES_PER_USER and len(user['sites']) == SITES_PER_USER for user in body['items']
+    )),
+    ('/users/{user_id}', lambda body, n: len(body['roles']) == ROLES_PER_USER),
+    ('/users/sites/{user_id}/sites', lambda body, n: len(body) == SITES_PER_USER),
+    ('/role/users/{user_id}/roles', lambda body, n: len(body) == ROLES_PER_USER),
+])
+def test_query_count_independent_of_user_count(app, client, url, check):
+    counts = []
+    for n in (10, 100):
+        db.drop_all()
+        db.create_all()
+        user_id = seed_users(n)
+        count, body = queries_for(client, url.format(user_id=user_id))
+        assert check(body, n)
+        counts.append(count)
+    assert counts[0] == counts[1], f'{url} : {counts[0]} requêtes pour 10 utilisateurs, {counts[1]} pour 100'
+    # Une requête par relation au plus, quel que soit le nombre d'utilisateurs
+    assert counts[1] <= 3
@@ -0,0 +1,85 @@
+# tests/test_write_behind.py
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+import services.write_behind as write_behind_module
+from models import db
+from models.baes import Baes
+from models.batiment import Batiment
+from models.etage import Etage
+from models.historique_erreur import HistoriqueErreur
+from services.write_behind import WriteBehindQueue
+
+
+@pytest.fixture
+def queue(app):
+    queue = WriteBehindQueue()
+    queue._app = app
+    return queue
+
+
+def seed_events(count, baes_count=2):
+    etage = Etage(name='Etage', batiment=Batiment(name='Batiment'))
+    baes = [Baes(name=f'BAES-{i}', position={'x': i, 'y': 0}, etage=etage) for i in range(baes_count)]
+    db.session.add_all(baes)
+    db.session.commit()
+    now = datetime.now(timezone.utc)
+    events = [
+        {'index': i, 'baes_id': baes[i % baes_count].id, 'type_erreur': 'erreur_connexion', 'timestamp': now}
+        for i in range(count)
+    ]
+    return [b.id for b in baes], events
+
+
+def erreur_count():
+    return db.session.execute(select(func.count()).select_from(HistoriqueErreur)).scalar_one()
+
+
+def test_deleted_baes_only_drops_its_events(app, queue):
+    db.session.execute(text('PRAGMA foreign_keys=ON'))
+    baes_ids, events = seed_events(9, baes_count=3)
+    # BAES supprimée après la mise en file de ses événements
+    db.session.execute(delete(Baes).where(Baes.id == baes_ids[1]))
+    db.session.commit()
+
+    queue._write(events)
+    assert queue.failed == 3
+    assert queue.written == 6
+    assert erreur_count() == 6
+
+
+def test_rejected_event_is_isolated(app, queue, monkeypatch):
+    _, events = seed_events(8)
+    bad = events[5]
+    original = write_behind_module.record_events
+
+    # Refus non lié à une BAES supprimée : le lot est coupé en deux jusqu'à l'événement fautif
+    def record_events(part):
+        if bad in part:
+            raise IntegrityError('INSERT', {}, Exception('contrainte'))
+        return original(part)
+
+    monkeypatch.setattr(write_behind_module, 'record_events', record_events)
+    queue._write(events)
+    assert (queue.written, queue.failed) == (7, 1)
+    assert erreur_count() == 7
+
+
+def test_transient_error_retries_without_rewriting(app, queue, monkeypatch):
+    _, events = seed_events(4)
+    original = write_behind_module.record_events
+    failures = iter([True])
+
+    def record_events(part):
+        if next(failures, False):
+            raise OperationalError('INSERT', {}, Exception('connexion perdue'))
+        return original(part)
+
+    monkeypatch.setattr(write_behind_module, 'record_events', record_events)
+    queue._stop_requested.set()  # pas d'attente entre les tentatives
+    queue._write(events)
+    assert (queue.written, queue.failed) == (4, 0)
+    assert erreur_count() == 4
@@ -0,0 +1,278 @@
+# utils/bulk.py
+from flask import current_app, jsonify, request
+from sqlalchemy import insert, select, update
+
+from models import db
+
+BULK_MAX_ITEMS = 5000
+# SQL Server limite une requête à 2100 paramètres : les IN (...) sont découpés
+IN_CLAUSE_CHUNK = 2000
+
+
+class BulkError(ValueError):
+    """Requête bulk invalide dans son ensemble (corps qui n'est pas un tableau, trop d'éléments...)."""
+
+
+class Field:
+    """Champ attendu dans chaque élément d'un tableau bulk."""
+
+    def __init__(self, name, kind, required=False, max_length=None):
+        self.name = name
+        self.kind = kind
+        self.required = required
+        self.max_length = max_length
+
+    def check(self, item):
+        if self.name not in item or item[self.name] is None:
+            return f'Le champ {self.name} est requis' if self.required else None
+        value = item[self.name]
+        # bool est une sous-classe d'int : on le refuse explicitement pour les IDs
+        if not isinstance(value, self.kind) or (self.kind is int and isinstance(value, bool)):
+            return f'Le champ {self.name} a un type invalide'
+        if self.max_length is not None and len(value) > self.max_length:
+            return f'Le champ {self.name} dépasse {self.max_length} caractères'
+        return None
+
+
+def get_bulk_items():
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        raise BulkError('Le corps de la requête doit être un tableau JSON')
+    if not data:
+        raise BulkError('Le tableau est vide')
+    max_items = current_app.config.get('BULK_MAX_ITEMS', BULK_MAX_ITEMS)
+    if len(data) > max_items:
+        raise BulkError(f'Au plus {max_items} éléments par requête')
+    return data
+
+
+def validate_items(items, fields):
+    """
+    Valide chaque élément et retourne (lignes valides indexées par position, erreurs).
+    Les lignes ne contiennent que les champs déclarés.
+    """
+    rows = {}
+    errors = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'error': 'Chaque élément doit être un objet JSON'})
+            continue
+        error = next((e for e in (field.check(item) for field in fields) if e), None)
+        if error:
+            errors.append({'index': index, 'error': error})
+            continue
+        rows[index] = {field.name: item.get(field.name) for field in fields}
+    return rows, errors
+
+
+def chunked(values, size=IN_CLAUSE_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def existing_values(column, values):
+    """Valeurs de ``values`` présentes dans ``column`` (une requête par tranche de IN)."""
+    found = set()
+    for chunk in chunked(sorted(set(values))):
+        found.update(db.session.execute(select(column).where(column.in_(chunk))).scalars())
+    return found
+
+
+def value_owners(column, id_column, values):
+    """{valeur: ID de la ligne qui la porte} pour les ``values`` présentes dans ``column`` (colonne unique)."""
+    owners = {}
+    for chunk in chunked(sorted(set(values))):
+        for value, owner_id in db.session.execute(select(column, id_column).where(column.in_(chunk))):
+            owners[value] = owner_id
+    return owners
+
+
+def check_foreign_key(rows, errors, field, column, message):
+    """Écarte (et signale) les lignes dont ``field`` référence un ID absent de ``column``."""
+    ids = {row[field] for row in rows.values() if row.get(field) is not None}
+    if not ids:
+        return
+    found = existing_values(column, ids)
+    for index in [i for i, row in rows.items() if row.get(field) is not None and row[field] not in found]:
+        del rows[index]
+        errors.append({'index': index, 'error': message})
+
+
+def validate_updates(items, fields):
+    """
+    Valide les éléments d'une mise à jour bulk : ``id`` entier requis, puis seuls les
+    champs présents sont vérifiés et mis à jour (un champ requis ne peut pas valoir null).
+    Un ID présent plusieurs fois dans le tableau est refusé.
+    Retourne (lignes {'id', champs présents} indexées par position, erreurs).
+    """
+    id_field = Field('id', int, required=True)
+    rows = {}
+    errors = []
+    seen = set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'error': 'Chaque élément doit être un objet JSON'})
+            continue
+        present = [field for field in fields if field.name in item]
+        error = id_field.check(item)
+        for field in present:
+            if error:
+                break
+            if item[field.name] is None and field.required:
+                error = f'Le champ {field.name} ne peut pas être null'
+            else:
+                error = field.check(item)
+        if error is None and not present:
+            error = 'Aucun champ à mettre à jour'
+        if error is None and item['id'] in seen:
+            error = f"L'ID {item['id']} apparaît plusieurs fois dans le tableau"
+        if error:
+            errors.append({'index': index, 'error': error})
+            continue
+        seen.add(item['id'])
+        rows[index] = {'id': item['id'], **{field.name: item[field.name] for field in present}}
+    return rows, errors
+
+
+def check_existing_ids(model, rows, errors, message):
+    """Écarte (et signale) les lignes dont l'``id`` n'existe pas dans la table du modèle."""
+    found = existing_values(model.id, [row['id'] for row in rows.values()])
+    for index in [i for i, row in rows.items() if row['id'] not in found]:
+        del rows[index]
+        errors.append({'index': index, 'error': message})
+
+
+def bulk_update(model, rows):
+    """
+    Met à jour ``rows`` (dicts avec ``id`` et les colonnes à modifier) par clé primaire :
+    un UPDATE executemany par ensemble de colonnes modifiées, sans RETURNING
+    (fast_executemany sur SQL Server). ``updated_at`` est renseigné par onupdate.
+    """
+    if rows:
+        db.session.execute(update(model), rows)
+
+
+def bulk_insert(model, rows):
+    """
+    Insère ``rows`` (liste de dicts) et retourne les IDs générés dans l'ordre des lignes
+    fournies. Avec RETURNING, SQLAlchemy regroupe les lignes en INSERT multi-VALUES
+    (« insertmanyvalues », jusqu'à 1000 lignes par instruction) : fast_executemany
+    de pyodbc ne s'applique pas à ce chemin.
+    """
+    if not rows:
+        return []
+    stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+    return list(db.session.execute(stmt, rows).scalars())
+
+
+def bulk_response(count, rows, ids, errors):
+    """
+    Réponse commune des routes bulk : ``ids`` est aligné sur le tableau reçu
+    (null pour un élément refusé), ``errors`` détaille les refus par index.
+    201 si tout est créé, 207 si une partie seulement, 400 si rien ne l'est.
+    """
+    aligned = [None] * count
+    for index, new_id in zip(rows, ids):
+        aligned[index] = new_id
+    errors = sorted(errors, key=lambda e: e['index'])
+    if not errors:
+        status = 201
+    elif rows:
+        status = 207
+    else:
+        status = 400
+    return jsonify({'ids': aligned, 'created': len(ids), 'errors': errors}), status
+
+
+def bulk_update_response(count, rows, errors):
+    """
+    Réponse des routes de mise à jour bulk : ``ids`` est aligné sur le tableau reçu
+    (null pour un élément refusé). 200 si tout est mis à jour, 207 si une partie
+    seulement, 400 si rien ne l'est.
+    """
+    aligned = [None] * count
+    for index, row in rows.items():
+        aligned[index] = row['id']
+    errors = sorted(errors, key=lambda e: e['index'])
+    if not errors:
+        status = 200
+    elif rows:
+        status = 207
+    else:
+        status = 400
+    return jsonify({'ids': aligned, 'updated': len(rows), 'errors': errors}), status
+
+
+BULK_RESPONSES = {
+    201: {
+        'description': 'Tous les éléments ont été créés.',
+        'schema': {
+            'type': 'object',
+            'properties': {
+                'ids': {'type': 'array', 'items': {'type': 'integer'}, 'example': [12, 13, 14]},
+                'created': {'type': 'integer', 'example': 3},
+                'errors': {'type': 'array', 'items': {'type': 'object'}, 'example': []}
+            }
+        }
+    },
+    207: {
+        'description': "Création partielle : 'ids' contient null pour chaque élément refusé, détaillé dans 'errors'.",
+        'schema': {
+            'type': 'object',
+            'properties': {
+                'ids': {'type': 'array', 'items': {'type': 'integer'}, 'example': [12, None, 13]},
+                'created': {'type': 'integer', 'example': 2},
+                'errors': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'index': {'type': 'integer', 'example': 1},
+                            'error': {'type': 'string', 'example': 'Le champ name est requis'}
+                        }
+                    }
+                }
+            }
+        }
+    },
+    400: {'description': "Corps invalide ou aucun élément valide (rien n'est inséré)."},
+    500: {'description': "Erreur interne (la transaction est annulée, rien n'est inséré)."}
+}
+
+
+BULK_UPDATE_RESPONSES = {
+    200: {
+        'description': 'Tous les éléments ont été mis à jour.',
+        'schema': {
+            'type': 'object',
+            'properties': {
+                'ids': {'type': 'array', 'items': {'type': 'integer'}, 'example': [12, 13, 14]},
+                'updated': {'type': 'integer', 'example': 3},
+                'errors': {'type': 'array', 'items': {'type': 'object'}, 'example': []}
+            }
+        }
+    },
+    207: {
+        'description': "Mise à jour partielle : 'ids' contient null pour chaque élément refusé, détaillé dans 'errors'.",
+        'schema': {
+            'type': 'object',
+            'properties': {
+                'ids': {'type': 'array', 'items': {'type': 'integer'}, 'example': [12, None, 13]},
+                'updated': {'type': 'integer', 'example': 2},
+                'errors': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'index': {'type': 'integer', 'example': 1},
+                            'error': {'type': 'string', 'example': 'Bâtiment non trouvé'}
+                        }
+                    }
+                }
+            }
+        }
+    },
+    400: {'description': "Corps invalide ou aucun élément valide (rien n'est modifié)."},
+    500: {'description': "Erreur interne (la transaction est annulée, rien n'est modifié)."}
+}
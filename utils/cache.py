@@ -0,0 +1,177 @@
+# utils/cache.py
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from utils.streaming import StreamFormatError, get_stream_format
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL = 300  # secondes
+
+
+class ReadCache:
+    """
+    Cache LRU borné avec expiration (TTL) pour les réponses des routes de lecture.
+
+    Chaque entrée est étiquetée par les tables dont elle dépend ; un commit qui
+    touche l'une de ces tables invalide l'entrée (voir les écouteurs plus bas).
+    Le cache est propre au processus : entre plusieurs workers, le TTL borne la
+    durée pendant laquelle une entrée peut rester périmée.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # clé -> (expiration, tables, valeur)
+        self._lock = threading.Lock()
+        # Incrémenté à chaque invalidation : une valeur calculée avant un commit n'est pas stockée après
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def configure(self, maxsize=None, ttl=None):
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            self._entries.clear()
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, value, tables, generation):
+        with self._lock:
+            if generation != self._generation or self.maxsize <= 0:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, frozenset(tables), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tables):
+        tables = set(tables)
+        with self._lock:
+            self._generation += 1
+            stale = [key for key, (_, deps, _) in self._entries.items() if deps & tables]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'invalidations': self.invalidations
+            }
+
+
+read_cache = ReadCache()
+
+
+def init_cache(app):
+    read_cache.configure(
+        maxsize=app.config.get('READ_CACHE_MAXSIZE', DEFAULT_MAXSIZE),
+        ttl=app.config.get('READ_CACHE_TTL', DEFAULT_TTL)
+    )
+
+
+def cached(*models):
+    """
+    Décorateur de route GET : met en cache la réponse 200 (clé = chemin + query string)
+    et l'associe aux tables des ``models`` (modèles ou tables d'association) pour
+    l'invalidation après commit. Les réponses en flux (``?stream=`` ou
+    ``Accept: application/x-ndjson``) ne passent pas par le cache.
+    """
+    tables = [getattr(model, '__table__', model).name for model in models]
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                streamed = get_stream_format() is not None
+            except StreamFormatError:
+                streamed = True
+            if streamed:
+                # La clé ignore Accept : un flux ne doit ni lire ni écraser la page en cache
+                return view(*args, **kwargs)
+            key = request.full_path
+            hit = read_cache.get(key)
+            if hit is not None:
+                body, status, mimetype = hit
+                return Response(body, status=status, mimetype=mimetype)
+            generation = read_cache.generation
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                read_cache.set(key, (response.get_data(), response.status_code, response.mimetype), tables, generation)
+            return response
+        return wrapper
+    return decorator
+
+
+# Invalidation pilotée par les commits : les tables modifiées sont collectées
+# pendant la transaction (flush ORM et DML exécutés via Session.execute),
+# puis invalidées une fois le commit effectif.
+
+def _pending_tables(session):
+    return session.info.setdefault('read_cache_tables', set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_tables(session, flush_context):
+    pending = _pending_tables(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is not None:
+            pending.add(table.name)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_executed_tables(orm_execute_state):
+    statement = orm_execute_state.statement
+    if statement.is_dml:
+        table = getattr(statement, 'table', None)
+        if table is not None and hasattr(table, 'name'):
+            _pending_tables(orm_execute_state.session).add(table.name)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_tables(session):
+    tables = session.info.pop('read_cache_tables', None)
+    if tables:
+        read_cache.invalidate(tables)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_tables(session):
+    session.info.pop('read_cache_tables', None)
@@ -0,0 +1,121 @@
+# utils/conditional.py
+import hashlib
+import os
+import unicodedata
+from datetime import timezone
+from functools import wraps
+from urllib.parse import quote
+
+from flask import Response, current_app, make_response, request, send_file
+from sqlalchemy import func, select
+from werkzeug.http import is_resource_modified
+
+from models import db
+from utils.streaming import StreamFormatError, get_stream_format
+
+
+def collection_validators(model):
+    """
+    Nombre de lignes et ``max(updated_at)`` de la table du modèle, en une seule
+    requête d'agrégat : suffisant pour savoir si une collection a changé sans la lire.
+    """
+    table = model.__table__
+    count, last_modified = db.session.execute(
+        select(func.count(), func.max(table.c.updated_at))
+    ).one()
+    if last_modified is not None and last_modified.tzinfo is None:
+        # Certains pilotes renvoient un datetime naïf : les horodatages sont stockés en UTC
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return count, last_modified
+
+
+def collection_etag(model, count, last_modified, representation):
+    # La query string fait partie de la clé : chaque page (limit/after) a son propre ETag ;
+    # ``representation`` distingue la page JSON du flux négocié par Accept sur la même URL
+    stamp = last_modified.isoformat() if last_modified else ''
+    raw = f"{model.__tablename__}:{count}:{stamp}:{representation}:{request.query_string.decode('latin-1')}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def conditional_collection(model):
+    """
+    Décorateur de route GET de liste : calcule un ETag faible et un Last-Modified
+    à partir de ``max(updated_at)`` et du nombre de lignes, et répond 304 sans
+    charger les lignes quand le client possède déjà la représentation courante.
+
+    Une suppression ne fait pas avancer ``max(updated_at)`` mais change le nombre
+    de lignes : seul l'ETag (If-None-Match) la détecte de façon fiable.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                representation = get_stream_format() or 'page'
+            except StreamFormatError:
+                # Paramètre stream invalide : la vue répond 400
+                return view(*args, **kwargs)
+            try:
+                count, last_modified = collection_validators(model)
+            except Exception as e:
+                # Sans validateurs, on sert la réponse normalement (la vue gère ses propres erreurs)
+                current_app.logger.error(f"Error in conditional_collection({model.__name__}): {e}")
+                return view(*args, **kwargs)
+            etag = collection_etag(model, count, last_modified, representation)
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            # La représentation dépend de l'en-tête Accept (page JSON ou flux NDJSON)
+            response.vary.add('Accept')
+            if last_modified is not None:
+                response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
+
+
+# Fichiers adressés par contenu : une URL donnée sert toujours les mêmes octets
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def content_disposition(response, download_name):
+    # Même encodage que send_file : nom ASCII de repli et nom UTF-8 (RFC 6266)
+    simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+    if simple == download_name:
+        response.headers.set('Content-Disposition', 'inline', filename=download_name)
+    else:
+        quoted = quote(download_name, safe="!#$&+-.^_`|~")
+        response.headers.set('Content-Disposition', 'inline', **{'filename': simple, 'filename*': f"UTF-8''{quoted}"})
+
+
+def send_immutable_file(path, mimetype, etag, download_name=None):
+    """
+    Réponse pour un fichier immuable du dossier d'upload : ETag fort ``etag`` (304 sur
+    If-None-Match), Range / 206 et ``Cache-Control: public, immutable``.
+
+    Avec X_ACCEL_REDIRECT_PREFIX, la réponse est vide et porte ``X-Accel-Redirect`` :
+    nginx lit le fichier (location interne) et gère lui-même Range. Avec USE_X_SENDFILE,
+    send_file délègue de même au serveur (``X-Sendfile``). Dans les deux cas le worker
+    Python ne copie aucun octet du fichier.
+    """
+    prefix = current_app.config.get('X_ACCEL_REDIRECT_PREFIX')
+    if prefix:
+        relative = os.path.relpath(path, current_app.config['UPLOAD_FOLDER']).replace(os.sep, '/')
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{quote(relative)}"
+        if download_name:
+            content_disposition(response, download_name)
+        response.set_etag(etag)
+        response.make_conditional(request)
+    else:
+        response = send_file(
+            path, mimetype=mimetype, download_name=download_name, etag=etag,
+            conditional=True, max_age=IMMUTABLE_MAX_AGE
+        )
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,9 @@
+# utils/dates.py
+from datetime import timezone
+
+
+def as_utc(value):
+    """Datetime ramené en UTC ; une valeur sans fuseau (SQLite, DATETIME2) est considérée comme UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
@@ -0,0 +1,48 @@
+# utils/locking.py
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows (serveur de développement) : verrou propre au processus
+    fcntl = None
+
+# SQL Server ignore FOR UPDATE (with_for_update() n'y produit aucun verrou) : le verrou
+# de mise à jour est demandé par un indice de table. HOLDLOCK le garde jusqu'au commit
+# et verrouille aussi la plage d'une clé absente (insertion concurrente de la même clé).
+MSSQL_UPDATE_LOCK = 'WITH (UPDLOCK, HOLDLOCK, ROWLOCK)'
+
+_process_lock = threading.Lock()
+
+
+def for_update(query, *models):
+    """
+    Verrouille jusqu'au commit les lignes lues par ``query`` : FOR UPDATE sur PostgreSQL
+    (et les dialectes qui le supportent), UPDLOCK/HOLDLOCK sur les tables ``models`` sous
+    SQL Server. Deux transactions qui lisent la même ligne ainsi s'exécutent l'une après l'autre.
+    """
+    query = query.with_for_update()
+    for model in models:
+        query = query.with_hint(model, MSSQL_UPDATE_LOCK, dialect_name='mssql')
+    return query
+
+
+@contextmanager
+def file_lock(file):
+    """
+    Verrou exclusif sur le fichier ouvert ``file`` (flock, partagé entre les workers),
+    relâché après l'écriture des données en tampon. Sans fcntl, verrou du processus.
+    """
+    if fcntl is None:
+        with _process_lock:
+            try:
+                yield file
+            finally:
+                file.flush()
+        return
+    fcntl.flock(file, fcntl.LOCK_EX)
+    try:
+        yield file
+    finally:
+        file.flush()
+        fcntl.flock(file, fcntl.LOCK_UN)
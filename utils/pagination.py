@@ -0,0 +1,135 @@
+# utils/pagination.py
+import base64
+import json
+from datetime import datetime, timezone
+
+from flask import request
+from sqlalchemy import Select, and_, or_
+
+from models import db
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Paramètres Swagger communs à toutes les routes de liste paginées
+PAGINATION_PARAMETERS = [
+    {
+        'name': 'limit',
+        'in': 'query',
+        'type': 'integer',
+        'required': False,
+        'default': DEFAULT_LIMIT,
+        'description': f"Nombre maximum d'éléments retournés (1 à {MAX_LIMIT})."
+    },
+    {
+        'name': 'after',
+        'in': 'query',
+        'type': 'string',
+        'required': False,
+        'description': "Curseur opaque renvoyé dans le champ 'next' de la page précédente."
+    }
+]
+
+
+def paginated_schema(item_properties):
+    """Schéma Swagger d'une page : {'items': [...], 'next': curseur ou null}."""
+    return {
+        'type': 'object',
+        'properties': {
+            'items': {
+                'type': 'array',
+                'items': {'type': 'object', 'properties': item_properties}
+            },
+            'next': {'type': 'string', 'example': 'MTA', 'description': 'Curseur de la page suivante (null si dernière page).'}
+        }
+    }
+
+
+class PaginationError(ValueError):
+    """Paramètres de pagination invalides (limit ou after)."""
+
+
+def encode_cursor(value):
+    # Le curseur est opaque pour le client : JSON encodé en base64 url-safe, sans padding
+    raw = json.dumps(value, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (ValueError, TypeError):
+        raise PaginationError('Curseur invalide')
+
+
+def get_pagination_args():
+    """Lit et valide ``limit`` et ``after`` dans la query string."""
+    raw_limit = request.args.get('limit')
+    if raw_limit is None:
+        limit = DEFAULT_LIMIT
+    else:
+        try:
+            limit = int(raw_limit)
+        except ValueError:
+            raise PaginationError('Le paramètre limit doit être un entier')
+        if not 1 <= limit <= MAX_LIMIT:
+            raise PaginationError(f'Le paramètre limit doit être compris entre 1 et {MAX_LIMIT}')
+
+    after = request.args.get('after')
+    if after is not None:
+        after = decode_cursor(after)
+    return limit, after
+
+
+def paginate(query, column):
+    """
+    Pagination par clé (keyset) : filtre ``column > after``, trie sur ``column``
+    et retourne (éléments de la page, curseur de la page suivante ou None).
+    Une ligne supplémentaire est lue pour savoir s'il reste des éléments, sans COUNT.
+    ``query`` peut être une requête ORM ou un SELECT de colonnes (voir utils.serializers).
+    """
+    limit, after = get_pagination_args()
+    if after is not None:
+        if not isinstance(after, int) or isinstance(after, bool):
+            raise PaginationError('Curseur invalide')
+        query = query.where(column > after) if isinstance(query, Select) else query.filter(column > after)
+    query = query.order_by(column).limit(limit + 1)
+    rows = db.session.execute(query).all() if isinstance(query, Select) else query.all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], column.key))
+    return rows, next_cursor
+
+
+def paginate_recent(query, time_column, id_column):
+    """
+    Pagination par clé composite (``time_column``, ``id_column``), du plus récent au
+    plus ancien. Le curseur contient [horodatage ISO, id] de la dernière ligne ; la
+    condition est écrite sans comparaison de tuples (non supportée par SQL Server).
+    ``query`` est un SELECT de colonnes contenant ``time_column`` et ``id_column``.
+    """
+    limit, after = get_pagination_args()
+    if after is not None:
+        try:
+            raw_time, last_id = after
+            last_time = datetime.fromisoformat(raw_time)
+        except (TypeError, ValueError):
+            raise PaginationError('Curseur invalide')
+        if not isinstance(last_id, int) or isinstance(last_id, bool):
+            raise PaginationError('Curseur invalide')
+        if last_time.tzinfo is None:
+            last_time = last_time.replace(tzinfo=timezone.utc)
+        query = query.where(or_(
+            time_column < last_time,
+            and_(time_column == last_time, id_column < last_id)
+        ))
+    query = query.order_by(time_column.desc(), id_column.desc()).limit(limit + 1)
+    rows = db.session.execute(query).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, time_column.key).isoformat(), getattr(last, id_column.key)])
+    return rows, next_cursor
@@ -0,0 +1,66 @@
+# utils/serializers.py
+from sqlalchemy import select
+
+from models import db
+from models.baes import Baes
+from models.batiment import Batiment
+from models.carte import Carte
+from models.etage import Etage
+from models.historique_erreur import HistoriqueErreur
+from models.role import Role
+from models.site import Site
+from models.user import User
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+class Serializer:
+    """
+    Projection d'un modèle sur les seules colonnes renvoyées par l'API.
+
+    ``select()`` construit un SELECT Core limité à ces colonnes : les lignes
+    obtenues sont de simples tuples, sans hydratation d'objets ORM ni suivi
+    dans l'identity map. ``dump()`` accepte indifféremment ces lignes ou un
+    objet ORM déjà chargé (réponses des routes POST/PUT).
+    """
+
+    def __init__(self, model, *fields, formatters=None):
+        self.model = model
+        self.fields = fields
+        self.formatters = formatters or {}
+        self.columns = [model.__table__.c[field] for field in fields]
+
+    def only(self, *fields):
+        """Sous-ensemble des colonnes de ce sérialiseur."""
+        formatters = {f: fmt for f, fmt in self.formatters.items() if f in fields}
+        return Serializer(self.model, *fields, formatters=formatters)
+
+    def select(self):
+        return select(*self.columns)
+
+    def dump(self, row):
+        data = {field: getattr(row, field) for field in self.fields}
+        for field, fmt in self.formatters.items():
+            data[field] = fmt(data[field])
+        return data
+
+    def get(self, pk):
+        """Retourne le dict de la ligne d'ID ``pk`` (une requête, colonnes projetées) ou None."""
+        stmt = self.select().where(self.model.__table__.c.id == pk)
+        row = db.session.execute(stmt).first()
+        return self.dump(row) if row is not None else None
+
+
+site_serializer = Serializer(Site, 'id', 'name')
+batiment_serializer = Serializer(Batiment, 'id', 'name', 'polygon_points', 'site_id')
+etage_serializer = Serializer(Etage, 'id', 'name', 'batiment_id')
+baes_serializer = Serializer(Baes, 'id', 'name', 'position', 'etage_id')
+carte_serializer = Serializer(Carte, 'id', 'chemin', 'etage_id', 'site_id')
+historique_serializer = Serializer(
+    HistoriqueErreur, 'id', 'baes_id', 'type_erreur', 'timestamp', 'occurrences', 'last_seen',
+    formatters={'timestamp': isoformat, 'last_seen': isoformat}
+)
+user_serializer = Serializer(User, 'id', 'login')
+role_serializer = Serializer(Role, 'id', 'name')
@@ -0,0 +1,83 @@
+# utils/streaming.py
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy import Select
+
+from models import db
+
+# Nombre de lignes lues par aller-retour sur le curseur serveur
+STREAM_BATCH_SIZE = 1000
+
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Paramètre Swagger commun aux routes de liste qui acceptent le mode flux
+STREAM_PARAMETER = {
+    'name': 'stream',
+    'in': 'query',
+    'type': 'string',
+    'enum': list(STREAM_FORMATS),
+    'required': False,
+    'description': "Renvoie toute la collection en flux (tableau JSON ou NDJSON) au lieu d'une page."
+}
+
+
+class StreamFormatError(ValueError):
+    """Format de flux demandé inconnu."""
+
+
+def get_stream_format():
+    """
+    Retourne 'json' ou 'ndjson' si le client demande une réponse en flux
+    (``?stream=json|ndjson`` ou ``Accept: application/x-ndjson``), sinon None.
+    """
+    fmt = request.args.get('stream')
+    if fmt is None:
+        if request.accept_mimetypes.best == STREAM_FORMATS['ndjson']:
+            return 'ndjson'
+        return None
+    if fmt not in STREAM_FORMATS:
+        raise StreamFormatError(f"Le paramètre stream doit valoir {' ou '.join(STREAM_FORMATS)}")
+    return fmt
+
+
+def iter_json(rows, serialize, fmt, batch_size=STREAM_BATCH_SIZE):
+    """Sérialise ``rows`` par paquets en un tableau JSON ou en NDJSON, sans jamais matérialiser la liste."""
+    json_provider = current_app.json
+    separator = '\n' if fmt == 'ndjson' else ','
+    if fmt == 'json':
+        yield '['
+    first = True
+    buffer = []
+    for row in rows:
+        buffer.append(json_provider.dumps(serialize(row), separators=(',', ':')))
+        if len(buffer) >= batch_size:
+            chunk = separator.join(buffer)
+            yield chunk if first else separator + chunk
+            first = False
+            buffer = []
+    if buffer:
+        chunk = separator.join(buffer)
+        yield chunk if first else separator + chunk
+        first = False
+    if fmt == 'json':
+        yield ']'
+    elif not first:
+        yield '\n'
+
+
+def stream_query(query, serialize, fmt, batch_size=STREAM_BATCH_SIZE):
+    """
+    Réponse HTTP en flux pour une requête ORM ou un SELECT de colonnes : les lignes
+    sont lues via un curseur serveur (``yield_per``) et émises au fil de l'eau,
+    la mémoire reste constante.
+    """
+    if isinstance(query, Select):
+        rows = db.session.execute(query.execution_options(yield_per=batch_size))
+    else:
+        rows = query.yield_per(batch_size)
+    return Response(
+        stream_with_context(iter_json(rows, serialize, fmt, batch_size)),
+        mimetype=STREAM_FORMATS[fmt]
+    )